@@ -1,11 +1,11 @@
 try:
-    from o2x5xx import DiscoveryClient
+    from o2x5xx import DiscoveryEngine
     from o2x5xx.device.utils import get_local_network_interfaces
 except ModuleNotFoundError:
-    from source.device.discovery import DiscoveryClient
+    from source.device.discovery import DiscoveryEngine
     from source.device.utils import get_local_network_interfaces
 except ImportError:
-    from source.device.discovery import DiscoveryClient
+    from source.device.discovery import DiscoveryEngine
     from source.device.utils import get_local_network_interfaces
 
 
@@ -15,13 +15,13 @@ if __name__ == '__main__':
     my_network_interfaces = get_local_network_interfaces()
 
     if my_network_interfaces:
-        # iterate over all available network adapters and detect IFM devices
-        interface_devices = {}
-        for inf_id, my_inf in enumerate(my_network_interfaces):
-            discovery_client = DiscoveryClient(interface=my_inf)
-            devices = discovery_client.detect_devices()
-            interface_devices[inf_id] = devices
-
-        print(interface_devices)
+        # detect IFM devices on all available network adapters at once
+        engine = DiscoveryEngine(interfaces=my_network_interfaces, timeout=5)
+        for device in engine.discover():
+            print("{inf}: IFM device ({name}) found with IP {ip}".format(inf=device["interface"],
+                                                                          name=device["device_article_number"],
+                                                                          ip=device["device_ip"]))
+        for error in engine.errors:
+            print(error)
     else:
         raise EnvironmentError("No network interfaces found. Please check your network adapter.")
@@ -16,15 +16,15 @@ if __name__ == '__main__':
     else:
         address = '192.168.0.69'
 
-    # create grabber
-    image_client = ImageClient(address=address, port=50010, timeout=None)
+    # create grabber which always keeps the newest frame, so a slow redraw does not back up the socket
+    image_client = ImageClient(address=address, port=50010, timeout=None, latest_frame=True)
 
     # create figures
     figs = [image_client.make_figure(i) for i in range(image_client.number_images)]
 
     def update_fig(*args):
         if args[3]:
-            image_client.read_next_frames()
+            image_client.read_next_frames(block=False)
         image = args[2]
         idx = args[1]
         image.set_array(image_client.frames[idx])
@@ -48,3 +48,6 @@ if __name__ == '__main__':
 
     plt.tight_layout()
     plt.show()
+
+    print("Dropped {} stale frame(s)".format(image_client.dropped_frames))
+    image_client.close()
@@ -20,7 +20,7 @@ setup(
     author='Michael Gann',
     author_email='support.efector.object-ident@ifm.com',
     license='MIT',
-    packages=['o2x5xx', 'o2x5xx.device', 'o2x5xx.pcic', 'o2x5xx.rpc', 'o2x5xx.static'],
+    packages=['o2x5xx', 'o2x5xx.device', 'o2x5xx.firmware', 'o2x5xx.pcic', 'o2x5xx.rpc', 'o2x5xx.static'],
     package_dir={'o2x5xx': './source'},
     test_suite='nose.collector',
     tests_require=['nose'],
@@ -1,4 +1,5 @@
 from .device import *
+from .firmware import *
 from .pcic import *
 from .rpc import *
 from .static import *
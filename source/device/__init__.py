@@ -1,3 +1,5 @@
 from .client import *
 from .image_client import *
+from .frame_ring import *
 from .discovery import *
+from .pool import *
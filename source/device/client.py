@@ -1,57 +1,90 @@
 from ..pcic import (O2x5xxPCICDevice, SOCKET_TIMEOUT)
 from ..rpc import O2x5xxRPCDevice
+import threading
 
 
-class O2x5xxDevice(O2x5xxPCICDevice):
-    def __init__(self, address="192.168.0.69", port=50010, autoconnect=True, timeout=SOCKET_TIMEOUT):
+class _LazyRPC(object):
+    """
+    Creates the O2x5xxRPCDevice on the first use of the rpc property, so clients which only use PCIC
+    do not depend on the RPC port being reachable. With warmup=True it is created in a background thread.
+    """
+
+    def _init_rpc(self, address, timeout, warmup):
         self._address = address
         self._timeout = timeout
         self._rpc = None
-        self._rpc = O2x5xxRPCDevice(address=address, timeout=timeout)
+        self._rpc_lock = threading.Lock()
+        self._rpc_warmup = None
+        if warmup:
+            self._rpc_warmup = threading.Thread(target=self._warmup_rpc, name="o2x5xx-rpc-warmup", daemon=True)
+            self._rpc_warmup.start()
+
+    def _warmup_rpc(self):
+        try:
+            self.rpc
+        except Exception:
+            # the error is raised again on the first use of the rpc property
+            pass
+
+    def _close_rpc(self):
+        # waits for a running warmup, the RPC device is only closed if it was created
+        with self._rpc_lock:
+            rpc, self._rpc = self._rpc, None
+        if rpc is not None:
+            rpc.mainProxy.close()
+
+    @property
+    def rpc(self) -> O2x5xxRPCDevice:
+        if self._rpc is None:
+            with self._rpc_lock:
+                if self._rpc is None:
+                    self._rpc = O2x5xxRPCDevice(address=self._address, timeout=self._timeout)
+        return self._rpc
+
+
+class O2x5xxDevice(_LazyRPC, O2x5xxPCICDevice):
+    def __init__(self, address="192.168.0.69", port=50010, autoconnect=True, timeout=SOCKET_TIMEOUT, warmup=False):
+        """
+        :param address: (str) IP address of the device
+        :param port: (int) PCIC port
+        :param autoconnect: (bool) connect the PCIC client immediately
+        :param timeout: (float) socket timeout in seconds
+        :param warmup: (bool) create the RPC client in a background thread instead of on the first use of rpc
+        """
+        self._init_rpc(address=address, timeout=timeout, warmup=warmup)
         super(O2x5xxPCICDevice, self).__init__(address=address, port=port, autoconnect=autoconnect, timeout=timeout)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._rpc:
-            self._rpc.mainProxy.close()
+        self._close_rpc()
         self.close()
-        self._rpc = None
-
-    @property
-    def rpc(self) -> O2x5xxRPCDevice:
-        if not self._rpc:
-            self._rpc = O2x5xxRPCDevice(address=self._address, timeout=self._timeout)
-        return self._rpc
 
 
-class O2x5xxDeviceV2(object):
-    def __init__(self, address="192.168.0.69", port=50010, autoconnect=True, timeout=SOCKET_TIMEOUT):
-        self._address = address
+class O2x5xxDeviceV2(_LazyRPC):
+    def __init__(self, address="192.168.0.69", port=50010, autoconnect=True, timeout=SOCKET_TIMEOUT, warmup=False):
+        """
+        :param address: (str) IP address of the device
+        :param port: (int) PCIC port
+        :param autoconnect: (bool) connect the PCIC client immediately
+        :param timeout: (float) socket timeout in seconds
+        :param warmup: (bool) create the RPC client in a background thread instead of on the first use of rpc
+        """
         self._port = port
-        self._timeout = timeout
         self._autoconnect = autoconnect
-        self._rpc = O2x5xxRPCDevice(address=address, timeout=timeout)
+        self._init_rpc(address=address, timeout=timeout, warmup=warmup)
         self._pcic = O2x5xxPCICDevice(address=address, port=port, autoconnect=autoconnect, timeout=timeout)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._rpc:
-            self._rpc.mainProxy.close()
+        self._close_rpc()
         if self._pcic:
             self._pcic.close()
-        self._rpc = None
         self._pcic = None
 
-    @property
-    def rpc(self) -> O2x5xxRPCDevice:
-        if not self._rpc:
-            self._rpc = O2x5xxRPCDevice(address=self._address, timeout=self._timeout)
-        return self._rpc
-
     @property
     def pcic(self) -> O2x5xxPCICDevice:
         if not self._pcic:
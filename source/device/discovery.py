@@ -1,91 +1,433 @@
+from .utils import get_local_network_interfaces
+import ipaddress
+import json
+import os
+import selectors
 import socket
 import struct
 import platform
-import sys
-import os
+import threading
+import time
+import warnings
+
+DISCOVERY_PORT = 3321
+DISCOVERY_BROADCAST = bytes([0x10, 0x20, 0xef, 0xcf, 0x0c, 0xf9, 0x00, 0x00])
+DISCOVERY_RESPONSE_MAGIC = 0x19111981
+
+
+def parse_response(response: bytes) -> dict:
+    """
+    Convert the UDP response of an ifm device into a dict.
+
+    :param response: (bytes) UDP response of the device
+    :return: (dict) device information
+    """
+    return {"device_ip": socket.inet_ntoa(response[4:8]), "gateway_ip": socket.inet_ntoa(response[8:12]),
+            "subnet_mask": socket.inet_ntoa(response[12:16]),
+            "port_xml_rpc": struct.unpack('>H', response[16:18])[0],
+            "vendor_id": struct.unpack('>H', response[18:20])[0],
+            "device_id": struct.unpack('>H', response[20:22])[0],
+            "device_mac": ":".join(
+                "{:02x}".format(ord(v)) for v in struct.unpack("<%dc" % 6, response[32:38])),
+            "device_flags": struct.unpack('>H', response[38:40])[0],
+            "device_article_number": response[40:46].decode("utf-8"),
+            "device_name": response[104:].decode("utf-8").replace('\x00', '')}
+
+
+class DiscoveryError(Exception):
+    """
+    Error of the discovery on one interface, e.g. a socket which could not be bound to the interface.
+    """
+
+    def __init__(self, interface, stage, error):
+        """
+        :param interface: (str|bytes) network interface
+        :param stage: (str) "setup", "send" or "receive"
+        :param error: (Exception) original error
+        """
+        super().__init__(interface, stage, error)
+        self.interface = interface
+        self.stage = stage
+        self.error = error
+
+    def __str__(self):
+        return "{}: discovery {} failed: {!r}".format(self.interface, self.stage, self.error)
+
+    def toDict(self) -> dict:
+        """
+        :return: (dict) error as JSON serializable dict, the original error is given as string
+        """
+        interface = self.interface.decode() if isinstance(self.interface, bytes) else self.interface
+        return {"interface": interface, "stage": self.stage, "error": repr(self.error)}
+
+
+class DiscoveryEngine(object):
+    """
+    Discovery of ifm devices on many network interfaces at once.
+
+    One UDP socket per interface is opened and all of them are served by a single selector loop. The devices
+    are returned as soon as their response arrives, the discovery stops early when the expected number of
+    devices was found, and the broadcast is repeated to compensate lost datagrams. Interfaces which can not
+    be used are reported as DiscoveryError in errors instead of stopping the discovery, e.g.
+
+        engine = DiscoveryEngine(timeout=3, expected=2)
+        for device in engine.discover():
+            print(device["interface"], device["device_ip"], device["device_name"])
+        print(engine.errors)
+    """
+
+    def __init__(self, interfaces=None, timeout=5.0, expected=None, retries=2, retry_interval=1.0,
+                 port=DISCOVERY_PORT, broadcast_address="<broadcast>"):
+        """
+        :param interfaces: (list) interface names (Linux) or local IP addresses. Default: all local interfaces
+        :param timeout: (float) max. duration of the discovery in seconds
+        :param expected: (int) stop as soon as this number of devices was found. None waits for the timeout.
+        :param retries: (int) number of repeated broadcasts
+        :param retry_interval: (float) time in seconds between two broadcasts
+        :param port: (int) UDP port of the discovery, used for sending and receiving
+        :param broadcast_address: (str) destination address of the broadcast
+        """
+        if interfaces is None:
+            interfaces = get_local_network_interfaces()
+        self.interfaces = list(interfaces)
+        self.timeout = timeout
+        self.expected = expected
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.port = port
+        self.broadcast_address = broadcast_address
+        # found devices by MAC address
+        self.devices = {}
+        self.errors = []
+
+    def _open(self, interface) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)  # UDP
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, True)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+            name = interface.decode() if isinstance(interface, bytes) else interface
+            try:
+                ipaddress.IPv4Address(name)
+                # local IP address of the interface
+                sock.bind((name, self.port))
+            except ipaddress.AddressValueError:
+                if platform.system() != "Linux":
+                    raise EnvironmentError("Interface names are only supported on Linux, use the IP address "
+                                           "of the interface instead.")
+                # 25 is the magic number to use a specific interface 'SO_BINDTODEVICE',
+                # which requires root permissions
+                sock.setsockopt(socket.SOL_SOCKET, getattr(socket, "SO_BINDTODEVICE", 25),
+                                name.encode())
+                # The same port is used for incoming and outgoing communication to pierce a hole through a
+                # firewall (UDP hole punching, https://en.wikipedia.org/wiki/UDP_hole_punching)
+                sock.bind(('', self.port))
+            sock.setblocking(False)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _send(self, selector, key) -> None:
+        try:
+            key.fileobj.sendto(DISCOVERY_BROADCAST, (self.broadcast_address, self.port))
+        except OSError as e:
+            # an interface which can not send will not receive any response
+            self.errors.append(DiscoveryError(interface=key.data, stage="send", error=e))
+            selector.unregister(key.fileobj)
+            key.fileobj.close()
+
+    def discover(self, callback=None):
+        """
+        Generator returning every found device once as soon as its response arrives.
+
+        :param callback: (callable) called with the dict of every found device
+        :return: (dict) device information of parse_response() with the additional key "interface"
+        """
+        self.devices = {}
+        self.errors = []
+        selector = selectors.DefaultSelector()
+        try:
+            for interface in self.interfaces:
+                try:
+                    selector.register(self._open(interface), selectors.EVENT_READ, interface)
+                except OSError as e:
+                    self.errors.append(DiscoveryError(interface=interface, stage="setup", error=e))
+            deadline = time.monotonic() + self.timeout
+            broadcasts = 0
+            nextBroadcast = time.monotonic()
+            while selector.get_map():
+                if self.expected is not None and len(self.devices) >= self.expected:
+                    break
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if broadcasts <= self.retries and now >= nextBroadcast:
+                    for key in list(selector.get_map().values()):
+                        self._send(selector, key)
+                    broadcasts += 1
+                    nextBroadcast = now + self.retry_interval
+                wait = deadline - now
+                if broadcasts <= self.retries:
+                    wait = min(wait, nextBroadcast - now)
+                for key, _ in selector.select(max(wait, 0)):
+                    try:
+                        response, server = key.fileobj.recvfrom(1024)
+                    except OSError as e:
+                        self.errors.append(DiscoveryError(interface=key.data, stage="receive", error=e))
+                        continue
+                    # we typically receive our own broadcast, which is no device response
+                    if len(response) < 104 or struct.unpack('>I', response[0:4])[0] != DISCOVERY_RESPONSE_MAGIC:
+                        continue
+                    device = parse_response(response)
+                    if device["device_mac"] in self.devices:
+                        continue
+                    device["interface"] = key.data
+                    self.devices[device["device_mac"]] = device
+                    if callback:
+                        callback(device)
+                    yield device
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+    def detect(self, callback=None) -> dict:
+        """
+        Run the discovery until the timeout or until the expected number of devices was found.
+
+        :param callback: (callable) called with the dict of every found device
+        :return: (dict) {"devices": list of found devices, "errors": list of DiscoveryError}
+        """
+        devices = list(self.discover(callback=callback))
+        return {"devices": devices, "errors": list(self.errors)}
 
 
 class DiscoveryClient(object):
 
-    def __init__(self, interface):
+    def __init__(self, interface, timeout=5.0):
         self.interface = interface
-        self.broadcast = bytearray([0x10, 0x20, 0xef, 0xcf, 0x0c, 0xf9, 0x00, 0x00])
-        self.response_magic = 0x19111981
-        # The port number for communication. It is recommended to use
-        # the same port for incoming and outgoing communication this
-        # help to pierce a hole through a firewall like the default firewall
-        # under Windows 7. This technique is called
-        # UDP hole punching (https://en.wikipedia.org/wiki/UDP_hole_punching)
-        self.port = 3321
-        self.udp_response = []
-        self.result_dict = {"interface": self.interface, "devices": {}}
+        self.timeout = timeout
+        self.broadcast = bytearray(DISCOVERY_BROADCAST)
+        self.response_magic = DISCOVERY_RESPONSE_MAGIC
+        self.port = DISCOVERY_PORT
+        self.result_dict = {"interface": self.interface, "devices": {}, "errors": []}
         self.my_os = platform.system()
 
     def response_to_dict(self, dict_id, response):
+        self.result_dict["devices"].update({dict_id: parse_response(response)})
+
+    def detect_devices(self):
+        """
+        Detect the devices on the interface of the client. Errors are returned in the list "errors" of the result.
 
-        response_dict = {"device_ip": socket.inet_ntoa(response[4:8]), "gateway_ip": socket.inet_ntoa(response[8:12]),
-                         "subnet_mask": socket.inet_ntoa(response[12:16]),
-                         "port_xml_rpc": struct.unpack('>H', response[16:18])[0],
-                         "vendor_id": struct.unpack('>H', response[18:20])[0],
-                         "device_id": struct.unpack('>H', response[20:22])[0],
-                         "device_mac": ":".join(
-                             "{:02x}".format(ord(v)) for v in struct.unpack("<%dc" % 6, response[32:38])),
-                         "device_flags": struct.unpack('>H', response[38:40])[0],
-                         "device_article_number": response[40:46].decode("utf-8"),
-                         "device_name": response[104:].decode("utf-8").replace('\x00', '')}
+        :return: (dict) {"interface": interface, "devices": {index: device}, "errors": [error dicts]}
+        """
+        engine = DiscoveryEngine(interfaces=[self.interface], timeout=self.timeout, port=self.port)
+        for idx, device in enumerate(engine.discover()):
+            device.pop("interface")
+            self.result_dict["devices"].update({idx: device})
+        self.result_dict["errors"] = [error.toDict() for error in engine.errors]
+        return self.result_dict
 
-        self.result_dict["devices"].update({dict_id: response_dict})
 
-    def detect_devices(self):
-        if self.my_os == "Linux":
-            # Check for sudo privileges
-            if os.getuid() != 0:
-                print(sys.stderr,
-                      "Check your privileges. Root permissions are required for platform ".format(self.my_os))
-                sys.exit(-1)
-        print('{ip}: Sending UDP broadcast ...'.format(ip=self.interface))
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)  # UDP
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, True)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+class DiscoveryEvent(object):
+    """
+    Change of the device inventory of a DiscoveryMonitor.
+    """
+    ADD = "add"
+    CHANGE = "change"
+    REMOVE = "remove"
 
-        if self.my_os == "Linux":
-            try:
-                # here we use a hardcoded interface as an example
-                # 25 is the magic number to use a specific interface 'SO_BINDTODEVICE'
-                sock.setsockopt(socket.SOL_SOCKET, 25, self.interface)
-                sock.bind(('', self.port))
-            except IOError:
-                print(sys.stderr, "Socket setup failed. Does the specified interface exist? Check using: ")
-                print(sys.stderr, "ifconfig")
-                sys.exit(1)
-        elif self.my_os == "Windows":
-            sock.bind((self.interface, self.port))
-        else:
-            raise RuntimeError("Operation system {} not supported yet!".format(self.my_os))
-        # reducing socket timeout to 5 seconds
-        sock.settimeout(5)
-        sock.sendto(self.broadcast, ("<broadcast>", self.port))
-
-        response, server = sock.recvfrom(8)  # we typically receive our own broadcast
-        print("Receiving own broadcast msg: {msg} from: {server}".format(msg=response, server=server))
-
-        # First collect all UDP responses from ifm devices
-        while True:
+    def __init__(self, type, device, previous=None):
+        """
+        :param type: (str) DiscoveryEvent.ADD, DiscoveryEvent.CHANGE or DiscoveryEvent.REMOVE
+        :param device: (dict) inventory entry of the device
+        :param previous: (dict) inventory entry before the change (CHANGE only)
+        """
+        self.type = type
+        self.device = device
+        self.previous = previous
+        self.time = time.time()
+
+    def __repr__(self):
+        return "DiscoveryEvent(type={!r}, mac={!r}, ip={!r})".format(self.type, self.device["device_mac"],
+                                                                      self.device["device_ip"])
+
+    @property
+    def changed(self) -> list:
+        """
+        :return: (list) names of the changed device information, e.g. ["device_ip"]
+        """
+        if self.previous is None:
+            return []
+        return sorted(key for key in self.device if key not in ("first_seen", "last_seen")
+                      and self.device[key] != self.previous.get(key))
+
+
+class DiscoveryMonitor(object):
+    """
+    Continuous discovery keeping an inventory of the devices in the network.
+
+    The discovery broadcast is repeated every interval seconds in a background thread. The inventory is keyed
+    by the MAC address of the devices and holds the device information with the time the device was first and
+    last seen. A DiscoveryEvent is passed to the callback when a device appears, changes its information
+    (e.g. the IP address) or was not seen for remove_after seconds. The inventory is stored in inventory_path,
+    so a restarted monitor knows the devices immediately, e.g.
+
+        with DiscoveryMonitor(interval=5, inventory_path="devices.json", callback=print) as monitor:
+            addresses = monitor.addresses()
+    """
+
+    def __init__(self, interfaces=None, interval=5.0, remove_after=None, inventory_path=None, callback=None,
+                 timeout=None, retries=1, port=DISCOVERY_PORT, broadcast_address="<broadcast>"):
+        """
+        :param interfaces: (list) interface names (Linux) or local IP addresses. Default: all local interfaces
+        :param interval: (float) time in seconds between the start of two discovery rounds
+        :param remove_after: (float) devices which were not seen for this time in seconds are removed.
+                             Default: three intervals
+        :param inventory_path: (str) JSON file the inventory is loaded from and stored to. None keeps it in memory.
+        :param callback: (callable) called with every DiscoveryEvent
+        :param timeout: (float) duration of one discovery round in seconds. Default: interval, at most 2 seconds
+        :param retries: (int) number of repeated broadcasts per discovery round
+        :param port: (int) UDP port of the discovery
+        :param broadcast_address: (str) destination address of the broadcast
+        """
+        if interfaces is None:
+            interfaces = get_local_network_interfaces()
+        self.interfaces = list(interfaces)
+        self.interval = interval
+        self.remove_after = 3 * interval if remove_after is None else remove_after
+        self.inventory_path = inventory_path
+        self.callback = callback
+        self.timeout = min(interval, 2.0) if timeout is None else timeout
+        self.retries = retries
+        self.port = port
+        self.broadcast_address = broadcast_address
+        # errors of the last discovery round and error of the background thread
+        self.errors = []
+        self.error = None
+        self._inventory = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.inventory_path and os.path.exists(self.inventory_path):
             try:
-                response, server = sock.recvfrom(360)  # receive the reply from the device
-                if self.response_magic == struct.unpack('>I', response[0:4])[0]:
-                    self.udp_response.append(response)
-                    print("{inf}: IFM device ({name}) found with IP {ip}"
-                          .format(inf=self.interface, name=response[40:46].decode("utf-8"),
-                                  ip=socket.inet_ntoa(response[4:8])))
-            except socket.timeout:
-                sock.close()
-                break
-
-        sock.close()
-
-        # Process the response data for each ifm device and write to result_dict
-        for idx, res in enumerate(self.udp_response):
-            self.response_to_dict(dict_id=idx, response=res)
+                with open(self.inventory_path, "r") as f:
+                    inventory = json.load(f)
+                if not isinstance(inventory, dict):
+                    raise ValueError("inventory is not a JSON object")
+                self._inventory = inventory
+            except (ValueError, OSError) as e:
+                # e.g. truncated file, the inventory is rebuilt by the next discovery
+                warnings.warn("Device inventory {} could not be loaded, starting with an empty inventory: {}"
+                              .format(self.inventory_path, e))
 
-        return self.result_dict
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def inventory(self) -> dict:
+        """
+        :return: (dict) copy of the inventory {MAC address: device information with first_seen and last_seen}
+        """
+        with self._lock:
+            return {mac: dict(device) for mac, device in self._inventory.items()}
+
+    def get(self, mac: str) -> [dict, None]:
+        """
+        :param mac: (str) MAC address of the device, e.g. "00:02:01:40:aa:01"
+        :return: (dict) device information or None if the device is not in the inventory
+        """
+        with self._lock:
+            device = self._inventory.get(mac.lower())
+            return None if device is None else dict(device)
+
+    def addresses(self) -> list:
+        """
+        :return: (list) IP addresses of all devices in the inventory, e.g. for FleetRunner
+        """
+        with self._lock:
+            return [device["device_ip"] for device in self._inventory.values()]
+
+    def run_once(self) -> list:
+        """
+        Run one discovery round and update the inventory.
+
+        :return: (list) DiscoveryEvent of this round
+        """
+        engine = DiscoveryEngine(interfaces=self.interfaces, timeout=self.timeout, retries=self.retries,
+                                 retry_interval=self.timeout / (self.retries + 1), port=self.port,
+                                 broadcast_address=self.broadcast_address)
+        found = list(engine.discover())
+        self.errors = engine.errors
+        now = time.time()
+        events = []
+        with self._lock:
+            for device in found:
+                if isinstance(device["interface"], bytes):
+                    device["interface"] = device["interface"].decode()
+                previous = self._inventory.get(device["device_mac"])
+                device["first_seen"] = now if previous is None else previous["first_seen"]
+                device["last_seen"] = now
+                self._inventory[device["device_mac"]] = device
+                if previous is None:
+                    events.append(DiscoveryEvent(DiscoveryEvent.ADD, dict(device)))
+                else:
+                    event = DiscoveryEvent(DiscoveryEvent.CHANGE, dict(device), previous)
+                    if event.changed:
+                        events.append(event)
+            for mac, device in list(self._inventory.items()):
+                if now - device["last_seen"] > self.remove_after:
+                    del self._inventory[mac]
+                    events.append(DiscoveryEvent(DiscoveryEvent.REMOVE, device))
+            if self.inventory_path:
+                self._save()
+        if self.callback:
+            for event in events:
+                self.callback(event)
+        return events
+
+    def _save(self):
+        # write into a temporary file first, so a crash never leaves a partially written inventory
+        tmpPath = self.inventory_path + ".tmp"
+        with open(tmpPath, "w") as f:
+            json.dump(self._inventory, f, indent=4)
+        os.replace(tmpPath, self.inventory_path)
+
+    def start(self) -> None:
+        """
+        Start the discovery in a background thread.
+
+        :return: None
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="o2x5xx-discovery-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread after the current discovery round.
+
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+                self.error = None
+            except Exception as e:
+                # keep monitoring, e.g. if an interface is temporarily not available
+                self.error = e
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
@@ -0,0 +1,248 @@
+from ..static.formats import serialization_format, ChunkType
+import struct
+import sys
+import time
+
+
+class Frame(object):
+    """
+    One frame read from a FrameRing. The images are views into the shared memory and stay valid
+    until the producer wraps around the ring and overwrites the slot (see FrameRingReader.is_valid()).
+    """
+
+    def __init__(self, sequence, timestamp, data, images):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.data = data
+        self.images = images
+
+    def __len__(self):
+        return self.images.__len__()
+
+
+class FrameRing(object):
+    """
+    Ring buffer in shared memory for publishing PCIC image frames to multiple processes.
+
+    Every slot holds the raw chunk bytes of one frame together with a sequence number. Readers attach to the
+    ring by name and get the images as NumPy views into the shared memory, so frames are not pickled or copied.
+    The producer never waits for readers: it overwrites the oldest slot, and readers which fall behind skip
+    ahead to the newest frame.
+    """
+    MAGIC = 0x4F325852
+    # magic, version, slots, slot size, write sequence
+    _RING_HEADER = struct.Struct("<IIIIQ")
+    _RING_HEADER_SIZE = 64
+    # sequence begin, sequence end, payload length, timestamp
+    _SLOT_HEADER = struct.Struct("<QQQd")
+    _SLOT_HEADER_SIZE = 32
+    # names of the rings created by this process, their registration at the resource tracker is kept
+    _created = set()
+
+    def __init__(self, name=None, slots=4, slot_size=4 * 1024 * 1024, create=True):
+        """
+        Create a new ring or attach to an existing one.
+
+        :param name: (str) name of the shared memory block. If None, a unique name is generated (create=True only)
+        :param slots: (int) number of frames the ring can hold (ignored when attaching)
+        :param slot_size: (int) max. size of one frame in bytes (ignored when attaching)
+        :param create: (bool) True for the producer creating the ring, False for attaching to an existing ring
+        """
+        from multiprocessing import shared_memory
+        self._owner = create
+        if create:
+            if slots < 2:
+                raise ValueError("A frame ring needs at least 2 slots.")
+            size = self._RING_HEADER_SIZE + slots * (self._SLOT_HEADER_SIZE + slot_size)
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._RING_HEADER.pack_into(self._shm.buf, 0, self.MAGIC, 1, slots, slot_size, 0)
+            FrameRing._created.add(self._shm._name)
+        else:
+            self._shm = self._attach(name)
+            magic, _, slots, slot_size, _ = self._RING_HEADER.unpack_from(self._shm.buf, 0)
+            if magic != self.MAGIC:
+                self._shm.close()
+                raise ValueError("Shared memory block {} is not a frame ring.".format(name))
+        self.slots = slots
+        self.slot_size = slot_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    @staticmethod
+    def _attach(name):
+        from multiprocessing import shared_memory
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name=name, create=False, track=False)
+        # Python < 3.13 registers every attached block at the resource tracker, which would
+        # remove the ring when the reader process exits. Undo the registration for readers.
+        # The tracker keeps one registration per name, so a ring created by this process keeps it.
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        if shm._name not in FrameRing._created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the shared memory block. Pass it to the worker processes for attaching to the ring.
+
+        :return: (str) shared memory name
+        """
+        return self._shm.name
+
+    @property
+    def sequence(self) -> int:
+        """
+        Sequence number of the newest frame in the ring. 0 if no frame was written yet.
+
+        :return: (int) sequence number
+        """
+        return self._RING_HEADER.unpack_from(self._shm.buf, 0)[4]
+
+    def _slot_offset(self, sequence):
+        return self._RING_HEADER_SIZE + (sequence % self.slots) * (self._SLOT_HEADER_SIZE + self.slot_size)
+
+    def write(self, data) -> int:
+        """
+        Write the raw chunk bytes of one frame into the next slot. Never blocks, the oldest frame is overwritten.
+
+        :param data: (bytes) raw image chunks of one frame
+        :return: (int) sequence number of the written frame
+        """
+        length = len(data)
+        if length > self.slot_size:
+            raise ValueError("Frame with {} bytes does not fit into a slot of {} bytes."
+                             .format(length, self.slot_size))
+        buf = self._shm.buf
+        sequence = self.sequence + 1
+        offset = self._slot_offset(sequence)
+        # mark slot as being written, readers compare begin and end sequence
+        struct.pack_into("<Q", buf, offset, sequence)
+        start = offset + self._SLOT_HEADER_SIZE
+        buf[start:start + length] = data
+        self._SLOT_HEADER.pack_into(buf, offset, sequence, sequence, length, time.time())
+        self._RING_HEADER.pack_into(buf, 0, self.MAGIC, 1, self.slots, self.slot_size, sequence)
+        return sequence
+
+    def _read_slot(self, sequence):
+        offset = self._slot_offset(sequence)
+        begin, end, length, timestamp = self._SLOT_HEADER.unpack_from(self._shm.buf, offset)
+        if begin != sequence or end != sequence:
+            return None
+        start = offset + self._SLOT_HEADER_SIZE
+        return timestamp, self._shm.buf[start:start + length]
+
+    def _slot_sequence(self, sequence):
+        return struct.unpack_from("<Q", self._shm.buf, self._slot_offset(sequence))[0]
+
+    def reader(self):
+        """
+        Create a reader which starts with the next frame written into this ring.
+
+        :return: FrameRingReader object
+        """
+        return FrameRingReader(ring=self)
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory. All frames and views returned by readers become invalid.
+
+        :return: None
+        """
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """
+        Remove the shared memory block. Must be called once by the producer.
+
+        :return: None
+        """
+        self._shm.unlink()
+        FrameRing._created.discard(self._shm._name)
+
+
+class FrameRingReader(object):
+    """
+    Sequential reader of a FrameRing. Detects when the producer overtook the reader
+    and skips ahead to the newest frame instead of blocking the producer.
+    """
+
+    def __init__(self, ring, start_sequence=None):
+        self._ring = ring
+        self.next_sequence = ring.sequence + 1 if start_sequence is None else start_sequence
+        self.skipped_frames = 0
+
+    def is_valid(self, frame: Frame) -> bool:
+        """
+        Check that the slot of a frame was not overwritten in the meantime.
+        Call it after processing the frame views to make sure that the processed data was consistent.
+
+        :param frame: Frame object
+        :return: (bool) True if frame data is still valid
+        """
+        return self._ring._slot_sequence(frame.sequence) == frame.sequence
+
+    def read_next(self, timeout=None, poll_interval=0.001) -> [Frame, None]:
+        """
+        Read the next frame from the ring. Waits for the producer if no new frame is available.
+
+        :param timeout: (float) max. time to wait in seconds. None waits forever.
+        :param poll_interval: (float) sleep time in seconds between checks for a new frame
+        :return: Frame object or None if timeout elapsed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            newest = self._ring.sequence
+            if newest >= self.next_sequence:
+                if newest - self.next_sequence >= self._ring.slots - 1:
+                    # producer overtook us, skip to the newest frame
+                    self.skipped_frames += newest - self.next_sequence
+                    self.next_sequence = newest
+                sequence = self.next_sequence
+                slot = self._ring._read_slot(sequence)
+                if slot is not None:
+                    self.next_sequence = sequence + 1
+                    timestamp, data = slot
+                    return Frame(sequence=sequence, timestamp=timestamp, data=data,
+                                 images=self._split_chunks(data))
+                # slot was overwritten while reading, try again with a newer frame
+                self.skipped_frames += 1
+                self.next_sequence = sequence + 1
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _split_chunks(data):
+        """
+        Split the raw frame data into image chunks without copying them.
+
+        :param data: (memoryview) raw image chunks of one frame
+        :return: (list) [header, image] pairs. Uncompressed images are 2D uint8 arrays,
+                 JPEG images are 1D uint8 arrays with the compressed data.
+        """
+        import numpy as np
+        images = []
+        offset = 0
+        length = len(data)
+        while offset < length:
+            header = {}
+            for key, value in serialization_format.items():
+                header[value[0]] = struct.unpack_from('<i', data, offset + key)[0]
+            if header['CHUNK_SIZE'] <= 0:
+                break
+            payload = data[offset + header['HEADER_SIZE']:offset + header['CHUNK_SIZE']]
+            image = np.frombuffer(payload, dtype=np.uint8)
+            if header['CHUNK_TYPE'] == ChunkType.MONOCHROME_2D_8BIT:
+                image = image.reshape((header["IMAGE_HEIGHT"], header["IMAGE_WIDTH"]))
+            images.append([header, image])
+            offset += header['CHUNK_SIZE']
+        return images
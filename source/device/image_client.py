@@ -1,27 +1,61 @@
 from __future__ import (absolute_import, division, print_function)
 from builtins import *
 from .client import O2x5xxPCICDevice
-from ..static.formats import serialization_format, ChunkType
+from ..static.formats import serialization_format
+from ..pcic.utils import check_preview_scale, decode_image_chunk
 from ..static.configs import images_config
+import threading
+import select
+import socket
 import struct
-import io
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
-import numpy as np
+import copy
 
 
 SOCKET_TIMEOUT = 10
+IMAGE_FORMATS = {"jpeg": "jpeg_image", "raw": "raw_image"}
 
 
 class ImageClient(O2x5xxPCICDevice):
-	def __init__(self, address, port, timeout=SOCKET_TIMEOUT):
+	def __init__(self, address, port, timeout=SOCKET_TIMEOUT, frame_ring=None, image_ids=None, image_formats=None,
+				 latest_frame=False, preview_scale=1):
+		"""
+		:param address: (str) IP address of the device
+		:param port: (int) PCIC port
+		:param timeout: (float) socket timeout in seconds
+		:param frame_ring: (FrameRing) optional shared memory ring. The raw image chunks of every frame
+						   are written into the ring for reading them in other processes.
+		:param image_ids: (list) IDs of the images which should be decoded, e.g. [1, 3].
+						  None decodes all images of the application.
+		:param image_formats: (list) image formats which should be sent by the device: "jpeg" and/or "raw".
+							  None sends both formats.
+		:param latest_frame: (bool) if True, a background thread reads the PCIC output and keeps only the newest
+							 frame. read_next_frames() then always returns the current frame and older frames
+							 which were not read in time are dropped. No other PCIC commands may be sent
+							 while the background reader is running.
+		:param preview_scale: (int) downscaling factor for the frames: 1 (full resolution), 2, 4 or 8.
+							  JPEG images are reduced while decoding, which is much faster for previews.
+		"""
+		check_preview_scale(preview_scale)
 		super(ImageClient, self).__init__(address=address, port=port, timeout=timeout)
+		self.preview_scale = preview_scale
+		self.frame_ring = frame_ring
+		self.frame_sequence = 0
+		self.dropped_frames = 0
+		self._latest_frame_data = None
+		self._latest_frame_sequence = 0
+		self._latest_frame_error = None
+		self._latest_frame_condition = threading.Condition()
+		self._latest_frame_thread = None
+		self._latest_frame_stop = threading.Event()
+		self._subscribed_image_IDs = None if image_ids is None else [str(i) for i in image_ids]
+		self._chunk_indices = None
+		self._chunk_images = None
 
 		# disable all result output
 		self.turn_process_interface_output_on_or_off(0)
 
 		# format string for all images
-		answer = self.upload_process_interface_output_configuration(images_config)
+		answer = self.upload_process_interface_output_configuration(self._images_config(image_formats))
 		if answer != "*":
 			raise
 
@@ -30,11 +64,65 @@ class ImageClient(O2x5xxPCICDevice):
 
 		# read the image ids
 		self.image_IDs = self.read_image_ids()
+		if self._subscribed_image_IDs is not None:
+			unknown = [i for i in self._subscribed_image_IDs if i not in self.image_IDs]
+			if unknown:
+				raise ValueError("Image ID(s) {} not available. Available image IDs: {}"
+								 .format(unknown, self.image_IDs))
+			# every image blob (jpeg and/or raw) contains one image chunk per image ID in the order of the image IDs
+			self._chunk_indices = {idx for idx, image_id in enumerate(self.image_IDs)
+								   if image_id in self._subscribed_image_IDs}
+			self._chunk_images = len(self.image_IDs)
+			self.image_IDs = [i for i in self.image_IDs if i in self._subscribed_image_IDs]
 
 		# read first frames
 		self.frames = []
 		self.read_next_frames()
 
+		if latest_frame:
+			self._latest_frame_sequence = self.frame_sequence
+			self._latest_frame_thread = threading.Thread(target=self._read_latest_frames, daemon=True,
+														 name="ImageClient_latest_frame_{}".format(address))
+			self._latest_frame_thread.start()
+
+	def close(self):
+		"""
+		Stop the latest frame reader if it is running and close the socket session with the device.
+
+		:return: None
+		"""
+		self._latest_frame_stop.set()
+		if self.connected and self._latest_frame_thread:
+			# unblock the reader thread waiting for the next result
+			try:
+				self.pcicSocket.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+		super(ImageClient, self).close()
+		if self._latest_frame_thread and self._latest_frame_thread is not threading.current_thread():
+			self._latest_frame_thread.join()
+		self._latest_frame_thread = None
+
+	@staticmethod
+	def _images_config(image_formats=None):
+		"""
+		Create the PCIC output configuration for the selected image formats.
+		Image blobs of formats which are not selected are not sent by the device.
+
+		:param image_formats: (list) "jpeg" and/or "raw". None selects both formats.
+		:return: (dict) PCIC output configuration
+		"""
+		if image_formats is None:
+			return images_config
+		unknown = [f for f in image_formats if f not in IMAGE_FORMATS]
+		if unknown or not image_formats:
+			raise ValueError("Invalid image format(s) {}. Choose from {}".format(unknown, list(IMAGE_FORMATS)))
+		blob_ids = [IMAGE_FORMATS[f] for f in image_formats]
+		config = copy.deepcopy(images_config)
+		blobs = config["elements"][-1]
+		blobs["elements"] = [e for e in blobs["elements"] if e["id"] in blob_ids]
+		return config
+
 	@property
 	def number_images(self):
 		"""
@@ -62,70 +150,159 @@ class ImageClient(O2x5xxPCICDevice):
 			return ids.split(';')[0:-1]
 
 	@staticmethod
-	def _deserialize_image_chunk(data):
+	def _deserialize_image_chunk(data, indices=None, scale=1, images=None):
 		"""
 		Function for deserializing the PCIC image output.
 
 		:param data: PCIC image output
+		:param indices: (set) indices of the image chunks which should be decoded. None decodes all chunks.
+		:param scale: (int) downscaling factor for the images: 1 (full resolution), 2, 4 or 8
+		:param images: (int) number of image IDs. If set, indices are the positions of the image IDs and the
+					   chunks are assigned to them per image blob, e.g. JPEG and raw chunks of every image.
 		:return: deserialized results
 		"""
+		chunks = []
+		offset = 0
+		while offset < len(data):
+			chunk_size = struct.unpack_from('<i', data, offset + 0x0004)[0]
+			if chunk_size <= 0 or offset + chunk_size > len(data):
+				raise ValueError("Invalid image chunk size {} at offset {}".format(chunk_size, offset))
+			chunks.append((offset, chunk_size))
+			offset += chunk_size
+		if images and len(chunks) % images:
+			raise ValueError("{} image chunks do not match the {} image IDs of the result"
+							 .format(len(chunks), images))
+
 		results = {}
-		length = len(data)
-		counter = 0
+		for counter, (offset, chunk_size) in enumerate(chunks):
+			position = counter % images if images else counter
+			if indices is not None and position not in indices:
+				continue
+			chunk = data[offset:offset + chunk_size]
 
-		while length:
 			# get header information
 			header = {}
 			for key, value in serialization_format.items():
-				hex_val = data[key: key + value[2]]
+				hex_val = chunk[key: key + value[2]]
 				dec_val = struct.unpack('<i', hex_val)[0]
 				header[value[0]] = dec_val
 
 			# append header
 			results.setdefault(counter, []).append(header)
 			# append image
-			image_hex = data[header['HEADER_SIZE']:header['CHUNK_SIZE']]
-			chunk_type = int(header['CHUNK_TYPE'])
+			image_hex = chunk[header['HEADER_SIZE']:header['CHUNK_SIZE']]
 			# check end decode image depending on chunk type
-			if chunk_type == ChunkType.JPEG_IMAGE:
-				# Check that we have received chunk type JPEG_IMAGE
-				# Convert jpeg data to image data
-				image = mpimg.imread(io.BytesIO(image_hex), format='jpg')
-				results[counter].append(image)
-			elif chunk_type == ChunkType.MONOCHROME_2D_8BIT:
-				# Check that we have received chunk type MONOCHROME_2D_8BIT
-				# Read pixel data and reshape to width/height
-				image = np.frombuffer(image_hex, dtype=np.uint8) \
-					.reshape((header["IMAGE_HEIGHT"], header["IMAGE_WIDTH"]))
-				results[counter].append(image)
-			else:
-				image = None
+			image = decode_image_chunk(header, image_hex, scale=scale)
+			if image is None:
 				print("Unknown image chunk type", header['CHUNK_TYPE'])
 			results[counter].append(image)
 
-			length -= header['CHUNK_SIZE']
-			data = data[header['CHUNK_SIZE']:]
-			counter += 1
-
 		return results
 
-	def read_next_frames(self):
+	@property
+	def latest_frame_mode(self) -> bool:
+		"""
+		State of the latest frame mode.
+
+		:return: (bool) True if a background thread keeps the newest frame
+		"""
+		return self._latest_frame_thread is not None
+
+	def _read_latest_frames(self):
+		"""
+		Background reader of the latest frame mode. Keeps only the newest frame in a single slot
+		and counts frames which were overwritten before they were read. The reader only waits between
+		the frames, a timeout within a frame would desynchronize the PCIC stream and stops the reader.
+
+		:return: None
+		"""
+		while not self._latest_frame_stop.is_set():
+			try:
+				if not select.select([self.pcicSocket], [], [], 0.1)[0]:
+					# no frame started yet
+					continue
+				data = self._read_next_chunk_data()
+			except Exception as e:
+				with self._latest_frame_condition:
+					if not self._latest_frame_stop.is_set():
+						self._latest_frame_error = e
+					self._latest_frame_condition.notify_all()
+				return
+			if data is None:
+				continue
+			with self._latest_frame_condition:
+				if self._latest_frame_sequence > self.frame_sequence:
+					self.dropped_frames += 1
+				self._latest_frame_data = data
+				self._latest_frame_sequence += 1
+				self._latest_frame_condition.notify_all()
+
+	def _wait_latest_frame(self, block=True, timeout=None):
+		"""
+		Take the newest frame of the latest frame mode if it was not read yet.
+
+		:param block: (bool) wait for a new frame if the newest frame was already read
+		:param timeout: (float) max. time to wait in seconds. None waits forever.
+		:return: (bytes) raw image chunks or None if no new frame is available
+		"""
+		with self._latest_frame_condition:
+			if block:
+				self._latest_frame_condition.wait_for(
+					lambda: self._latest_frame_sequence > self.frame_sequence or self._latest_frame_error
+					or not self._latest_frame_thread, timeout=timeout)
+			if self._latest_frame_sequence > self.frame_sequence:
+				self.frame_sequence = self._latest_frame_sequence
+				return self._latest_frame_data
+			if self._latest_frame_error:
+				raise self._latest_frame_error
+			return None
+
+	def read_next_frames(self, block=True, timeout=None):
 		"""
 		Function for reading next asynchronous frames.
 		Frames are stored in property self.frames
 
+		:param block: (bool) only used in latest frame mode: wait for a new frame if the newest
+					  frame was already read. With False the frames are kept if no new frame is available.
+		:param timeout: (float) only used in latest frame mode: max. time in seconds to wait for a new frame
 		:return: None
 		"""
+		if self.latest_frame_mode:
+			data = self._wait_latest_frame(block=block, timeout=timeout)
+		else:
+			data = self._read_next_chunk_data()
+			if data is not None:
+				self.frame_sequence += 1
+		if data is None:
+			return
+		if not data:
+			self.frames = []
+			return
+		result = self._deserialize_image_chunk(data=data, indices=self._chunk_indices, scale=self.preview_scale,
+											   images=self._chunk_images)
+		self.frames = [result[i][1] for i in result]
+
+	def _read_next_chunk_data(self):
+		"""
+		Read the next asynchronous result and cut off the image chunks.
+		The image chunks are published into the frame ring if one is set.
+
+		:return: (bytes) raw image chunks, empty bytes if result is invalid
+				 or None if the result is no asynchronous output
+		"""
 		# look for asynchronous output
 		ticket, answer = self.read_next_answer()
 
-		if ticket == b"0000":
-			delimiter = answer.find(b'stop')
-			if delimiter == -1:
-				print("stop identifier not found in result")
-				self.frames = []
-			result = self._deserialize_image_chunk(data=answer[delimiter+4:])
-			self.frames = [result[i][1] for i in result]
+		if ticket != b"0000":
+			return None
+		delimiter = answer.find(b'stop')
+		if delimiter == -1:
+			print("stop identifier not found in result")
+			return b""
+		data = answer[delimiter+4:]
+		if self.frame_ring is not None:
+			self.frame_ring.write(data)
+		return data
 
 	def make_figure(self, idx):
 		"""
@@ -140,6 +317,8 @@ class ImageClient(O2x5xxPCICDevice):
 						- &lt;ax>: AxesSubplot instance of figure object <br />
 						- &lt;im>: AxesImage instance of figure object
 		"""
+		# matplotlib is only required for figures and imported on first use
+		import matplotlib.pyplot as plt
 		if idx+1 > self.number_images:
 			raise ValueError("Only {} images available. Use an idx value between 0 and {}".format(self.number_images, self.number_images-1))
 		fig = plt.figure()
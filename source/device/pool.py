@@ -0,0 +1,349 @@
+from .client import O2x5xxDeviceV2
+from ..pcic import SOCKET_TIMEOUT
+from contextlib import contextmanager
+import collections
+import select
+import socket
+import threading
+import time
+
+# PCIC error state of the device if the maximum number of connections is exceeded
+MAX_CONNECTIONS_EXCEEDED = 100000001
+# time in seconds after which the pool tries again to open more connections than the device accepted
+CONNECTION_LIMIT_RETRY = 30.0
+
+
+def pcic_alive(handle) -> bool:
+    """
+    Check without a round trip if the PCIC connection of a device handle is still open.
+
+    :param handle: (O2x5xxDeviceV2) device handle
+    :return: (bool) True if the connection is open
+    """
+    client = handle.pcic
+    if not client.connected or client.pcicSocket is None:
+        return False
+    try:
+        readable, _, _ = select.select([client.pcicSocket], [], [], 0)
+        if not readable:
+            return True
+        # a readable socket without data was closed by the device
+        return len(client.pcicSocket.recv(1, socket.MSG_PEEK)) > 0
+    except (OSError, ValueError):
+        return False
+
+
+class ConnectionLimitError(ConnectionError):
+    """
+    Raised if the device does not accept a further PCIC connection (error 100000001).
+    """
+
+
+def check_connection_limit(handle) -> None:
+    """
+    Check with the error state of a new PCIC connection whether the device accepted it. Beyond its max. number of
+    connections the device reports the error state 100000001 or closes the connection.
+
+    :param handle: (O2x5xxDeviceV2) device handle with connected PCIC client
+    :return: None
+    """
+    try:
+        state = handle.pcic.request_current_error_state()
+    except (ConnectionError, RuntimeError) as e:
+        raise ConnectionLimitError("The device closed the new connection: {}".format(e)) from e
+    if state.isnumeric() and int(state) == MAX_CONNECTIONS_EXCEEDED:
+        raise ConnectionLimitError("Maximum number of connections exceeded (error {}).".format(state))
+
+
+def _connection_limit_exceeded(error) -> bool:
+    return isinstance(error, (ConnectionLimitError, ConnectionRefusedError))
+
+
+class _DeviceSlot(object):
+    def __init__(self):
+        # idle handles as (handle, time of the checkin), the most recently used handle last
+        self.idle = collections.deque()
+        # number of open handles, idle and checked out
+        self.count = 0
+        # number of connections the device accepted before it rejected one and the time of it
+        self.limit = None
+        self.limited = 0.0
+        self.hits = 0
+        self.misses = 0
+
+
+class DevicePool(object):
+    """
+    Thread-safe pool of open device handles (O2x5xxDeviceV2 with PCIC and RPC client) keyed by address.
+
+    Checked in handles stay connected and are lent out again, so requests do not pay for the TCP connect,
+    the proxy setup and the metadata lookup every time. A handle is checked with health_check before it is
+    lent out, handles which were idle for idle_timeout seconds are closed and at most max_per_device handles
+    are opened per device, because the device rejects further connections (error 100000001). New handles are
+    checked with check_connection_limit(). If the device rejects a connection earlier (e.g. used by other
+    clients), the pool waits for its own handles until a handle is closed or limit_retry seconds passed, e.g.
+
+        pool = DevicePool(max_per_device=2)
+        with pool.device("192.168.0.69") as device:
+            device.pcic.execute_asynchronous_trigger()
+            name = device.rpc.getParameter("Name")
+        print(pool.statistics)
+    """
+
+    def __init__(self, port=50010, max_per_device=2, idle_timeout=60.0, checkout_timeout=10.0,
+                 timeout=SOCKET_TIMEOUT, warmup_rpc=True, health_check=pcic_alive, device_factory=None):
+        """
+        :param port: (int) PCIC port of the devices
+        :param max_per_device: (int) max. number of open handles per device
+        :param idle_timeout: (float) handles which were not used for this time in seconds are closed.
+                             None keeps them open.
+        :param checkout_timeout: (float) max. time in seconds to wait for a free handle. None waits forever.
+        :param timeout: (float) socket timeout of the handles in seconds
+        :param warmup_rpc: (bool) create the RPC client of new handles in the background
+        :param health_check: (callable) returns True if a handle can be lent out, None disables the check
+        :param device_factory: (callable) creates a handle with the argument address. It raises ConnectionLimitError
+                               if the device rejects the connection, e.g. with check_connection_limit().
+        """
+        if max_per_device < 1:
+            raise ValueError("max_per_device must be at least 1.")
+        self.port = port
+        self.max_per_device = max_per_device
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.timeout = timeout
+        self.warmup_rpc = warmup_rpc
+        self.health_check = health_check
+        self.device_factory = device_factory or self._create
+        self.limit_retry = CONNECTION_LIMIT_RETRY
+        self._slots = {}
+        self._owner = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self.created = 0
+        self.evicted = 0
+        self.discarded = 0
+        self.waits = 0
+        self.checkouts = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _create(self, address):
+        handle = O2x5xxDeviceV2(address=address, port=self.port, autoconnect=True, timeout=self.timeout,
+                                warmup=self.warmup_rpc)
+        try:
+            check_connection_limit(handle)
+        except Exception:
+            self._close_handle(handle)
+            raise
+        return handle
+
+    @staticmethod
+    def _close_handle(handle):
+        try:
+            handle.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _evict_idle(self, now) -> list:
+        # called with the lock held, returns the handles which have to be closed
+        expired = []
+        if self.idle_timeout is None:
+            return expired
+        for slot in self._slots.values():
+            while slot.idle and now - slot.idle[0][1] >= self.idle_timeout:
+                expired.append(slot.idle.popleft()[0])
+                slot.count -= 1
+                # connections were released, the device may accept more again
+                slot.limit = None
+        self.evicted += len(expired)
+        if expired:
+            self._condition.notify_all()
+        return expired
+
+    def checkout(self, address: str, timeout: float = -1):
+        """
+        Lend out an open handle of the device. Return it with checkin() after use.
+
+        :param address: (str) IP address of the device
+        :param timeout: (float) max. time in seconds to wait for a free handle. Default: checkout_timeout
+        :return: (O2x5xxDeviceV2) device handle
+        """
+        start = time.monotonic()
+        timeout = self.checkout_timeout if timeout == -1 else timeout
+        deadline = None if timeout is None else start + timeout
+        while True:
+            handle = None
+            create = False
+            timed_out = False
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Device pool is closed.")
+                expired = self._evict_idle(time.monotonic())
+                slot = self._slots.setdefault(address, _DeviceSlot())
+                if slot.limit is not None and time.monotonic() - slot.limited >= self.limit_retry:
+                    # other clients may have closed their connections in the meantime
+                    slot.limit = None
+                if slot.idle:
+                    handle = slot.idle.pop()[0]
+                elif slot.count < min(self.max_per_device, slot.limit or self.max_per_device):
+                    slot.count += 1
+                    create = True
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        timed_out = True
+                    else:
+                        self.waits += 1
+                        self._condition.wait(remaining)
+            for expired_handle in expired:
+                self._close_handle(expired_handle)
+            if timed_out:
+                raise TimeoutError("No handle of device {} available within {} seconds (max_per_device={})."
+                                   .format(address, timeout, self.max_per_device))
+            if create:
+                try:
+                    handle = self.device_factory(address=address)
+                except Exception as e:
+                    with self._condition:
+                        slot.count -= 1
+                        self._condition.notify_all()
+                        if not (_connection_limit_exceeded(e) and slot.count > 0):
+                            raise
+                        # the device has no free connection (e.g. used by other clients), wait for a handle
+                        # of this pool instead of opening further connections
+                        slot.limit = slot.count
+                        slot.limited = time.monotonic()
+                    continue
+                with self._condition:
+                    slot.misses += 1
+                    self.created += 1
+            elif handle is not None:
+                if self.health_check is not None and not self.health_check(handle):
+                    self._close_handle(handle)
+                    with self._condition:
+                        slot.count -= 1
+                        slot.limit = None
+                        self.discarded += 1
+                        self._condition.notify_all()
+                    continue
+                with self._condition:
+                    slot.hits += 1
+            else:
+                continue
+            latency = time.monotonic() - start
+            with self._condition:
+                self._owner[id(handle)] = address
+                self.checkouts += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+            return handle
+
+    def checkin(self, handle, discard: bool = False) -> None:
+        """
+        Return a handle to the pool.
+
+        :param handle: (O2x5xxDeviceV2) device handle returned by checkout()
+        :param discard: (bool) close the handle instead of keeping it, e.g. after a connection error
+        :return: None
+        """
+        with self._condition:
+            address = self._owner.pop(id(handle), None)
+            if address is None:
+                raise ValueError("The handle was not checked out from this pool.")
+            slot = self._slots[address]
+            if discard or self._closed:
+                slot.count -= 1
+                slot.limit = None
+                self.discarded += int(discard)
+            else:
+                slot.idle.append((handle, time.monotonic()))
+                handle = None
+            self._condition.notify_all()
+        if handle is not None:
+            self._close_handle(handle)
+
+    @contextmanager
+    def device(self, address: str, timeout: float = -1):
+        """
+        Lend out a handle of the device for the with statement. The handle is closed instead of returned
+        to the pool if a connection error occurred.
+
+        :param address: (str) IP address of the device
+        :param timeout: (float) max. time in seconds to wait for a free handle. Default: checkout_timeout
+        :return: (O2x5xxDeviceV2) device handle
+        """
+        handle = self.checkout(address, timeout=timeout)
+        try:
+            yield handle
+        except (OSError, EOFError, RuntimeError):
+            self.checkin(handle, discard=True)
+            raise
+        except BaseException:
+            self.checkin(handle)
+            raise
+        else:
+            self.checkin(handle)
+
+    def warm(self, address: str, count: int = 1) -> None:
+        """
+        Open handles of a device in advance, so the first requests find them in the pool.
+
+        :param address: (str) IP address of the device
+        :param count: (int) number of handles, at most max_per_device
+        :return: None
+        """
+        handles = [self.checkout(address) for _ in range(min(count, self.max_per_device))]
+        for handle in handles:
+            self.checkin(handle)
+
+    def evict_idle(self) -> int:
+        """
+        Close the handles which were idle for idle_timeout seconds.
+
+        :return: (int) number of closed handles
+        """
+        with self._condition:
+            expired = self._evict_idle(time.monotonic())
+        for handle in expired:
+            self._close_handle(handle)
+        return len(expired)
+
+    def close(self) -> None:
+        """
+        Close all idle handles. Checked out handles are closed when they are returned.
+
+        :return: None
+        """
+        with self._condition:
+            self._closed = True
+            idle = []
+            for slot in self._slots.values():
+                idle.extend(handle for handle, _ in slot.idle)
+                slot.count -= len(slot.idle)
+                slot.idle.clear()
+            self._condition.notify_all()
+        for handle in idle:
+            self._close_handle(handle)
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: (dict) pool hits and misses, opened, evicted and discarded handles, checkout latency in seconds
+                 and the number of open and idle handles per device
+        """
+        with self._condition:
+            hits = sum(slot.hits for slot in self._slots.values())
+            misses = sum(slot.misses for slot in self._slots.values())
+            return {"hits": hits, "misses": misses, "created": self.created, "evicted": self.evicted,
+                    "discarded": self.discarded, "waits": self.waits, "checkouts": self.checkouts,
+                    "latency_avg": self._latency_total / self.checkouts if self.checkouts else 0.0,
+                    "latency_max": self._latency_max,
+                    "devices": {address: {"open": slot.count, "idle": len(slot.idle), "hits": slot.hits,
+                                          "misses": slot.misses}
+                                for address, slot in self._slots.items()}}
@@ -0,0 +1,2 @@
+from .limiter import *
+from .updater import *
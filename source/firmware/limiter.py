@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class BandwidthLimiter(object):
+    """
+    Token bucket limiting the number of bytes per second which are sent by all uploads sharing the limiter,
+    e.g. one limiter for all devices of a fleet update keeps the total upload rate below the given rate.
+    """
+
+    def __init__(self, rate: float = None, burst: float = None):
+        """
+        :param rate: (float) max. bytes per second. None does not limit the bandwidth.
+        :param burst: (float) max. number of bytes which can be sent at once after an idle time.
+                      The default is the number of bytes of one second.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("The rate must be greater than 0.")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+        self.consumed = 0
+
+    def consume(self, amount: int) -> float:
+        """
+        Take the tokens for sending amount bytes. Blocks until the bytes may be sent.
+
+        :param amount: (int) number of bytes
+        :return: (float) time in seconds the call was blocked
+        """
+        with self._lock:
+            self.consumed += amount
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._timestamp) * self.rate)
+            self._timestamp = now
+            # the tokens are reserved before waiting, so parallel uploads are served in order
+            self._tokens -= amount
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,322 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ..rpc.progress import ProgressWaiter
+from ..rpc.fleet import DeviceResult
+from .limiter import BandwidthLimiter
+import enum
+import http.client
+import json
+import os
+import threading
+import time
+
+SOCKET_TIMEOUT = 10
+CHUNK_SIZE = 64 * 1024
+RECOVERY_PORT = 8080
+
+
+class DeviceMode(enum.Enum):
+    PRODUCTIVE = "PRODUCTIVE-MODE"
+    BOOTING = "BOOTING"
+    RECOVERY = "RECOVERY-MODE"
+
+
+class UpdateJournal(object):
+    """
+    Persistent record of the update files which were already installed per device.
+    An interrupted fleet update started again with the same journal skips the installed files.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: (str) JSON file of the journal, loaded if it exists. None keeps the journal in memory only.
+        """
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def fileKey(updateFile: str) -> str:
+        """
+        :param updateFile: (str) path of the update file
+        :return: (str) key of the file in the journal, built from file name and size
+        """
+        return "{}:{}".format(os.path.basename(updateFile), os.path.getsize(updateFile))
+
+    def isInstalled(self, address: str, updateFile: str) -> bool:
+        with self._lock:
+            return self.fileKey(updateFile) in self._entries.get(address, {}).get("installed", [])
+
+    def setInstalled(self, address: str, updateFile: str) -> None:
+        with self._lock:
+            entry = self._entries.setdefault(address, {"installed": [], "finished": False})
+            entry["installed"].append(self.fileKey(updateFile))
+        self.save()
+
+    def isFinished(self, address: str) -> bool:
+        with self._lock:
+            return self._entries.get(address, {}).get("finished", False)
+
+    def setFinished(self, address: str, finished: bool = True) -> None:
+        with self._lock:
+            self._entries.setdefault(address, {"installed": [], "finished": False})["finished"] = finished
+        self.save()
+
+    def save(self) -> None:
+        """
+        Write the journal to the JSON file.
+
+        :return: None
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries, indent=2, sort_keys=True)
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w") as f:
+            f.write(data)
+        os.replace(tmpPath, self.path)
+
+
+class FirmwareUpdater(object):
+    """
+    Installs SWU update files on one device.
+
+    The device is booted into the recovery mode, the update files are streamed in chunks to the recovery system
+    and the device is booted into the productive mode again. The boot states are polled with a short interval at
+    the beginning and a growing interval later, failed uploads are repeated after the device is reachable again.
+    """
+
+    def __init__(self, address="192.168.0.69", timeout=SOCKET_TIMEOUT, limiter: BandwidthLimiter = None,
+                 journal: UpdateJournal = None, recovery_port=RECOVERY_PORT, chunk_size=CHUNK_SIZE):
+        """
+        :param address: (str) device address, optionally with the port of the productive web server
+        :param timeout: (float) socket timeout of the HTTP requests in seconds
+        :param limiter: (BandwidthLimiter) limiter of the upload rate, can be shared by several updaters
+        :param journal: (UpdateJournal) journal of the installed files, can be shared by several updaters
+        :param recovery_port: (int) port of the web server of the recovery system
+        :param chunk_size: (int) size of the chunks the update files are sent with in bytes
+        """
+        self.address = address
+        self.timeout = timeout
+        self.limiter = limiter if limiter is not None else BandwidthLimiter()
+        self.journal = journal if journal is not None else UpdateJournal()
+        self.recoveryHost = "{}:{}".format(address.split(":")[0], recovery_port)
+        self.chunk_size = chunk_size
+        self.cancel = threading.Event()
+
+    def _request(self, host, method, path, timeout=None, body=None, headers=None) -> tuple:
+        connection = http.client.HTTPConnection(host, timeout=self.timeout if timeout is None else timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def readDeviceMode(self) -> DeviceMode:
+        """
+        :return: (DeviceMode) current mode of the device, BOOTING if neither system is reachable
+        """
+        for host, path, mode in ((self.recoveryHost, "/", DeviceMode.RECOVERY),
+                                 (self.address, "/api/rpc/v1/com.ifm.efector", DeviceMode.PRODUCTIVE)):
+            try:
+                if self._request(host, "GET", path, timeout=1)[0] == 200:
+                    return mode
+            except (OSError, http.client.HTTPException):
+                pass
+        return DeviceMode.BOOTING
+
+    def bootRecoveryMode(self) -> None:
+        """
+        Reboot the device into the recovery mode, which is required for installing update files.
+
+        :return: None
+        """
+        if self.readDeviceMode() != DeviceMode.RECOVERY:
+            self._request(self.address, "POST", "/api/rpc/v1/com.ifm.efector?method=reboot&params=[1]")
+
+    def bootProductiveMode(self) -> None:
+        """
+        Reboot the device from the recovery mode into the productive mode.
+
+        :return: None
+        """
+        if self.readDeviceMode() != DeviceMode.PRODUCTIVE:
+            self._request(self.recoveryHost, "POST", "/reboot_to_live")
+
+    def waitForMode(self, mode: DeviceMode, timeout: float = None) -> None:
+        """
+        Block until the device is in the given mode.
+
+        :param mode: (DeviceMode) expected mode
+        :param timeout: (float) max. time to wait in seconds. None waits forever.
+        :return: None
+        """
+        waiter = ProgressWaiter(lambda: 1.0 if self.readDeviceMode() == mode else 0.0, timeout=timeout,
+                                cancel=self.cancel, minInterval=0.1, maxInterval=2.0)
+        waiter.wait()
+
+    def getUpdateStatus(self) -> dict:
+        """
+        :return: (dict) status of the recovery system with the keys "Status", "Error" and "Msg"
+        """
+        status, data = self._request(self.recoveryHost, "GET", "/getstatus.json")
+        if status != 200:
+            raise ConnectionError("Update status of {} not available (HTTP status {}).".format(self.address, status))
+        return json.loads(data)
+
+    def _installProgress(self) -> float:
+        result = self.getUpdateStatus()
+        if result["Error"] != "0":
+            raise RuntimeError("Error occurred during installation on {}: {}".format(self.address, result))
+        return 1.0 if result["Status"] == "3" else 0.0
+
+    def uploadFirmware(self, updateFile: str, timeout: float = None, callback=None) -> None:
+        """
+        Stream an update file in chunks to the recovery system and wait until it is installed.
+
+        :param updateFile: (str) path of the SWU file
+        :param timeout: (float) max. time in seconds to wait for the installation. None waits forever.
+        :param callback: (callable) called with the uploaded fraction of the file (0.0 to 1.0)
+        :return: None
+        """
+        size = os.path.getsize(updateFile)
+        connection = http.client.HTTPConnection(self.recoveryHost, timeout=self.timeout)
+        try:
+            connection.putrequest("POST", "/handle_post_request")
+            connection.putheader("Content-Type", "application/octet-stream")
+            connection.putheader("X_FILENAME", os.path.basename(updateFile))
+            connection.putheader("Content-Length", str(size))
+            connection.endheaders()
+            sent = 0
+            with open(updateFile, "rb") as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if self.cancel.is_set():
+                        raise InterruptedError("Upload to {} cancelled.".format(self.address))
+                    self.limiter.consume(len(chunk))
+                    connection.send(chunk)
+                    sent += len(chunk)
+                    if callback:
+                        callback(sent / size)
+            # the recovery system may answer only after the installation
+            connection.sock.settimeout(timeout)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise ConnectionError("Upload of {} to {} failed (HTTP status {})."
+                                      .format(updateFile, self.address, response.status))
+        finally:
+            connection.close()
+        ProgressWaiter(self._installProgress, timeout=timeout, cancel=self.cancel,
+                       minInterval=0.1, maxInterval=2.0).wait()
+
+    def install(self, updateFiles: list, timeout: float = None, retries: int = 2, callback=None) -> list:
+        """
+        Install update files: boot into recovery mode, upload every file which is not installed yet according to
+        the journal and boot into productive mode. An upload which fails with a network error is repeated after
+        the device is in the recovery mode again.
+
+        :param updateFiles: (list) paths of the SWU files
+        :param timeout: (float) max. time in seconds for every boot and every installation. None waits forever.
+        :param retries: (int) number of retries of a failed upload
+        :param callback: (callable) called with the update file and the uploaded fraction of the file
+        :return: (list) installed update files
+        """
+        installed = []
+        pending = [f for f in updateFiles if not self.journal.isInstalled(self.address, f)]
+        if pending:
+            self.journal.setFinished(self.address, False)
+            self.bootRecoveryMode()
+            self.waitForMode(DeviceMode.RECOVERY, timeout=timeout)
+        for updateFile in pending:
+            for attempt in range(retries + 1):
+                try:
+                    progress = (lambda fraction: callback(updateFile, fraction)) if callback else None
+                    self.uploadFirmware(updateFile, timeout=timeout, callback=progress)
+                    break
+                except (OSError, http.client.HTTPException):
+                    if attempt == retries or self.cancel.is_set():
+                        raise
+                    self.waitForMode(DeviceMode.RECOVERY, timeout=timeout)
+            self.journal.setInstalled(self.address, updateFile)
+            installed.append(updateFile)
+        if not self.journal.isFinished(self.address):
+            self.bootProductiveMode()
+            self.waitForMode(DeviceMode.PRODUCTIVE, timeout=timeout)
+            self.journal.setFinished(self.address)
+        return installed
+
+
+class FleetFirmwareUpdater(object):
+    """
+    Firmware update of many devices with a bounded number of worker threads and one bandwidth limit
+    for all uploads, e.g.
+
+        updater = FleetFirmwareUpdater(["192.168.0.69", "192.168.0.70"], ["O2D5xx_Firmware.swu"],
+                                       max_workers=8, bandwidth=10 * 1024 * 1024, journal="update.json")
+        results = updater.run()
+
+    Started again with the same journal after an interruption, devices which are already updated are skipped.
+    """
+
+    def __init__(self, addresses, updateFiles, max_workers=4, bandwidth: float = None, journal: str = None,
+                 timeout: float = 600.0, retries: int = 2, socket_timeout=SOCKET_TIMEOUT, recovery_port=RECOVERY_PORT):
+        """
+        :param addresses: (list) device addresses
+        :param updateFiles: (list) paths of the SWU files, installed in this order
+        :param max_workers: (int) max. number of devices which are updated at the same time
+        :param bandwidth: (float) max. total upload rate of all devices in bytes per second. None is unlimited.
+        :param journal: (str) JSON file of the UpdateJournal for resuming an interrupted update
+        :param timeout: (float) max. time in seconds for every boot and every installation. None waits forever.
+        :param retries: (int) number of retries of a failed upload
+        :param socket_timeout: (float) socket timeout of the HTTP requests in seconds
+        :param recovery_port: (int) port of the web server of the recovery system
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.addresses = list(addresses)
+        self.updateFiles = list(updateFiles)
+        self.max_workers = max_workers
+        self.limiter = BandwidthLimiter(rate=bandwidth)
+        self.journal = UpdateJournal(path=journal)
+        self.timeout = timeout
+        self.retries = retries
+        self.socket_timeout = socket_timeout
+        self.recovery_port = recovery_port
+        self.cancel = threading.Event()
+
+    def run(self, callback=None) -> list:
+        """
+        Update all devices.
+
+        :param callback: (callable) called with the DeviceResult of every finished device
+        :return: (list) DeviceResult of every device in the order of the addresses, path is the list of the
+                 installed update files
+        """
+        results = [DeviceResult(address=address, operation="firmware") for address in self.addresses]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="o2x5xx-firmware") as executor:
+            futures = [executor.submit(self._update, result) for result in results]
+            for future in as_completed(futures):
+                if callback:
+                    callback(future.result())
+        return results
+
+    def _update(self, result) -> DeviceResult:
+        result.started = time.monotonic()
+        result.attempts = 1
+        updater = FirmwareUpdater(address=result.address, timeout=self.socket_timeout, limiter=self.limiter,
+                                  journal=self.journal, recovery_port=self.recovery_port)
+        updater.cancel = self.cancel
+        try:
+            result.path = updater.install(self.updateFiles, timeout=self.timeout, retries=self.retries)
+            result.success = True
+        except Exception as e:
+            result.error = e
+        result.finished = time.monotonic()
+        return result
@@ -1,12 +1,10 @@
-from ..static.formats import error_codes, serialization_format, ChunkType
-import matplotlib.image as mpimg
-import numpy as np
+from ..static.formats import error_codes, serialization_format
+from .utils import check_preview_scale, decode_image_chunk
 import binascii
 import socket
 import struct
 import json
 import re
-import io
 
 SOCKET_TIMEOUT = 10
 
@@ -371,10 +369,10 @@ class O2x5xxPCICDevice(PCICV3Client):
         result = self.send_command('I{image_id}?'.format(image_id=image_id))
         return result
 
-    def request_last_image_taken_deserialized(self, image_id=1, datatype='ndarray'):
+    def request_last_image_taken_deserialized(self, image_id=1, datatype='ndarray', scale=1):
         """
         Request last image taken deserialized in image header and image data. Image data can be requested as bytes
-        or decoded as ndarray datatype.
+        or decoded as ndarray datatype. For previews the ndarray images can be decoded with reduced resolution.
 
         :param image_id: (int) 2 digits for the image type 
                          1: all JPEG images 
@@ -382,6 +380,8 @@ class O2x5xxPCICDevice(PCICV3Client):
         :param datatype: (str) image output as hex or ndarray datatype 
                          bytes: image(s) as bytes datatype 
                          ndarray: image(s) as ndarray datatype
+        :param scale: (int) downscaling factor for ndarray datatype: 1 (full resolution), 2, 4 or 8 
+                      JPEG images are reduced while decoding which is much faster than a full decoding.
         :return: Syntax: [<header>,<image data>] 
                  - <header> (dict) header of the image deserialized as dict object 
                  - <image data> image data / result data. The data is encapsulated
@@ -391,6 +391,7 @@ class O2x5xxPCICDevice(PCICV3Client):
                    not able to transfer images as JPG and vise versa)
                  - ? Invalid command length
         """
+        check_preview_scale(scale)
         results = {}
         result = self.request_last_image_taken(image_id)
         if str(result)[2:3] == "!":
@@ -411,19 +412,10 @@ class O2x5xxPCICDevice(PCICV3Client):
             results.setdefault(counter, []).append(header)
             # append image
             image_hex = data[header['HEADER_SIZE']:header['CHUNK_SIZE']]
-            chunk_type = int(header['CHUNK_TYPE'])
             # check end decode image depending on chunk type
             if datatype == 'ndarray':
-                if chunk_type == ChunkType.JPEG_IMAGE:
-                    # Check that we have received chunk type JPEG_IMAGE
-                    # Convert jpeg data to image data
-                    image = mpimg.imread(io.BytesIO(image_hex), format='jpg')
-                    results[counter].append(image)
-                elif chunk_type == ChunkType.MONOCHROME_2D_8BIT:
-                    # Check that we have received chunk type MONOCHROME_2D_8BIT
-                    # Read pixel data and reshape to width/height
-                    image = np.frombuffer(image_hex, dtype=np.uint8)\
-                        .reshape((header["IMAGE_HEIGHT"], header["IMAGE_WIDTH"]))
+                image = decode_image_chunk(header, image_hex, scale=scale)
+                if image is not None:
                     results[counter].append(image)
             elif datatype == 'bytes':
                 results[counter].append(image_hex)
@@ -0,0 +1,58 @@
+from ..static.formats import ChunkType
+import io
+
+PREVIEW_SCALES = (1, 2, 4, 8)
+
+
+def check_preview_scale(scale: int) -> None:
+    """
+    Check that the image can be decoded with the given downscaling factor.
+
+    :param scale: (int) downscaling factor 1, 2, 4 or 8
+    :return: None
+    """
+    if scale not in PREVIEW_SCALES:
+        raise ValueError("Invalid preview scale {}. Choose one of {}".format(scale, PREVIEW_SCALES))
+
+
+def decode_jpeg(data, scale=1) -> "np.ndarray":
+    """
+    Decode JPEG data into an image array. With a scale of 2, 4 or 8 the image is already reduced in the
+    DCT domain while decoding (Pillow draft mode), which is much faster than decoding the full image.
+
+    :param data: (bytes) JPEG data
+    :param scale: (int) downscaling factor 1 (full resolution), 2, 4 or 8
+    :return: (np.ndarray) decoded image
+    """
+    # Pillow and NumPy are imported on first use to keep the package import lightweight
+    from PIL import Image
+    import numpy as np
+    check_preview_scale(scale)
+    with Image.open(io.BytesIO(data)) as image:
+        if scale != 1:
+            image.draft(image.mode, (image.width // scale, image.height // scale))
+        return np.asarray(image)
+
+
+def decode_image_chunk(header, data, scale=1) -> ["np.ndarray", None]:
+    """
+    Decode the binary data of one image chunk depending on the chunk type.
+
+    :param header: (dict) deserialized chunk header
+    :param data: (bytes) binary data of the chunk without header
+    :param scale: (int) downscaling factor 1 (full resolution), 2, 4 or 8
+    :return: (np.ndarray) decoded image or None for unknown chunk types
+    """
+    chunk_type = int(header['CHUNK_TYPE'])
+    if chunk_type == ChunkType.JPEG_IMAGE:
+        # Convert jpeg data to image data
+        return decode_jpeg(data, scale=scale)
+    elif chunk_type == ChunkType.MONOCHROME_2D_8BIT:
+        import numpy as np
+        check_preview_scale(scale)
+        # Read pixel data and reshape to width/height
+        image = np.frombuffer(data, dtype=np.uint8).reshape((header["IMAGE_HEIGHT"], header["IMAGE_WIDTH"]))
+        if scale != 1:
+            image = image[::scale, ::scale]
+        return image
+    return None
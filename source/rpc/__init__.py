@@ -1 +1,6 @@
 from .client import *
+from .aio import *
+from .fleet import *
+from .configDiff import *
+from .archive import *
+from .simulation import *
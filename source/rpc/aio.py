@@ -0,0 +1,689 @@
+import asyncio
+import collections
+import json
+import urllib.parse
+import warnings
+import xmlrpc.client
+from contextlib import asynccontextmanager
+
+SOCKET_TIMEOUT = 10
+# time in seconds after which a failed auto heartbeat is repeated
+AUTO_HEARTBEAT_RETRY_INTERVAL = 1.0
+
+
+class _AsyncConnection(object):
+    """
+    HTTP/1.1 keep-alive connection to a device.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    async def request(self, host, path, body) -> bytes:
+        """
+        Send one POST request and read the complete response.
+
+        :param host: (str) value of the Host header
+        :param path: (str) path of the XML-RPC object
+        :param body: (bytes) XML-RPC request
+        :return: (bytes) response body
+        """
+        header = ("POST {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\nContent-Type: text/xml\r\n"
+                  "Content-Length: {}\r\n\r\n".format(path, host, xmlrpc.client.Transport.user_agent, len(body)))
+        self.writer.write(header.encode("ascii") + body)
+        await self.writer.drain()
+        statusLine = await self.reader.readline()
+        if not statusLine:
+            raise ConnectionResetError("Connection closed by {}".format(host))
+        version, status, reason = (statusLine.decode("iso-8859-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("iso-8859-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        self.requests += 1
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = await self._readChunked()
+        elif "content-length" in headers:
+            data = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close" or version == "HTTP/1.0":
+            self.close()
+        if status != "200":
+            raise xmlrpc.client.ProtocolError(host + path, int(status), reason, headers)
+        return data
+
+    async def _readChunked(self) -> bytes:
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # trailer
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    def close(self) -> None:
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class AsyncConnectionPool(object):
+    """
+    Pool of keep-alive HTTP/1.1 connections to one device for the asyncio client,
+    the asyncio counterpart of ConnectionPool.
+    """
+
+    def __init__(self, host, timeout=SOCKET_TIMEOUT, maxsize=4):
+        """
+        :param host: (str) device address, optionally with port ("192.168.0.69" or "192.168.0.69:80")
+        :param timeout: (float) timeout for opening new connections in seconds
+        :param maxsize: (int) max. number of connections which are opened to the device at the same time
+        """
+        if maxsize < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self.host = host
+        hostname, _, port = host.partition(":")
+        self._hostname = hostname
+        self._port = int(port) if port else 80
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._idle = collections.deque()
+        # created on first use, so the pool can be created outside of the event loop
+        self._slots = None
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.inUse = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Connection reuse metrics of the pool.
+
+        :return: (dict) number of created, reused and discarded connections, number of requests which had
+                 to wait for a free connection and number of idle and currently used connections
+        """
+        return {"created": self.created, "reused": self.reused, "discarded": self.discarded,
+                "waits": self.waits, "idle": len(self._idle), "inUse": self.inUse}
+
+    async def acquire(self) -> _AsyncConnection:
+        """
+        Take an idle connection from the pool or open a new one. Waits while all connections are in use.
+
+        :return: (_AsyncConnection) connection which must be given back with release()
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool of {} is closed.".format(self.host))
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.maxsize)
+        if self._slots.locked():
+            self.waits += 1
+        await self._slots.acquire()
+        self.inUse += 1
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.closed:
+                self.reused += 1
+                return connection
+            self.discarded += 1
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self._hostname, self._port),
+                                                    self.timeout)
+        except BaseException:
+            self.inUse -= 1
+            self._slots.release()
+            raise
+        self.created += 1
+        return _AsyncConnection(reader, writer)
+
+    def release(self, connection, reuse=True) -> None:
+        """
+        Give a connection back to the pool.
+
+        :param connection: (_AsyncConnection) connection returned by acquire()
+        :param reuse: (bool) False closes the connection, e.g. after an error left it in an undefined state
+        :return: None
+        """
+        self.inUse -= 1
+        if reuse and not self._closed and not connection.closed:
+            self._idle.append(connection)
+        else:
+            self.discarded += 1
+            connection.close()
+        self._slots.release()
+
+    def clear(self) -> None:
+        """
+        Close all idle connections.
+
+        :return: None
+        """
+        while self._idle:
+            self._idle.pop().close()
+            self.discarded += 1
+
+    def close(self) -> None:
+        """
+        Close all idle connections. Connections which are still in use are closed when they are released.
+
+        :return: None
+        """
+        self._closed = True
+        self.clear()
+
+
+class _AsyncMethod(object):
+    # supports dotted names, e.g. proxy.system.listMethods()
+    def __init__(self, proxy, name):
+        self._proxy = proxy
+        self._name = name
+
+    def __getattr__(self, name):
+        return _AsyncMethod(self._proxy, "{}.{}".format(self._name, name))
+
+    def __call__(self, *args):
+        return self._proxy.call(self._name, *args)
+
+
+class _AsyncServerProxy(object):
+    # counterpart of xmlrpc.client.ServerProxy returning coroutines
+    def __init__(self, proxy):
+        self._proxy = proxy
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _AsyncMethod(self._proxy, name)
+
+
+class AsyncBaseProxy(object):
+    """Base class for all asyncio proxies."""
+
+    def __init__(self, url, device, timeout=SOCKET_TIMEOUT):
+        """Initialize the proxy for the given url.
+
+        The requests are sent over the keep-alive connections of the device's connection pool.
+
+        Args:
+            url (str): url of the XML-RPC object
+            device (obj): device
+            timeout (float): Timeout values which is valid for the requests of the proxy.
+            Argument can be a non-negative floating point number expressing seconds, or None.
+        """
+        self.baseURL = url
+        self.device = device
+        self.timeout = timeout
+        self._path = urllib.parse.urlsplit(url).path
+        self.__proxy = _AsyncServerProxy(self)
+
+    @property
+    def proxy(self):
+        return self.__proxy
+
+    async def call(self, methodName, *params):
+        """Call an XML-RPC method of the object.
+
+        Args:
+            methodName (str): name of the method
+            params: parameters of the method
+
+        Returns:
+            result of the method, an xmlrpc.client.Fault is raised for a fault response
+        """
+        body = xmlrpc.client.dumps(params, methodName, allow_none=True).encode("utf-8")
+        return await asyncio.wait_for(self._request(body), self.timeout)
+
+    async def _request(self, body):
+        pool = self.device.connectionPool
+        # like xmlrpc.client.Transport, a request on a reused connection which was closed by the device is sent
+        # once again on a new connection
+        for attempt in range(2):
+            connection = await pool.acquire()
+            reused = connection.requests > 0
+            reuse = False
+            try:
+                data = await connection.request(pool.host, self._path, body)
+                reuse = True
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if reused and attempt == 0:
+                    pool.clear()
+                    continue
+                raise
+            finally:
+                pool.release(connection, reuse=reuse)
+            return xmlrpc.client.loads(data, use_builtin_types=False)[0][0]
+
+    def close(self):
+        self.__proxy = None
+
+
+class AsyncMainProxy(AsyncBaseProxy):
+    """Asyncio proxy representing mainProxy."""
+
+    @asynccontextmanager
+    async def requestSession(self, password='', session_id='0' * 32, timeout=SOCKET_TIMEOUT,
+                             autoHeartbeat=True, autoHeartbeatInterval=30):
+        """Async generator for requestSession to be used in async with statement.
+
+        Args:
+            password (str): password for session
+            session_id (str): session id
+            timeout (float): Timeout values which is valid for the AsyncSessionProxy.
+            autoHeartbeat (bool): extend the live time of the session with a background task
+            autoHeartbeatInterval (int): heartbeat interval in seconds
+        """
+        self.device._sessionId = await self.proxy.requestSession(password, session_id)
+        self.device._sessionURL = self.baseURL + 'session_' + session_id + '/'
+        self.device._sessionProxy = AsyncSessionProxy(url=self.device._sessionURL, device=self.device,
+                                                      timeout=timeout, autoHeartbeat=autoHeartbeat,
+                                                      autoHeartbeatInterval=autoHeartbeatInterval)
+        try:
+            await self.device._sessionProxy.startHeartbeat()
+            yield self.device._sessionProxy
+        finally:
+            try:
+                await self.device._sessionProxy.cancelSession()
+            finally:
+                self.device._sessionProxy.close()
+                self.device._sessionProxy = None
+                self.device._sessionURL = None
+                self.device._sessionId = None
+
+
+class AsyncSessionProxy(AsyncBaseProxy):
+    """Asyncio proxy representing sessionProxy."""
+
+    def __init__(self, url, device, timeout=SOCKET_TIMEOUT, autoHeartbeat=True, autoHeartbeatInterval=30):
+        self.autoHeartbeat = autoHeartbeat
+        self.autoHeartbeatInterval = autoHeartbeatInterval
+        self.autoHeartbeatTask = None
+        # error of the last auto heartbeat, None if it was sent successfully
+        self.autoHeartbeatError = None
+
+        super().__init__(url, device, timeout)
+
+    async def startHeartbeat(self) -> None:
+        """
+        Send the first heartbeat and start the auto heartbeat task if autoHeartbeat is enabled.
+
+        :return: None
+        """
+        if self.autoHeartbeat:
+            self.autoHeartbeatInterval = await self.heartbeat(self.autoHeartbeatInterval)
+            self.autoHeartbeatTask = asyncio.get_running_loop().create_task(self.doAutoHeartbeat())
+        else:
+            await self.heartbeat(300)
+
+    async def heartbeat(self, heartbeatInterval: int) -> int:
+        """
+        Extend the live time of edit-session If the given value is outside the range of "SessionTimeout",
+        the saved default timeout will be used.
+
+        :param heartbeatInterval: (int) requested timeout-interval till next heartbeat, in seconds
+        :return: (int) the used timeout-interval, in seconds
+        """
+        result = await self.proxy.heartbeat(heartbeatInterval)
+        return result
+
+    async def doAutoHeartbeat(self) -> None:
+        """
+        Auto heartbeat task for automatic extending the live time of edit-session.
+        A failed heartbeat is reported with a ResourceWarning and repeated.
+
+        :return: None
+        """
+        # send the heartbeat a little ahead of time
+        delay = max(self.autoHeartbeatInterval - 1, 1)
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                self.autoHeartbeatInterval = await self.heartbeat(self.autoHeartbeatInterval)
+            except Exception as e:
+                self.autoHeartbeatError = e
+                warnings.warn("Auto heartbeat of session {} failed, it is repeated: {!r}".format(self.baseURL, e),
+                              ResourceWarning)
+                delay = AUTO_HEARTBEAT_RETRY_INTERVAL
+                continue
+            self.autoHeartbeatError = None
+            delay = max(self.autoHeartbeatInterval - 1, 1)
+
+    async def cancelSession(self) -> None:
+        """
+        Stop the auto heartbeat task and close the session on the device.
+
+        :return: None
+        """
+        if self.autoHeartbeatTask is not None:
+            self.autoHeartbeatTask.cancel()
+            try:
+                await self.autoHeartbeatTask
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # the session is cancelled on the device anyway
+                self.autoHeartbeatError = e
+            self.autoHeartbeatTask = None
+        await self.proxy.cancelSession()
+
+    @asynccontextmanager
+    async def setOperatingMode(self, mode, timeout=SOCKET_TIMEOUT):
+        """Async generator for setOperatingMode to be used in async with statement.
+
+        Args:
+            mode (int): operating mode
+            timeout (float): Timeout values which is valid for the AsyncEditProxy.
+        """
+        await self.proxy.setOperatingMode(mode)
+        try:
+            self.device._editURL = self.baseURL + 'edit/'
+            self.device._editProxy = AsyncEditProxy(url=self.device._editURL, device=self.device, timeout=timeout)
+            yield self.device._editProxy
+        finally:
+            await self.proxy.setOperatingMode(0)
+            self.device._editProxy.close()
+            self.device._editURL = None
+            self.device._editProxy = None
+
+
+class AsyncEditProxy(AsyncBaseProxy):
+    """Asyncio proxy representing editProxy."""
+
+    @asynccontextmanager
+    async def editApplication(self, app_index, timeout=SOCKET_TIMEOUT):
+        """Async generator for editApplication to be used in async with statement.
+
+        Args:
+            app_index (int): application index
+            timeout (float): Timeout values which is valid for the AsyncApplicationProxy.
+        """
+        await self.proxy.editApplication(app_index)
+        try:
+            self.device._applicationURL = self.baseURL + "application/"
+            self.device._applicationProxy = AsyncApplicationProxy(url=self.device._applicationURL,
+                                                                  device=self.device, timeout=timeout)
+            yield self.device._applicationProxy
+        finally:
+            await self.proxy.stopEditingApplication()
+            self.device._applicationProxy.close()
+            self.device._applicationURL = None
+            self.device._applicationProxy = None
+
+
+class AsyncApplicationProxy(AsyncBaseProxy):
+    """Asyncio proxy representing applicationProxy."""
+
+    @asynccontextmanager
+    async def editImager(self, imager_index, timeout=SOCKET_TIMEOUT):
+        """Async generator for editImager to be used in async with statement.
+
+        Args:
+            imager_index (int): imager index
+            timeout (float): Timeout values which is valid for the AsyncImagerProxy.
+        """
+        imagerConfigList = await self.proxy.getImagerConfigList()
+        imager_IDs = [int(x["Id"]) for x in imagerConfigList]
+        if int(imager_index) not in imager_IDs:
+            raise ValueError("Image index {} not available. Choose one imageIndex from following"
+                             "ImagerConfigList or create a new one with method createImagerConfig():\n{}"
+                             .format(imager_index, imagerConfigList))
+        try:
+            self.device._imagerURL = self.baseURL + 'imager_{0:03d}/'.format(imager_index)
+            self.device._imagerProxy = AsyncImagerProxy(url=self.device._imagerURL, device=self.device,
+                                                        timeout=timeout)
+            yield self.device._imagerProxy
+        finally:
+            self.device._imagerProxy.close()
+            self.device._imagerURL = None
+            self.device._imagerProxy = None
+
+
+class AsyncImagerProxy(AsyncBaseProxy):
+    """Asyncio proxy representing imagerProxy."""
+
+
+class AsyncO2x5xxRPCDevice(object):
+    """
+    Asyncio counterpart of O2x5xxRPCDevice. All methods are coroutines, so many devices can be queried
+    concurrently from one event loop, e.g.
+
+        async with AsyncO2x5xxRPCDevice(address="192.168.0.69") as device:
+            name = await device.getParameter("Name")
+            async with device.requestSession() as session:
+                async with session.setOperatingMode(1) as edit:
+                    async with edit.editApplication(1) as application:
+                        await application.proxy.setParameter("Name", "New Name")
+                        await application.proxy.save()
+    """
+    def __init__(self, address="192.168.0.69", api_path="/api/rpc/v1/", timeout=SOCKET_TIMEOUT, pool_size=4):
+        self.address = address
+        self.api_path = api_path
+        self.timeout = timeout
+        # keep-alive connections shared by the main, session, edit, application and imager proxies
+        self.connectionPool = AsyncConnectionPool(host=self.address, timeout=self.timeout, maxsize=pool_size)
+        self.baseURL = "http://" + self.address + self.api_path
+        self.mainURL = self.baseURL + "com.ifm.efector/"
+        self.mainProxy = AsyncMainProxy(url=self.mainURL, timeout=self.timeout, device=self)
+        self._sessionProxy = None
+        self._editProxy = None
+        self._applicationProxy = None
+        self._imagerProxy = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close all connections to the device.
+
+        :return: None
+        """
+        self.mainProxy.close()
+        self.connectionPool.close()
+
+    @property
+    def sessionProxy(self) -> [AsyncSessionProxy, None]:
+        return self._sessionProxy
+
+    @property
+    def editProxy(self) -> [AsyncEditProxy, None]:
+        return self._editProxy
+
+    @property
+    def applicationProxy(self) -> [AsyncApplicationProxy, None]:
+        return self._applicationProxy
+
+    @property
+    def imagerProxy(self) -> [AsyncImagerProxy, None]:
+        return self._imagerProxy
+
+    def requestSession(self, password='', session_id='0' * 32, timeout=SOCKET_TIMEOUT):
+        """
+        Request a session for access to the configuration, to be used in an async with statement.
+
+        :param password: (str) session password (optional)
+        :param session_id: (str) session ID (optional)
+        :param timeout: (float) timeout of the session requests in seconds
+        :return: async context manager returning the AsyncSessionProxy
+        """
+        return self.mainProxy.requestSession(password=password, session_id=session_id, timeout=timeout)
+
+    async def getParameter(self, value: str) -> str:
+        """
+        Returns the current value of the parameter.
+
+        :param value: (str) name of the input parameter
+        :return: (str) value of parameter
+        """
+        result = await self.mainProxy.proxy.getParameter(value)
+        return result
+
+    async def getAllParameters(self) -> dict:
+        """
+        Returns all parameters of the object in one data-structure.
+
+        :return: (dict) name contains parameter-name, value the stringified parameter-value
+        """
+        result = await self.mainProxy.proxy.getAllParameters()
+        return result
+
+    async def getSWVersion(self) -> dict:
+        """
+        Returns version-information of all software components.
+
+        :return: (dict) struct of strings
+        """
+        result = await self.mainProxy.proxy.getSWVersion()
+        return result
+
+    async def getHWInfo(self) -> dict:
+        """
+        Returns hardware-information of all components.
+
+        :return: (dict) struct of strings
+        """
+        result = await self.mainProxy.proxy.getHWInfo()
+        return result
+
+    async def getDmesgData(self) -> str:
+        """
+        Returns content of the message buffer of the kernel.
+
+        :return: (str) List of kernel messages
+        """
+        result = await self.mainProxy.proxy.getDmesgData()
+        return result
+
+    async def getClientCompatibilityList(self) -> list:
+        """
+        The device must be able to define which type and version of operating program is compatible with it.
+
+        :return: (list) Array of strings
+        """
+        result = await self.mainProxy.proxy.getClientCompatibilityList()
+        return result
+
+    async def getApplicationList(self) -> list:
+        """
+        Delivers basic information of all Application stored on the device.
+
+        :return: (dict) array list of structs
+        """
+        result = await self.mainProxy.proxy.getApplicationList()
+        return result
+
+    async def reboot(self, mode: int = 0) -> None:
+        """
+        Reboot system, parameter defines which mode/system will be booted.
+
+        :param mode: (int) type of system that should be booted after shutdown
+                      0: productive-mode (default)
+                      1: recovery-mode (not implemented)
+        :return: None
+        """
+        if mode != 0:
+            raise ValueError("Reboot mode {} not available.".format(str(mode)))
+        await self.mainProxy.proxy.reboot(mode)
+
+    async def switchApplication(self, applicationIndex: int) -> None:
+        """
+        Change active application when device is in run-mode.
+
+        :param applicationIndex: (int) Index of new application (Range 1-32)
+        :return: None
+        """
+        await self.mainProxy.proxy.switchApplication(applicationIndex)
+        await self.waitForConfigurationDone()
+
+    async def getTraceLogs(self, nLogs: int = 0) -> list:
+        """
+        Returns entries from internal log buffer of device.
+
+        :param nLogs: (int) max. number of logs to fetch from IOM
+                            0: all logs are fetched
+        :return: (list) Array of strings
+        """
+        result = await self.mainProxy.proxy.getTraceLogs(nLogs)
+        return result
+
+    async def getApplicationStatisticData(self, applicationIndex: int) -> dict:
+        """
+        Returns a Chunk which contains the statistic data requested.
+
+        :param applicationIndex: (int) Index of application (Range 1-32)
+        :return: (dict)
+        """
+        result = json.loads(await self.mainProxy.proxy.getApplicationStatisticData(applicationIndex))
+        return result
+
+    async def getReferenceImage(self) -> bytes:
+        """
+        Returns the active application's reference image, if there is no fault.
+        The image is not decoded, use decode_jpeg() or an executor for decoding it outside of the event loop.
+
+        :return: (bytes) JPEG data
+        """
+        result = await self.mainProxy.proxy.getReferenceImage()
+        return result.data if isinstance(result, xmlrpc.client.Binary) else str(result).encode("latin-1")
+
+    async def isConfigurationDone(self) -> bool:
+        """
+        Check whether the new configuration has been applied within the imager process.
+
+        :return: (bool) True or False
+        """
+        result = await self.mainProxy.proxy.isConfigurationDone()
+        return result
+
+    async def waitForConfigurationDone(self) -> None:
+        """
+        Wait until the new configuration has been applied within the imager process.
+
+        :return: None
+        """
+        await self.mainProxy.proxy.waitForConfigurationDone()
+
+    async def measure(self, measureInput: dict) -> dict:
+        """
+        Measure geometric properties according to the currently valid calibration.
+
+        :param measureInput: (dict) measure input is a stringified json object
+        :return: (dict) measure result
+        """
+        result = json.loads(await self.mainProxy.proxy.measure(json.dumps(measureInput)))
+        return result
+
+    async def trigger(self) -> None:
+        """
+        Executes trigger.
+
+        :return: None
+        """
+        await self.mainProxy.proxy.trigger()
+
+    async def doPing(self) -> str:
+        """
+        Ping sensor device and check reachability in network.
+
+        :return: - "up" sensor is reachable through network
+                 - "down" sensor is not reachable through network
+        """
+        result = await self.mainProxy.proxy.doPing()
+        return result
@@ -2,6 +2,8 @@ import json
 import os
 import warnings
 from .proxy import ImagerProxy
+from .cache import ParameterSnapshot, ParameterLimitsCache
+from .transaction import Transaction
 
 
 class Application(object):
@@ -39,6 +41,8 @@ class Application(object):
 
         :return: (dict) name contains parameter-name, value the stringified parameter-value
         """
+        if self._applicationProxy.parameterSnapshot:
+            return self._applicationProxy.parameterSnapshot.getAllParameters()
         result = self._applicationProxy.proxy.getAllParameters()
         return result
 
@@ -49,9 +53,68 @@ class Application(object):
         :param value: (str) parameter name
         :return: (str)
         """
+        if self._applicationProxy.parameterSnapshot:
+            return self._applicationProxy.parameterSnapshot.getParameter(value)
         result = self._applicationProxy.proxy.getParameter(value)
         return result
 
+    def setParameter(self, name: str, value) -> None:
+        """
+        Sets the value of the parameter. The call does not wait until the new configuration is applied,
+        use waitForConfigurationDone() for that. Inside a transaction the change is queued.
+
+        :param name: (str) parameter name
+        :param value: new parameter value
+        :return: None
+        """
+        if self._applicationProxy.transaction is not None:
+            self._applicationProxy.transaction.setParameter(name, value)
+            return
+        self._applicationProxy.proxy.setParameter(name, value)
+        if self._applicationProxy.parameterSnapshot:
+            self._applicationProxy.parameterSnapshot.update(name, value)
+
+    def transaction(self) -> Transaction:
+        """
+        Transaction for changing several parameters of this application at once. Use it in a with statement:
+        the setters validate the values and queue the changes, which are written together when leaving the
+        with statement. The device applies the new configuration only once and all written parameters are
+        set back to their previous values if one of the changes fails.
+
+        :return: Transaction object
+        """
+        return Transaction(obj=self, proxy=self._applicationProxy)
+
+    def enableParameterSnapshot(self, ttl: float = None) -> None:
+        """
+        Serve the parameter reads of this application from a local snapshot which is fetched with one
+        getAllParameters() call instead of requesting every parameter separately. Parameters written with this
+        library are updated in the snapshot. The snapshot is kept until the application is closed.
+
+        :param ttl: (float) max. age of the snapshot in seconds before it is fetched again. None never expires.
+        :return: None
+        """
+        self._applicationProxy.parameterSnapshot = ParameterSnapshot(proxy=self._applicationProxy, ttl=ttl)
+
+    def disableParameterSnapshot(self) -> None:
+        """
+        Request every parameter from the device again.
+
+        :return: None
+        """
+        self._applicationProxy.parameterSnapshot = None
+
+    def refreshParameterSnapshot(self) -> dict:
+        """
+        Fetch the parameter snapshot again, e.g. after the parameters were changed by another client.
+
+        :return: (dict) all parameters
+        """
+        if not self._applicationProxy.parameterSnapshot:
+            raise AttributeError("No parameter snapshot available! Please first enable it "
+                                 "with method enableParameterSnapshot().")
+        return self._applicationProxy.parameterSnapshot.refresh()
+
     def getAllParameterLimits(self) -> dict:
         """
         Returns limits and default values of all
@@ -63,6 +126,20 @@ class Application(object):
         result = self._applicationProxy.proxy.getAllParameterLimits()
         return result
 
+    def _getParameterLimits(self) -> dict:
+        """
+        Parameter limits from the limits cache of the device. The limits are only requested
+        from the device once per device type, firmware version and application type.
+
+        :return: (dict)
+        """
+        if not self._applicationProxy.parameterLimitsKey:
+            self._applicationProxy.parameterLimitsKey = ParameterLimitsCache.key(
+                deviceType=self._device.deviceType, firmwareVersion=self._device.firmwareVersion,
+                objectName="application", objectType=self.Type)
+        return self._device.parameterLimitsCache.get(key=self._applicationProxy.parameterLimitsKey,
+                                                     fetch=self.getAllParameterLimits)
+
     @property
     def Type(self) -> str:
         """
@@ -94,7 +171,7 @@ class Application(object):
         max_chars = 64
         if value.__len__() > max_chars:
             raise ValueError("Max. {} characters".format(max_chars))
-        self._applicationProxy.proxy.setParameter("Name", value)
+        self.setParameter("Name", value)
         self.waitForConfigurationDone()
 
     @property
@@ -118,7 +195,7 @@ class Application(object):
         max_chars = 500
         if value.__len__() > 500:
             raise ValueError("Max. {} characters".format(max_chars))
-        self._applicationProxy.proxy.setParameter("Description", value)
+        self.setParameter("Description", value)
         self.waitForConfigurationDone()
 
     @property
@@ -155,11 +232,11 @@ class Application(object):
                       8: time controlled gated HW
         :return: None
         """
-        limits = self.getAllParameterLimits()["TriggerMode"]
+        limits = self._getParameterLimits()["TriggerMode"]
         if value not in range(int(limits["min"]), int(limits["max"]), 1):
             raise ValueError("RPC Trigger value not available. Available range: {}\n"
                              "For more help take a look on the docstring documentation.".format(limits))
-        self._applicationProxy.proxy.setParameter("TriggerMode", value)
+        self.setParameter("TriggerMode", value)
         self.waitForConfigurationDone()
 
     @property
@@ -180,11 +257,11 @@ class Application(object):
         :param value: (float) allowed range [0.0167, 80.0]
         :return: None
         """
-        limits = self.getAllParameterLimits()["FrameRate"]
+        limits = self._getParameterLimits()["FrameRate"]
         if not float(limits["min"]) <= float(value) <= float(limits["max"]):
             raise ValueError("FrameRate value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["FrameRate"]))
-        self._applicationProxy.proxy.setParameter("FrameRate", value)
+                             .format(limits))
+        self.setParameter("FrameRate", value)
         self.waitForConfigurationDone()
 
     @property
@@ -248,7 +325,7 @@ class Application(object):
                                           lower=width_lower, upper=width_upper))
         if valueErrorList:
             raise ValueError("".join(valueErrorList))
-        self._applicationProxy.proxy.setParameter("HWROI", json.dumps(value))
+        self.setParameter("HWROI", json.dumps(value))
         self.waitForConfigurationDone()
 
     @property
@@ -258,7 +335,7 @@ class Application(object):
 
         :return: (bool) True / False
         """
-        result = self._applicationProxy.proxy.getParameter("Rotate180Degree")
+        result = self.getParameter("Rotate180Degree")
         if result == "false":
             return False
         return True
@@ -271,7 +348,7 @@ class Application(object):
         :param value: (bool) True / False
         :return: None
         """
-        self._applicationProxy.proxy.setParameter("Rotate180Degree", value)
+        self.setParameter("Rotate180Degree", value)
         self.waitForConfigurationDone()
 
     @property
@@ -282,7 +359,7 @@ class Application(object):
 
         :return: (bool) True / False
         """
-        result = self._applicationProxy.proxy.getParameter("2dUncompressedImages")
+        result = self.getParameter("2dUncompressedImages")
         if result == "false":
             return False
         return True
@@ -296,7 +373,7 @@ class Application(object):
         :param value: (bool) True / False
         :return: None
         """
-        self._applicationProxy.proxy.setParameter("2dUncompressedImages", value)
+        self.setParameter("2dUncompressedImages", value)
         self.waitForConfigurationDone()
 
     @property
@@ -306,7 +383,7 @@ class Application(object):
 
         :return: (float) current focus distance in meter
         """
-        result = float(self._applicationProxy.proxy.getParameter("FocusDistance"))
+        result = float(self.getParameter("FocusDistance"))
         return result
 
     @FocusDistance.setter
@@ -317,11 +394,11 @@ class Application(object):
         :param value: (float) focus distance in meter
         :return: None
         """
-        limits = self.getAllParameterLimits()["FocusDistance"]
+        limits = self._getParameterLimits()["FocusDistance"]
         if not float(limits["min"]) <= float(value) <= float(limits["max"]):
             raise ValueError("FocusDistance value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["FocusDistance"]))
-        self._applicationProxy.proxy.setParameter("FocusDistance", value)
+                             .format(limits))
+        self.setParameter("FocusDistance", value)
         # TODO: Wird hier geblockt? Wird der Focus Distance direkt nach dem setzen angefahren?
         # Edit: Kein Error, jedoch sind die Bilder unscharf wenn direkt danach das Bild angefordert wird: Fokus wird während requestImage im PCIC noch angefahren!
         self.waitForConfigurationDone()
@@ -334,7 +411,7 @@ class Application(object):
 
         :return: (str)
         """
-        result = self._applicationProxy.proxy.getParameter("ImageEvaluationOrder")
+        result = self.getParameter("ImageEvaluationOrder")
         return result
 
     @ImageEvaluationOrder.setter
@@ -346,7 +423,7 @@ class Application(object):
         :param value: (list) a whitespace separated list of ImagerConfig ids
         :return: None
         """
-        self._applicationProxy.proxy.setParameter("ImageEvaluationOrder", value)
+        self.setParameter("ImageEvaluationOrder", value)
         self.waitForConfigurationDone()
 
     @property
@@ -355,7 +432,7 @@ class Application(object):
         The PCIC TCP/IP Schema defines which result-data will be sent via TCP/IP.
         :return: (str) pcic tcp/ip schema config
         """
-        return self._applicationProxy.proxy.getParameter("PcicTcpResultSchema")
+        return self.getParameter("PcicTcpResultSchema")
 
     @PcicTcpResultSchema.setter
     def PcicTcpResultSchema(self, schema: str) -> None:
@@ -364,7 +441,10 @@ class Application(object):
         :param schema: (str) pcic tcp/ip schema config
         :return: None
         """
-        self._applicationProxy.proxy.setParameter("PcicTcpResultSchema", schema)
+        self.setParameter("PcicTcpResultSchema", schema)
+        if self._applicationProxy.transaction is not None:
+            # validated when the transaction is written
+            return
         validation = self.validate()
         if validation:
             warnings.warn(str(validation), UserWarning)
@@ -377,7 +457,7 @@ class Application(object):
         JSON string describing a flow-graph which allows to program the logic between model-results and output-pins.
         :return: (str) JSON string flow-graph of Logic Layer
         """
-        return self._applicationProxy.proxy.getParameter("LogicGraph")
+        return self.getParameter("LogicGraph")
 
     @LogicGraph.setter
     def LogicGraph(self, schema: str) -> None:
@@ -386,7 +466,10 @@ class Application(object):
         :param schema: (str) JSON string flow-graph of Logic Layer
         :return: None
         """
-        self._applicationProxy.proxy.setParameter("LogicGraph", schema)
+        self.setParameter("LogicGraph", schema)
+        if self._applicationProxy.transaction is not None:
+            # validated when the transaction is written
+            return
         validation = self.validate()
         if validation:
             warnings.warn(str(validation), UserWarning)
@@ -466,6 +549,7 @@ class Application(object):
         :return: None
         """
         self._applicationProxy.proxy.save()
+        self._device.clearReferenceImageCache()
         self.waitForConfigurationDone()
 
     def validate(self) -> list:
@@ -520,6 +604,8 @@ class Application(object):
         :return: (int) ID of new image-config
         """
         imagerIndex = self._applicationProxy.proxy.copyImagerConfig(imagerIndex)
+        if self._applicationProxy.parameterSnapshot:
+            self._applicationProxy.parameterSnapshot.invalidate()
         self.waitForConfigurationDone()
         return imagerIndex
 
@@ -532,6 +618,8 @@ class Application(object):
         :return: None
         """
         self._applicationProxy.proxy.deleteImagerConfig(imagerIndex)
+        if self._applicationProxy.parameterSnapshot:
+            self._applicationProxy.parameterSnapshot.invalidate()
         self.waitForConfigurationDone()
 
     def isConfigurationDone(self) -> bool:
@@ -548,8 +636,11 @@ class Application(object):
         """
         After an application (or imager configuration or model) parameter has been changed,
         this method can be used to check when the new configuration has been applied within the imager process.
-        This call blocks until configuration has been finished.
+        This call blocks until configuration has been finished. Inside a transaction the call returns
+        immediately, the transaction waits once after writing all changes.
 
         :return: None
         """
+        if self._applicationProxy.transaction is not None:
+            return
         self._applicationProxy.proxy.waitForConfigurationDone()
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+
+
+def _canonicalJSON(data) -> bytes:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class ConfigArchive(object):
+    """
+    Local, content-addressed store for exported device- and application-configs.
+
+    Every config file is split into its parts: the applications of device.json, the rest of device.json and
+    the assets like reference images. The parts are stored once per content (SHA-256) in the folder objects,
+    a snapshot is a small manifest in the folder manifests referencing the parts. Nightly backups of unchanged
+    devices therefore only add a manifest, and a backup with one changed application only adds this application.
+
+        archive = ConfigArchive("backups")
+        snapshotId = archive.put("deviceConfig_192_168_0_69.o2d5xxcfg", label="192.168.0.69")
+        archive.restore(snapshotId, "restored.o2d5xxcfg")
+        archive.gc()
+
+    Restored config files contain the same files, device.json and application.json are semantically equal
+    (same JSON content) to the original ones.
+    """
+
+    def __init__(self, root: str, compressLevel: int = 6):
+        """
+        :param root: (str) folder of the archive, created if it does not exist
+        :param compressLevel: (int) zlib level the objects are compressed with (0 stores them uncompressed)
+        """
+        self.root = root
+        self.compressLevel = compressLevel
+        self._objectsPath = os.path.join(root, "objects")
+        self._manifestsPath = os.path.join(root, "manifests")
+        os.makedirs(self._objectsPath, exist_ok=True)
+        os.makedirs(self._manifestsPath, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _objectPath(self, digest) -> str:
+        return os.path.join(self._objectsPath, digest[:2], digest[2:])
+
+    def _manifestPath(self, snapshotId) -> str:
+        return os.path.join(self._manifestsPath, snapshotId + ".json")
+
+    @staticmethod
+    def _write(path, data) -> None:
+        # write into a temporary file first, so readers never see a partially written file
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+    def exists(self, digest: str) -> bool:
+        """
+        :param digest: (str) SHA-256 hex digest of a part
+        :return: (bool) True if the part is stored in the archive
+        """
+        return os.path.exists(self._objectPath(digest))
+
+    def putObject(self, data: bytes) -> str:
+        """
+        Store a part. Parts which are already stored are not written again.
+
+        :param data: (bytes) content of the part
+        :return: (str) SHA-256 hex digest of the part
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._objectPath(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, zlib.compress(data, self.compressLevel))
+        return digest
+
+    def getObject(self, digest: str) -> bytes:
+        """
+        :param digest: (str) SHA-256 hex digest of a part
+        :return: (bytes) content of the part
+        """
+        with open(self._objectPath(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError("Object {} of archive {} is corrupted.".format(digest, self.root))
+        return data
+
+    def put(self, configFile: str, label: str = None) -> str:
+        """
+        Store a config file as new snapshot.
+
+        :param configFile: (str) path of an exported device- (.o2d5xxcfg) or application-config (.o2d5xxapp)
+        :param label: (str) optional label of the snapshot, e.g. the device address
+        :return: (str) snapshot id
+        """
+        files = []
+        # objects stored by put() are only referenced after the manifest was written, gc() must not run meanwhile
+        with self._lock, zipfile.ZipFile(configFile, "r") as zipOpen:
+            for name in zipOpen.namelist():
+                data = zipOpen.read(name)
+                if name == "device.json":
+                    device = json.loads(data)
+                    applications = None
+                    if "Applications" in device:
+                        applications = [None if application is None else self.putObject(_canonicalJSON(application))
+                                        for application in device.pop("Applications")]
+                    files.append({"name": name, "type": "device", "object": self.putObject(_canonicalJSON(device)),
+                                  "applications": applications})
+                elif name.endswith(".json"):
+                    files.append({"name": name, "type": "json",
+                                  "object": self.putObject(_canonicalJSON(json.loads(data)))})
+                else:
+                    files.append({"name": name, "type": "raw", "object": self.putObject(data)})
+            manifest = {"label": label, "created": time.time(), "source": os.path.basename(configFile),
+                        "files": files}
+            data = _canonicalJSON(manifest)
+            snapshotId = hashlib.sha256(data).hexdigest()
+            self._write(self._manifestPath(snapshotId), data)
+        return snapshotId
+
+    def get(self, snapshotId: str) -> dict:
+        """
+        :param snapshotId: (str) snapshot id
+        :return: (dict) manifest of the snapshot
+        """
+        path = self._manifestPath(snapshotId)
+        if not os.path.exists(path):
+            raise KeyError("Snapshot {} not in archive {}.".format(snapshotId, self.root))
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+
+    def snapshots(self, label: str = None) -> list:
+        """
+        :param label: (str) only return the snapshots with this label
+        :return: (list) tuples (snapshot id, manifest) sorted by creation time
+        """
+        result = []
+        for name in os.listdir(self._manifestsPath):
+            if name.endswith(".json"):
+                manifest = self.get(name[:-len(".json")])
+                if label is None or manifest["label"] == label:
+                    result.append((name[:-len(".json")], manifest))
+        return sorted(result, key=lambda item: item[1]["created"])
+
+    def latest(self, label: str = None) -> [str, None]:
+        """
+        :param label: (str) only consider the snapshots with this label
+        :return: (str) id of the newest snapshot or None if there is no snapshot
+        """
+        snapshots = self.snapshots(label=label)
+        return snapshots[-1][0] if snapshots else None
+
+    def restore(self, snapshotId: str, configFile: str) -> str:
+        """
+        Reassemble the config file of a snapshot.
+
+        :param snapshotId: (str) snapshot id
+        :param configFile: (str) path of the config file which is written
+        :return: (str) path of the config file
+        """
+        manifest = self.get(snapshotId)
+        with zipfile.ZipFile(configFile, "w", compression=zipfile.ZIP_DEFLATED) as zipOpen:
+            for entry in manifest["files"]:
+                data = self.getObject(entry["object"])
+                if entry["type"] == "device":
+                    device = json.loads(data)
+                    if entry["applications"] is not None:
+                        device["Applications"] = [None if digest is None else json.loads(self.getObject(digest))
+                                                  for digest in entry["applications"]]
+                    data = json.dumps(device, indent=4).encode("utf-8")
+                elif entry["type"] == "json":
+                    data = json.dumps(json.loads(data), indent=4).encode("utf-8")
+                zipOpen.writestr(entry["name"], data)
+        return configFile
+
+    def delete(self, snapshotId: str) -> None:
+        """
+        Remove a snapshot. Its parts are removed with the next gc() if no other snapshot references them.
+
+        :param snapshotId: (str) snapshot id
+        :return: None
+        """
+        with self._lock:
+            os.remove(self._manifestPath(snapshotId))
+
+    def gc(self) -> int:
+        """
+        Remove all parts which are not referenced by any snapshot.
+
+        :return: (int) number of removed parts
+        """
+        with self._lock:
+            referenced = set()
+            for _, manifest in self.snapshots():
+                for entry in manifest["files"]:
+                    referenced.add(entry["object"])
+                    referenced.update(digest for digest in entry.get("applications") or [] if digest)
+            removed = 0
+            for prefix in os.listdir(self._objectsPath):
+                folder = os.path.join(self._objectsPath, prefix)
+                for name in os.listdir(folder):
+                    if prefix + name not in referenced:
+                        os.remove(os.path.join(folder, name))
+                        removed += 1
+                if not os.listdir(folder):
+                    os.rmdir(folder)
+            return removed
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: (dict) number of snapshots, number of stored parts and size of the stored parts in bytes
+        """
+        objects = 0
+        size = 0
+        for prefix in os.listdir(self._objectsPath):
+            folder = os.path.join(self._objectsPath, prefix)
+            for name in os.listdir(folder):
+                objects += 1
+                size += os.path.getsize(os.path.join(folder, name))
+        snapshots = len([name for name in os.listdir(self._manifestsPath) if name.endswith(".json")])
+        return {"snapshots": snapshots, "objects": objects, "size": size}
+
+    def backupDevice(self, device, label: str = None, timeout: float = None) -> str:
+        """
+        Export the config of a device and store it as new snapshot.
+
+        :param device: (O2x5xxRPCDevice) device
+        :param label: (str) label of the snapshot, the device address if None
+        :param timeout: (float) max. time in seconds to wait for the export progress. None waits forever.
+        :return: (str) snapshot id
+        """
+        with tempfile.TemporaryDirectory() as tmpDir:
+            with device.mainProxy.requestSession():
+                configFile = device.session.exportConfigToFile(os.path.join(tmpDir, "deviceConfig"),
+                                                               timeout=timeout)
+            return self.put(configFile, label=device.address if label is None else label)
+
+    def restoreDevice(self, snapshotId: str, device, global_settings=True, network_settings=False,
+                      applications=True, timeout: float = None) -> None:
+        """
+        Import the config of a snapshot into a device.
+
+        :param snapshotId: (str) snapshot id
+        :param device: (O2x5xxRPCDevice) device
+        :param global_settings: (bool) Include Global-Configuration (Name, Description, Location, ...)
+        :param network_settings: (bool) Include Network-Configuration (IP, DHCP, ...)
+        :param applications: (bool) Include All Application-Configurations
+        :param timeout: (float) max. time in seconds to wait for the import progress. None waits forever.
+        :return: None
+        """
+        manifest = self.get(snapshotId)
+        extension = os.path.splitext(manifest["source"])[1]
+        with tempfile.TemporaryDirectory() as tmpDir:
+            configFile = self.restore(snapshotId, os.path.join(tmpDir, "deviceConfig" + extension))
+            with device.mainProxy.requestSession():
+                device.session.importConfigFromFile(configFile, global_settings=global_settings,
+                                                    network_settings=network_settings, applications=applications,
+                                                    timeout=timeout)
@@ -0,0 +1,160 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import xmlrpc.client
+
+# fault code of a server which does not know the method (XML-RPC specification for fault code interoperability)
+METHOD_NOT_FOUND = -32601
+
+
+def _multicallUnsupported(fault) -> bool:
+    # servers without the fault code of the specification name the unknown method in the fault string
+    return fault.faultCode == METHOD_NOT_FOUND or "system.multicall" in str(fault.faultString)
+
+
+class _BatchMethod(object):
+    """
+    Records the call of a (dotted) method name in the batch.
+    """
+
+    def __init__(self, batch, name):
+        self._batch = batch
+        self._name = name
+
+    def __getattr__(self, name):
+        return _BatchMethod(self._batch, "{}.{}".format(self._name, name))
+
+    def __call__(self, *args) -> Future:
+        return self._batch._record(self._name, args)
+
+
+class Batch(object):
+    """
+    Collects method calls on a proxy and sends them together when the batch is executed.
+
+    The calls are sent as one system.multicall request if the device supports it. Otherwise they are sent
+    one after another over one keep-alive connection (ordered=True), or concurrently over the keep-alive
+    connections of the device's connection pool (ordered=False). Concurrent calls may be executed by the device
+    in any order, so only use ordered=False for calls which do not depend on each other, e.g. reading parameters.
+    Whether the device supports system.multicall is checked with the first batch and remembered for the device.
+
+    Use it in a with statement, the calls are sent when leaving the block:
+
+        with device.applicationProxy.batch() as batch:
+            name = batch.getParameter("Name")
+            frameRate = batch.getParameter("FrameRate")
+        print(name.result(), frameRate.result())
+    """
+
+    def __init__(self, proxy, ordered=True):
+        """
+        :param proxy: (BaseProxy) proxy the calls are sent to
+        :param ordered: (bool) True for sending the calls in the recorded order if system.multicall is not
+                        available, e.g. for setting parameters which depend on each other. False sends them
+                        concurrently.
+        """
+        self._proxy = proxy
+        self.ordered = ordered
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            for _, _, future in self._calls:
+                future.cancel()
+        else:
+            self.execute()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _BatchMethod(self, name)
+
+    def __len__(self):
+        return self._calls.__len__()
+
+    def _record(self, name, args):
+        future = Future()
+        self._calls.append((name, args, future))
+        return future
+
+    @property
+    def multicall(self) -> [bool, None]:
+        """
+        Whether the device supports system.multicall. None as long as no batch was sent to the device.
+
+        :return: (bool) True if supported
+        """
+        return getattr(self._proxy.device, "_multicall", None)
+
+    def execute(self) -> list:
+        """
+        Send all recorded calls which were not sent yet. Called automatically when leaving the with statement.
+
+        :return: (list) futures of all calls in the recorded order
+        """
+        calls = [call for call in self._calls if not call[2].done()]
+        for _, _, future in calls:
+            future.set_running_or_notify_cancel()
+        if not calls:
+            return self.futures
+        if self.multicall is not False and len(calls) > 1:
+            if self._executeMulticall(calls):
+                return self.futures
+        if self.ordered or len(calls) == 1:
+            for call in calls:
+                self._executeSingle(*call)
+        else:
+            maxWorkers = min(len(calls), self._proxy.device.connectionPool.maxsize)
+            with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+                list(executor.map(lambda call: self._executeSingle(*call), calls))
+        return self.futures
+
+    @property
+    def futures(self) -> list:
+        """
+        :return: (list) futures of all recorded calls in the recorded order
+        """
+        return [future for _, _, future in self._calls]
+
+    def results(self) -> list:
+        """
+        Results of all recorded calls in the recorded order.
+        The exception of the first failed call is raised.
+
+        :return: (list) results
+        """
+        return [future.result() for future in self.futures]
+
+    def _executeSingle(self, name, args, future):
+        try:
+            future.set_result(getattr(self._proxy.proxy, name)(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _executeMulticall(self, calls) -> bool:
+        multicall = xmlrpc.client.MultiCall(self._proxy.proxy)
+        for name, args, _ in calls:
+            getattr(multicall, name)(*args)
+        try:
+            results = multicall()
+        except xmlrpc.client.Fault as e:
+            if not _multicallUnsupported(e):
+                for _, _, future in calls:
+                    future.set_exception(e)
+                return True
+            # system.multicall is not available on this device
+            setattr(self._proxy.device, "_multicall", False)
+            return False
+        except Exception as e:
+            # e.g. a transient HTTP error, system.multicall is probed again with the next batch
+            for _, _, future in calls:
+                future.set_exception(e)
+            return True
+        setattr(self._proxy.device, "_multicall", True)
+        for index, (_, _, future) in enumerate(calls):
+            try:
+                future.set_result(results[index])
+            except xmlrpc.client.Fault as e:
+                future.set_exception(e)
+        return True
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+
+class ParameterSnapshot(object):
+    """
+    Local copy of all parameters of an application or imager object.
+
+    The snapshot is filled with one getAllParameters() call and serves the following getParameter() calls
+    without a round trip to the device. Parameters written with setParameter() are patched in the snapshot
+    (or invalidated if the device may represent the value differently), so the snapshot stays consistent
+    with the changes made through this library.
+    """
+
+    def __init__(self, proxy, ttl=None):
+        """
+        :param proxy: (BaseProxy) application or imager proxy
+        :param ttl: (float) max. age of the snapshot in seconds before it is fetched again. None never expires.
+        """
+        self._proxy = proxy
+        self.ttl = ttl
+        self._parameters = None
+        self._timestamp = None
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        """
+        :return: (bool) True if the snapshot was not fetched yet, was invalidated or is older than the TTL
+        """
+        if self._parameters is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._timestamp > self.ttl
+
+    def refresh(self) -> dict:
+        """
+        Fetch all parameters from the device.
+
+        :return: (dict) copy of all parameters
+        """
+        parameters = self._proxy.proxy.getAllParameters()
+        with self._lock:
+            self._parameters = dict(parameters)
+            self._timestamp = time.monotonic()
+            return dict(self._parameters)
+
+    def getAllParameters(self) -> dict:
+        """
+        :return: (dict) copy of all parameters, fetched again if the snapshot is expired
+        """
+        if self.expired:
+            return self.refresh()
+        with self._lock:
+            return dict(self._parameters)
+
+    def getParameter(self, name: str) -> str:
+        """
+        Value of a parameter from the snapshot. Parameters which are not in the snapshot
+        (e.g. invalidated ones) are requested from the device.
+
+        :param name: (str) parameter name
+        :return: (str) stringified parameter value as returned by the device
+        """
+        if self.expired:
+            self.refresh()
+        with self._lock:
+            if name in self._parameters:
+                return self._parameters[name]
+        value = self._proxy.proxy.getParameter(name)
+        with self._lock:
+            if self._parameters is not None:
+                self._parameters[name] = value
+        return value
+
+    def update(self, name: str, value) -> None:
+        """
+        Patch a written parameter in the snapshot. Strings, booleans and integers are stored with the same
+        representation the device uses, all other values are invalidated and requested again on the next read.
+
+        :param name: (str) parameter name
+        :param value: value given to setParameter
+        :return: None
+        """
+        with self._lock:
+            if self._parameters is None:
+                return
+            if isinstance(value, bool):
+                self._parameters[name] = "true" if value else "false"
+            elif isinstance(value, (str, int)):
+                self._parameters[name] = str(value)
+            else:
+                self._parameters.pop(name, None)
+
+    def invalidate(self, name: str = None) -> None:
+        """
+        Remove one parameter or the complete snapshot, e.g. after an operation changed parameters on the device.
+
+        :param name: (str) parameter name. None invalidates all parameters.
+        :return: None
+        """
+        with self._lock:
+            if name is None:
+                self._parameters = None
+            elif self._parameters is not None:
+                self._parameters.pop(name, None)
+
+
+class ParameterLimitsCache(object):
+    """
+    Cache for the parameter limits of application and imager objects.
+
+    The limits only change with the firmware and the type of the application or imager, so they are stored
+    per device type, firmware version, object and object type. The cache can be shared by several devices
+    and optionally persisted as JSON file, so the limits are only requested once per firmware version.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: (str) JSON file for persisting the limits. The file is loaded if it exists.
+                     None keeps the limits in memory only.
+        """
+        self.path = path
+        self._limits = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self._limits = json.load(f)
+
+    @staticmethod
+    def key(deviceType: str, firmwareVersion: str, objectName: str, objectType: str) -> str:
+        """
+        :param deviceType: (str) value of the device parameter DeviceType
+        :param firmwareVersion: (str) firmware version of the device
+        :param objectName: (str) "application" or "imager"
+        :param objectType: (str) value of the parameter Type of the application or imager
+        :return: (str) key of the limits in the cache
+        """
+        return "|".join([str(deviceType), str(firmwareVersion), objectName, str(objectType)])
+
+    def __contains__(self, key):
+        return self._limits.__contains__(key)
+
+    def __len__(self):
+        return self._limits.__len__()
+
+    def get(self, key: str, fetch) -> dict:
+        """
+        Limits from the cache. Unknown limits are fetched and stored in the cache.
+
+        :param key: (str) key created with ParameterLimitsCache.key()
+        :param fetch: (callable) function returning the limits from the device, e.g. getAllParameterLimits
+        :return: (dict) limits of all parameters
+        """
+        with self._lock:
+            if key in self._limits:
+                return self._limits[key]
+        limits = fetch()
+        with self._lock:
+            self._limits[key] = limits
+        if self.path:
+            self.save()
+        return limits
+
+    def clear(self) -> None:
+        """
+        Remove all limits from the cache (and the file).
+
+        :return: None
+        """
+        with self._lock:
+            self._limits = {}
+        if self.path:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Write the cache to the JSON file.
+
+        :return: None
+        """
+        with self._lock:
+            data = json.dumps(self._limits, indent=2, sort_keys=True)
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w") as f:
+            f.write(data)
+        os.replace(tmpPath, self.path)
@@ -1,14 +1,15 @@
 from .proxy import MainProxy, SessionProxy, EditProxy, ApplicationProxy, ImagerProxy
+from .transport import ConnectionPool
+from .batch import Batch
+from .cache import ParameterLimitsCache
 from .session import Session
 from .edit import Edit
 from .application import Application
 from .imager import Imager
 from ..static.devices import DevicesMeta
+from .utils import LazyImage
 import xmlrpc.client
 import json
-import io
-import numpy as np
-import matplotlib.image as mpimg
 import warnings
 
 
@@ -19,10 +20,21 @@ class O2x5xxRPCDevice(object):
     """
     Main API class
     """
-    def __init__(self, address="192.168.0.69", api_path="/api/rpc/v1/", timeout=SOCKET_TIMEOUT):
+    def __init__(self, address="192.168.0.69", api_path="/api/rpc/v1/", timeout=SOCKET_TIMEOUT, pool_size=4,
+                 limits_cache=None):
         self.address = address
         self.api_path = api_path
         self.timeout = timeout
+        # keep-alive connections shared by the main, session, edit, application and imager proxies
+        self.connectionPool = ConnectionPool(host=self.address, timeout=self.timeout, maxsize=pool_size)
+        # support of system.multicall, checked with the first batch
+        self._multicall = None
+        # parameter limits of applications and imagers, can be shared by several devices and persisted
+        self.parameterLimitsCache = limits_cache if limits_cache is not None else ParameterLimitsCache()
+        self._firmwareVersion = None
+        self.deviceType = None
+        # reference image of the active application as tuple (ActiveApplication, LazyImage)
+        self._referenceImage = None
         self.baseURL = "http://" + self.address + self.api_path
         self.mainURL = self.baseURL + "com.ifm.efector/"
         self.mainProxy = MainProxy(url=self.mainURL, timeout=self.timeout, device=self)
@@ -35,6 +47,20 @@ class O2x5xxRPCDevice(object):
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.mainProxy.close()
 
+    def batch(self, ordered=False) -> Batch:
+        """
+        Collect calls of the main API and send them together when leaving the with statement. If system.multicall
+        is not supported, the calls are sent concurrently unless ordered=True, e.g.
+
+            with device.batch() as batch:
+                name = batch.getParameter("Name")
+                applications = batch.getApplicationList()
+
+        :param ordered: (bool) True for keeping the order of the calls if system.multicall is not supported
+        :return: Batch object returning a concurrent.futures.Future for every call
+        """
+        return self.mainProxy.batch(ordered=ordered)
+
     @property
     def sessionProxy(self) -> SessionProxy:
         return getattr(self, "_sessionProxy")
@@ -77,8 +103,20 @@ class O2x5xxRPCDevice(object):
         if self.imagerProxy:
             return Imager(imagerProxy=self.imagerProxy, device=self)
 
+    @property
+    def firmwareVersion(self) -> str:
+        """
+        Firmware version of the device (IFM_Software of getSWVersion()). Requested once per device object.
+
+        :return: (str) firmware version, e.g. "1.30.10479"
+        """
+        if self._firmwareVersion is None:
+            self._firmwareVersion = self.getSWVersion()["IFM_Software"]
+        return self._firmwareVersion
+
     def _getDeviceMeta(self):
         _deviceType = self.getParameter(value="DeviceType")
+        self.deviceType = _deviceType
         result = DevicesMeta.getData(key="DeviceType", value=_deviceType)
         if not result:
             _articleNumber = self.getParameter(value="ArticleNumber")
@@ -180,6 +218,7 @@ class O2x5xxRPCDevice(object):
         :return: None
         """
         self.mainProxy.proxy.switchApplication(applicationIndex)
+        self._referenceImage = None
         self.waitForConfigurationDone()
 
     def getTraceLogs(self, nLogs: int = 0) -> list:
@@ -205,16 +244,49 @@ class O2x5xxRPCDevice(object):
         result = json.loads(self.mainProxy.proxy.getApplicationStatisticData(applicationIndex))
         return result
 
-    def getReferenceImage(self) -> np.ndarray:
+    def getReferenceImage(self, datatype: str = "ndarray", cached: bool = False) -> ["np.ndarray", bytes, LazyImage]:
         """
         Returns the active application's reference image, if there is no fault.
+        With cached=True the image is kept per active application. The cache is cleared when the application is
+        switched, saved or imported and when the edit mode is left, changes by other clients are not noticed.
+
+        :param datatype: (str) "ndarray": the JPEG decompressed image
+                               "bytes": the JPEG data without decoding
+                               "lazy": a LazyImage object which decodes the image on the first access of .array
+        :param cached: (bool) True returns the cached image of the active application if available
+        :return: (np.ndarray, bytes or LazyImage) reference image
+        """
+        if datatype not in ("ndarray", "bytes", "lazy"):
+            raise ValueError("Invalid datatype {}. Choose one of ndarray, bytes or lazy.".format(datatype))
+        cache = self._referenceImage
+        activeApplication = None
+        if cached:
+            activeApplication = self.getParameter("ActiveApplication")
+            if cache is not None and cache[0] is None:
+                # fetched without cached=True, the cache is cleared whenever this client switches the application
+                cache = (activeApplication, cache[1])
+                self._referenceImage = cache
+        if cached and cache is not None and cache[0] == activeApplication:
+            image = cache[1]
+        else:
+            result = self.mainProxy.proxy.getReferenceImage()
+            data = result.data if isinstance(result, xmlrpc.client.Binary) else str(result).encode("latin-1")
+            image = LazyImage(data)
+            # the active application of an uncached image is looked up by the next call with cached=True
+            self._referenceImage = (activeApplication, image)
+        if datatype == "bytes":
+            return image.data
+        if datatype == "lazy":
+            return image
+        return image.array
 
-        :return: (np.ndarray) a JPEG decompressed image
+    def clearReferenceImageCache(self) -> None:
         """
-        b = bytearray()
-        b.extend(map(ord, str(self.mainProxy.proxy.getReferenceImage())))
-        result = mpimg.imread(io.BytesIO(b), format='jpg')
-        return result
+        Remove the cached reference image, e.g. after the reference image of the active application was changed.
+
+        :return: None
+        """
+        self._referenceImage = None
 
     def isConfigurationDone(self) -> bool:
         """
@@ -0,0 +1,290 @@
+import copy
+import json
+import zipfile
+
+# parameters of the exported configs which can not be written with setParameter or are compared separately
+IGNORED_PARAMETERS = {
+    "application": {"ImagerConfigurations", "Models", "ReferenceImage", "HasReferenceImage", "NextImagerConfigId",
+                    "NextModelId", "Firmware", "DeviceType", "ArticleNumber", "Type"},
+    "imager": {"Type"},
+    "model": set(),
+    # volatile values which change without a configuration change
+    "device": {"UpTime", "TemperatureIllu", "ImageTimestampReference", "CurrentTime", "CurrentLocalTime",
+               "OperatingMode", "Stats", "Syncing"}}
+
+
+def loadConfig(configFile: str) -> dict:
+    """
+    Read the JSON content of an exported device- (.o2d5xxcfg) or application-config (.o2d5xxapp) file.
+
+    :param configFile: (str) config file path
+    :return: (dict) content of device.json or application.json
+    """
+    with zipfile.ZipFile(configFile, "r") as zipOpen:
+        zipFiles = zipOpen.namelist()
+        if "device.json" in zipFiles:
+            return json.loads(zipOpen.read("device.json"))
+        if "application.json" in zipFiles:
+            return json.loads(zipOpen.read("application.json"))
+    raise ImportError("Unknown config file in zip: {}".format(str(zipFiles)))
+
+
+def _applications(config, applicationIndex) -> dict:
+    if "Applications" in config:
+        return {index: application for index, application in enumerate(config["Applications"], start=1)
+                if application}
+    # application config
+    return {applicationIndex: config}
+
+
+def _models(application) -> dict:
+    return {int(model.get("Id", index)): model for index, model in enumerate(application.get("Models") or [], 1)}
+
+
+def _equal(old, new) -> bool:
+    if old == new:
+        return True
+    # stringified JSON parameters (e.g. HWROI, LogicGraph) are compared by content, not by formatting
+    if isinstance(old, str) and isinstance(new, str) and old[:1] in "{[" and new[:1] in "{[":
+        try:
+            return json.loads(old) == json.loads(new)
+        except ValueError:
+            return False
+    return False
+
+
+class ParameterChange(object):
+    """
+    Changed parameter of the device, an application, an imager or a model.
+    """
+
+    def __init__(self, scope, name, old, new, application=None, imager=None, model=None, section=None):
+        """
+        :param scope: (str) "device", "application", "imager" or "model"
+        :param name: (str) parameter name
+        :param old: value in the old config
+        :param new: value in the new config
+        :param application: (int) application index
+        :param imager: (int) imager index
+        :param model: (int) model id
+        :param section: (str) section of the device config, e.g. "Device" or "Network"
+        """
+        self.scope = scope
+        self.name = name
+        self.old = old
+        self.new = new
+        self.application = application
+        self.imager = imager
+        self.model = model
+        self.section = section
+
+    def __repr__(self):
+        return "ParameterChange({}: {!r} -> {!r})".format(self.path, self.old, self.new)
+
+    def __eq__(self, other):
+        return isinstance(other, ParameterChange) and self.toDict() == other.toDict()
+
+    @property
+    def path(self) -> str:
+        """
+        :return: (str) location of the parameter, e.g. "application_1/imager_1/ExposureTime"
+        """
+        parts = []
+        if self.section:
+            parts.append(self.section)
+        if self.application is not None:
+            parts.append("application_{}".format(self.application))
+        if self.imager is not None:
+            parts.append("imager_{}".format(self.imager))
+        if self.model is not None:
+            parts.append("model_{}".format(self.model))
+        return "/".join(parts + [self.name])
+
+    @property
+    def applicable(self) -> bool:
+        """
+        :return: (bool) True if the change can be written with setParameter of an application or imager
+        """
+        return self.scope in ("application", "imager")
+
+    def toDict(self) -> dict:
+        return {"scope": self.scope, "section": self.section, "application": self.application,
+                "imager": self.imager, "model": self.model, "name": self.name, "old": self.old, "new": self.new}
+
+
+class ConfigDiff(object):
+    """
+    Structured difference of two exported configurations.
+
+    The parameter changes are collected per device section, application, imager and model. Added or removed
+    applications, imagers and models and changed application or imager types are structural changes, which
+    can only be transferred by importing the complete config. All other application and imager changes can
+    be applied to a device with apply(), which writes only the changed parameters, e.g.
+
+        diff = ConfigDiff.fromFiles("deviceConfig_current.o2d5xxcfg", "deviceConfig_target.o2d5xxcfg")
+        diff.apply(device)
+    """
+
+    def __init__(self, old: dict, new: dict, applicationIndex: int = 1):
+        """
+        :param old: (dict) content of the old config, see loadConfig()
+        :param new: (dict) content of the new config, see loadConfig()
+        :param applicationIndex: (int) application index used for application configs
+        """
+        self.old = old
+        self.new = new
+        self.changes = []
+        self.structural = []
+        self._compareDevice()
+        oldApplications = _applications(old, applicationIndex)
+        newApplications = _applications(new, applicationIndex)
+        for index in sorted(set(oldApplications) | set(newApplications)):
+            if index not in newApplications:
+                self.structural.append("application_{} removed".format(index))
+            elif index not in oldApplications:
+                self.structural.append("application_{} added".format(index))
+            else:
+                self._compareApplication(index, oldApplications[index], newApplications[index])
+
+    @classmethod
+    def fromFiles(cls, oldFile: str, newFile: str, applicationIndex: int = 1) -> "ConfigDiff":
+        """
+        :param oldFile: (str) path of the old config file, e.g. an export of the current device configuration
+        :param newFile: (str) path of the new (target) config file
+        :param applicationIndex: (int) application index used for application config files
+        :return: ConfigDiff object
+        """
+        return cls(old=loadConfig(oldFile), new=loadConfig(newFile), applicationIndex=applicationIndex)
+
+    def __len__(self):
+        return len(self.changes) + len(self.structural)
+
+    def __repr__(self):
+        return "ConfigDiff({} changes, {} structural changes)".format(len(self.changes), len(self.structural))
+
+    def _compare(self, old, new, scope, **location):
+        for name in sorted(set(old) | set(new)):
+            if name in IGNORED_PARAMETERS[scope]:
+                continue
+            oldValue, newValue = old.get(name), new.get(name)
+            if isinstance(oldValue, (dict, list)) or isinstance(newValue, (dict, list)):
+                continue
+            if not _equal(oldValue, newValue):
+                self.changes.append(ParameterChange(scope=scope, name=name, old=oldValue, new=newValue,
+                                                    **location))
+
+    def _compareDevice(self):
+        for section in sorted(set(self.old) | set(self.new)):
+            oldSection, newSection = self.old.get(section), self.new.get(section)
+            if section != "Applications" and (isinstance(oldSection, dict) or isinstance(newSection, dict)):
+                self._compare(oldSection or {}, newSection or {}, "device", section=section)
+
+    def _compareApplication(self, index, old, new):
+        if old.get("Type") != new.get("Type"):
+            self.structural.append("application_{} type changed from {} to {}"
+                                   .format(index, old.get("Type"), new.get("Type")))
+            return
+        self._compare(old, new, "application", application=index)
+        oldImagers = old.get("ImagerConfigurations") or {}
+        newImagers = new.get("ImagerConfigurations") or {}
+        for imager in sorted(set(oldImagers) | set(newImagers), key=int):
+            if imager not in newImagers:
+                self.structural.append("application_{}/imager_{} removed".format(index, imager))
+            elif imager not in oldImagers:
+                self.structural.append("application_{}/imager_{} added".format(index, imager))
+            elif oldImagers[imager].get("Type") != newImagers[imager].get("Type"):
+                self.structural.append("application_{}/imager_{} type changed".format(index, imager))
+            else:
+                self._compare(oldImagers[imager], newImagers[imager], "imager", application=index,
+                              imager=int(imager))
+        oldModels, newModels = _models(old), _models(new)
+        for model in sorted(set(oldModels) | set(newModels)):
+            if model not in newModels:
+                self.structural.append("application_{}/model_{} removed".format(index, model))
+            elif model not in oldModels:
+                self.structural.append("application_{}/model_{} added".format(index, model))
+            else:
+                self._compare(oldModels[model], newModels[model], "model", application=index, model=model)
+
+    @property
+    def applicable(self) -> bool:
+        """
+        :return: (bool) True if all differences can be applied with apply()
+        """
+        return not self.structural and all(change.applicable for change in self.changes)
+
+    def byObject(self) -> dict:
+        """
+        Applicable changes grouped by application and imager.
+
+        :return: (dict) {application index: {None: [application changes], imager index: [imager changes]}}
+        """
+        result = {}
+        for change in self.changes:
+            if change.applicable:
+                result.setdefault(change.application, {}).setdefault(change.imager, []).append(change)
+        return result
+
+    def toDict(self) -> dict:
+        """
+        :return: (dict) JSON serializable diff
+        """
+        return {"changes": [change.toDict() for change in self.changes], "structural": list(self.structural)}
+
+    def patched(self) -> dict:
+        """
+        Copy of the old config with the applicable changes of the new config, e.g. for checking the result.
+
+        :return: (dict) config content
+        """
+        result = copy.deepcopy(self.old)
+        applications = result.get("Applications")
+        for change in self.changes:
+            if not change.applicable:
+                continue
+            application = applications[change.application - 1] if applications is not None else result
+            target = application if change.imager is None \
+                else application["ImagerConfigurations"][str(change.imager)]
+            target[change.name] = change.new
+        return result
+
+    def apply(self, device, strict: bool = True, save: bool = True) -> list:
+        """
+        Write the changed application and imager parameters to the device. The parameters of every application
+        and imager are written in one transaction, so the device applies the new configuration once per object.
+        The device must be in the state of the old config, e.g. the old config is an export of the device.
+
+        :param device: (O2x5xxRPCDevice) device
+        :param strict: (bool) True raises a ValueError if the diff contains changes which can not be applied
+                       (structural, device and model changes). False skips them.
+        :param save: (bool) store the changed applications in persistent memory
+        :return: (list) applied ParameterChange objects
+        """
+        skipped = self.structural + [change.path for change in self.changes if not change.applicable]
+        if strict and skipped:
+            raise ValueError("The following differences can not be applied with setParameter, "
+                             "import the complete config instead:\n{}".format("\n".join(skipped)))
+        objects = self.byObject()
+        applied = []
+        if not objects:
+            return applied
+        with device.mainProxy.requestSession(), device.sessionProxy.setOperatingMode(mode=1):
+            for applicationIndex in sorted(objects):
+                with device.editProxy.editApplication(app_index=applicationIndex):
+                    imagers = objects[applicationIndex]
+                    if None in imagers:
+                        application = device.application
+                        with application.transaction():
+                            for change in imagers[None]:
+                                application.setParameter(change.name, change.new)
+                        applied.extend(imagers[None])
+                    for imagerIndex in sorted(index for index in imagers if index is not None):
+                        with device.applicationProxy.editImager(imager_index=imagerIndex):
+                            imager = device.imager
+                            with imager.transaction():
+                                for change in imagers[imagerIndex]:
+                                    imager.setParameter(change.name, change.new)
+                        applied.extend(imagers[imagerIndex])
+                    if save:
+                        device.application.save()
+        return applied
@@ -0,0 +1,237 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from .client import O2x5xxRPCDevice, SOCKET_TIMEOUT
+import os
+import threading
+import time
+
+
+class DeviceResult(object):
+    """
+    Result of a fleet operation for one device.
+    """
+
+    def __init__(self, address, operation):
+        self.address = address
+        self.operation = operation
+        self.success = False
+        # path of the written (backup) or imported (restore) config file
+        self.path = None
+        # active application of the device at the time of the backup
+        self.activeApplication = None
+        self.error = None
+        self.attempts = 0
+        self.started = None
+        self.finished = None
+
+    def __repr__(self):
+        return "DeviceResult(address={!r}, operation={!r}, success={}, attempts={}, duration={:.3f}, error={!r})" \
+            .format(self.address, self.operation, self.success, self.attempts, self.duration, self.error)
+
+    @property
+    def duration(self) -> float:
+        """
+        :return: (float) duration of the operation including all retries in seconds
+        """
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def toDict(self) -> dict:
+        """
+        :return: (dict) result as JSON serializable dict, the error is given as string
+        """
+        return {"address": self.address, "operation": self.operation, "success": self.success, "path": self.path,
+                "activeApplication": self.activeApplication, "attempts": self.attempts,
+                "duration": self.duration, "error": None if self.error is None else repr(self.error)}
+
+
+class _Deadline(object):
+    """
+    Remaining time of the operation of one device. Every step of the operation is sent with a socket timeout
+    which ends at the deadline at the latest.
+    """
+
+    def __init__(self, result, timeout, socketTimeout):
+        self.result = result
+        self.timeout = timeout
+        self.socketTimeout = socketTimeout
+        self.deadline = None if timeout is None else result.started + timeout
+
+    def remaining(self) -> [float, None]:
+        """
+        :return: (float) remaining time in seconds, None without deadline. Raises TimeoutError after the deadline.
+        """
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("{} of {} not finished within {} seconds."
+                               .format(self.result.operation, self.result.address, self.timeout))
+        return remaining
+
+    def requestTimeout(self) -> float:
+        """
+        :return: (float) socket timeout of the next request in seconds
+        """
+        remaining = self.remaining()
+        return self.socketTimeout if remaining is None else min(self.socketTimeout, remaining)
+
+    def step(self, device) -> [float, None]:
+        """
+        Start the next step of the operation: limit the socket timeout of the proxies of the device
+        to the remaining time.
+
+        :param device: (O2x5xxRPCDevice) device
+        :return: (float) remaining time in seconds, None without deadline
+        """
+        timeout = self.requestTimeout()
+        device.mainProxy.timeout = timeout
+        sessionProxy = getattr(device, "_sessionProxy", None)
+        if sessionProxy:
+            sessionProxy.timeout = timeout
+        return self.remaining()
+
+
+class FleetRunner(object):
+    """
+    Backup and restore of the configurations of many devices with a bounded number of worker threads.
+
+    Every device is processed with a per-device timeout and a number of retries, the results are returned
+    as one DeviceResult per device in the order of the given addresses, e.g.
+
+        runner = FleetRunner(["192.168.0.69", "192.168.0.70"], max_workers=8, timeout=300, retries=2)
+        results = runner.backup(backupPath="backups")
+        failed = [r.address for r in results if not r.success]
+    """
+
+    def __init__(self, addresses, max_workers=4, timeout=300.0, retries=1, retry_delay=1.0,
+                 socket_timeout=SOCKET_TIMEOUT, password="", device_factory=O2x5xxRPCDevice):
+        """
+        :param addresses: (list) device addresses
+        :param max_workers: (int) max. number of devices which are processed at the same time
+        :param timeout: (float) max. time in seconds for the operation of one device including all retries.
+                        Every request is sent with a socket timeout ending at this deadline, a device which
+                        is not finished in time fails with TimeoutError. None waits forever.
+        :param retries: (int) number of retries after a failed attempt
+        :param retry_delay: (float) delay between two attempts in seconds
+        :param socket_timeout: (float) timeout of the single XML-RPC requests in seconds
+        :param password: (str) session password of the devices
+        :param device_factory: (callable) creates the device object with the arguments address and timeout
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        if retries < 0:
+            raise ValueError("retries must not be negative.")
+        self.addresses = list(addresses)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.socket_timeout = socket_timeout
+        self.password = password
+        self.device_factory = device_factory
+        self.cancel = threading.Event()
+
+    def backup(self, backupPath: str, callback=None) -> list:
+        """
+        Export the configurations of all devices into backupPath. The files are named
+        deviceConfig_<address>.<extension>, e.g. deviceConfig_192_168_0_69.o2d5xxcfg.
+
+        :param backupPath: (str) folder for the config files, created if it does not exist
+        :param callback: (callable) called with the DeviceResult of every finished device
+        :return: (list) DeviceResult of every device in the order of the addresses
+        """
+        os.makedirs(backupPath, exist_ok=True)
+
+        def operation(device, result, deadline):
+            deadline.step(device)
+            result.activeApplication = device.getParameter("ActiveApplication")
+            configName = os.path.join(backupPath, "deviceConfig_{}".format(result.address.replace(".", "_")
+                                                                           .replace(":", "_")))
+            deadline.step(device)
+            session = device.requestSession(password=self.password)
+            try:
+                remaining = deadline.step(device)
+                result.path = session.exportConfigToFile(configName, timeout=remaining, cancel=self.cancel)
+            finally:
+                session.cancelSession()
+
+        return self._run("backup", operation, callback)
+
+    def restore(self, configFiles: dict, global_settings=True, network_settings=False, applications=True,
+                activeApplications: dict = None, callback=None) -> list:
+        """
+        Import a config file into every device.
+
+        :param configFiles: (dict) config file path per device address
+        :param global_settings: (bool) Include Global-Configuration (Name, Description, Location, ...)
+        :param network_settings: (bool) Include Network-Configuration (IP, DHCP, ...)
+        :param applications: (bool) Include All Application-Configurations
+        :param activeApplications: (dict) application index per device address which is activated after the
+                                   import, e.g. {r.address: r.activeApplication for r in backupResults}
+        :param callback: (callable) called with the DeviceResult of every finished device
+        :return: (list) DeviceResult of every device in the order of the addresses
+        """
+        activeApplications = activeApplications or {}
+
+        def operation(device, result, deadline):
+            result.path = configFiles[result.address]
+            deadline.step(device)
+            session = device.requestSession(password=self.password)
+            try:
+                remaining = deadline.step(device)
+                session.importConfigFromFile(result.path, global_settings=global_settings,
+                                             network_settings=network_settings, applications=applications,
+                                             timeout=remaining, cancel=self.cancel)
+            finally:
+                session.cancelSession()
+            activeApplication = activeApplications.get(result.address)
+            if activeApplication is not None and str(activeApplication) != "0":
+                deadline.step(device)
+                device.switchApplication(int(activeApplication))
+            result.activeApplication = activeApplication
+
+        missing = [address for address in self.addresses if address not in configFiles]
+        if missing:
+            raise ValueError("No config file for the devices {}.".format(missing))
+        return self._run("restore", operation, callback)
+
+    def _run(self, name, operation, callback) -> list:
+        results = [DeviceResult(address=address, operation=name) for address in self.addresses]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="o2x5xx-fleet") as executor:
+            futures = [executor.submit(self._runDevice, operation, result) for result in results]
+            for future in as_completed(futures):
+                result = future.result()
+                if callback:
+                    callback(result)
+        return results
+
+    def _runDevice(self, operation, result) -> DeviceResult:
+        result.started = time.monotonic()
+        deadline = _Deadline(result=result, timeout=self.timeout, socketTimeout=self.socket_timeout)
+        while not self.cancel.is_set():
+            try:
+                timeout = deadline.requestTimeout()
+            except TimeoutError as e:
+                result.error = TimeoutError("{} Last error: {!r}".format(e, result.error))
+                break
+            result.attempts += 1
+            try:
+                device = self.device_factory(address=result.address, timeout=timeout)
+                try:
+                    operation(device, result, deadline)
+                finally:
+                    device.mainProxy.close()
+                # an operation which finished after the deadline failed as well
+                deadline.remaining()
+                result.success = True
+                result.error = None
+                break
+            except Exception as e:
+                result.error = e
+                if result.attempts > self.retries or self.cancel.wait(self.retry_delay):
+                    break
+        if not result.success and result.error is None:
+            result.error = CancelledError("{} of {} cancelled.".format(result.operation, result.address))
+        result.finished = time.monotonic()
+        return result
@@ -0,0 +1,225 @@
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+import threading
+import time
+import warnings
+
+_scheduler = None
+_schedulerLock = threading.Lock()
+
+
+def getHeartbeatScheduler() -> "HeartbeatScheduler":
+    """
+    Heartbeat scheduler shared by all sessions.
+
+    :return: (HeartbeatScheduler) shared scheduler
+    """
+    global _scheduler
+    with _schedulerLock:
+        if _scheduler is None:
+            _scheduler = HeartbeatScheduler()
+        return _scheduler
+
+
+def closeHeartbeatScheduler() -> None:
+    """
+    Stop the heartbeat scheduler shared by all sessions. A new scheduler is created for the next session.
+
+    :return: None
+    """
+    global _scheduler
+    with _schedulerLock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.close()
+
+
+class HeartbeatEntry(object):
+    """
+    Registration of a session in the HeartbeatScheduler.
+    """
+
+    def __init__(self, sessionProxy, interval):
+        self.sessionProxy = sessionProxy
+        self.interval = interval
+        # time until the device keeps the session alive without the next heartbeat
+        self.expires = time.monotonic() + interval
+        self.deadline = None
+        self.cancelled = False
+        # thread which currently sends a heartbeat of the session
+        self.sending = None
+        self.sent = 0
+        self.missed = 0
+        self.error = None
+
+
+class HeartbeatScheduler(object):
+    """
+    Sends the heartbeats of all sessions from one scheduler thread instead of one timer thread per heartbeat.
+
+    The sessions are kept in a heap ordered by the deadline of their next heartbeat. All heartbeats which are due
+    within the batch window are sent together over a small, fixed pool of worker threads, so a slow device does not
+    delay the heartbeats of the other devices and the number of threads is constant. The heartbeats are sent with
+    a timeout shorter than the lead time, so an unreachable device occupies a worker only until the heartbeat can
+    still be repeated. A heartbeat which is sent after the session already expired is counted as missed deadline
+    and reported with a warning.
+    """
+
+    def __init__(self, lead: float = 5.0, batchWindow: float = 0.5, retryInterval: float = 1.0, maxWorkers: int = 4,
+                 timeout: float = None):
+        """
+        :param lead: (float) time in seconds the heartbeat is sent before the session expires, at most half of the
+                     heartbeat interval
+        :param batchWindow: (float) heartbeats which are due within this time in seconds are sent together
+        :param retryInterval: (float) time in seconds after which a failed heartbeat is repeated
+        :param maxWorkers: (int) number of threads sending the heartbeats
+        :param timeout: (float) time in seconds to wait for the answer of a heartbeat. Default: 80 % of lead
+        """
+        self.lead = lead
+        self.batchWindow = batchWindow
+        self.retryInterval = retryInterval
+        self.maxWorkers = maxWorkers
+        self.timeout = timeout if timeout is not None else (lead * 0.8 if lead > 0 else None)
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+        self.missed = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: (dict) number of registered sessions and of sent, failed and too late heartbeats
+        """
+        with self._condition:
+            sessions = len([entry for _, _, entry in self._heap if not entry.cancelled])
+            return {"sessions": sessions, "sent": self.sent, "failed": self.failed, "missed": self.missed}
+
+    def register(self, sessionProxy, interval: float) -> HeartbeatEntry:
+        """
+        Send the heartbeats of a session until it is unregistered. The first heartbeat must already be sent.
+
+        :param sessionProxy: (SessionProxy) session proxy, its doAutoHeartbeat() method is called
+        :param interval: (float) heartbeat interval in seconds confirmed by the device
+        :return: (HeartbeatEntry) registration for unregister()
+        """
+        entry = HeartbeatEntry(sessionProxy=sessionProxy, interval=interval)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Heartbeat scheduler is closed.")
+            self._push(entry, max(entry.expires - min(self.lead, entry.interval / 2), time.monotonic()))
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.maxWorkers,
+                                                    thread_name_prefix="o2x5xx-heartbeat")
+                self._thread = threading.Thread(target=self._run, name="o2x5xx-heartbeat-scheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return entry
+
+    def unregister(self, entry: HeartbeatEntry, wait: bool = True) -> None:
+        """
+        Stop sending the heartbeats of a session.
+
+        :param entry: (HeartbeatEntry) registration returned by register()
+        :param wait: (bool) wait until a heartbeat of the session which is currently sent is finished
+        :return: None
+        """
+        with self._condition:
+            entry.cancelled = True
+            self._condition.notify_all()
+            while wait and entry.sending is not None and entry.sending is not threading.current_thread():
+                self._condition.wait()
+
+    def close(self) -> None:
+        """
+        Stop sending the heartbeats of all sessions and stop the scheduler and worker threads.
+        Waits until the heartbeats which are currently sent are finished.
+
+        :return: None
+        """
+        with self._condition:
+            self._closed = True
+            for _, _, entry in self._heap:
+                entry.cancelled = True
+            self._heap.clear()
+            thread, self._thread = self._thread, None
+            executor, self._executor = self._executor, None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _push(self, entry, deadline):
+        entry.deadline = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), entry))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                # drop cancelled sessions at the top of the heap
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                if self._heap[0][0] > now:
+                    self._condition.wait(self._heap[0][0] - now)
+                    continue
+                while self._heap and self._heap[0][0] <= now + self.batchWindow:
+                    entry = heapq.heappop(self._heap)[2]
+                    if not entry.cancelled:
+                        self._executor.submit(self._send, entry)
+
+    def _send(self, entry):
+        with self._condition:
+            if entry.cancelled:
+                return
+            entry.sending = threading.current_thread()
+        try:
+            self._sendHeartbeat(entry)
+        finally:
+            with self._condition:
+                entry.sending = None
+                self._condition.notify_all()
+
+    def _sendHeartbeat(self, entry):
+        sentAt = time.monotonic()
+        try:
+            interval = entry.sessionProxy.doAutoHeartbeat(timeout=self.timeout)
+        except Exception as e:
+            with self._condition:
+                entry.error = e
+                self.failed += 1
+                if not entry.cancelled and time.monotonic() < entry.expires:
+                    # the session is still alive, repeat the heartbeat
+                    self._push(entry, time.monotonic() + self.retryInterval)
+                    self._condition.notify_all()
+            if time.monotonic() >= entry.expires:
+                warnings.warn("Heartbeat of session {} failed, the session expired: {!r}"
+                              .format(entry.sessionProxy.baseURL, e), ResourceWarning)
+            return
+        with self._condition:
+            entry.sent += 1
+            entry.error = None
+            self.sent += 1
+            late = sentAt - entry.expires
+            if late > 0:
+                entry.missed += 1
+                self.missed += 1
+            entry.interval = interval
+            entry.expires = sentAt + interval
+            if not entry.cancelled:
+                self._push(entry, max(entry.expires - min(self.lead, entry.interval / 2), time.monotonic()))
+                self._condition.notify_all()
+        if late > 0:
+            warnings.warn("Heartbeat of session {} sent {:.3f} seconds after the session expired."
+                          .format(entry.sessionProxy.baseURL, late), ResourceWarning)
@@ -1,18 +1,32 @@
-from urllib.request import urlopen
 import json
-import time
 import ast
+import threading
+from .progress import waitForProgress
+
+# schema of the Image Quality Check per device address and firmware version
+_schemaCache = {}
+_schemaCacheLock = threading.Lock()
 
 
 class ImageQualityCheck(object):
     """
     ImageQualityCheck object
     """
+    # KPI name: (key suffix in QualityCheckConfig, name used in error messages)
+    THRESHOLDS = {"sharpness": ("sharpness", "sharpness"),
+                  "meanBrightness": ("brightness", "brightness"),
+                  "underexposedArea": ("area_low_exposure", "underexposedArea"),
+                  "overexposedArea": ("area_high_exposure", "overexposedArea")}
 
     def __init__(self, imagerProxy, device):
         self._imagerProxy = imagerProxy
         self._device = device
 
+    def _setParameter(self, name, value):
+        self._imagerProxy.proxy.setParameter(name, value)
+        if getattr(self._imagerProxy, "parameterSnapshot", None):
+            self._imagerProxy.parameterSnapshot.invalidate(name)
+
     @property
     def enabled(self) -> bool:
         """
@@ -20,9 +34,9 @@ class ImageQualityCheck(object):
 
         :return: (bool) True / False
         """
-        if self._imagerProxy.proxy.getAllParameters()["QualityCheckConfig"]:
-            return True
-        return False
+        if self._QualityCheckConfig is None:
+            return False
+        return True
 
     @enabled.setter
     def enabled(self, value: bool) -> None:
@@ -33,22 +47,22 @@ class ImageQualityCheck(object):
         :return: None
         """
         if value:
-            self._imagerProxy.proxy.setParameter("QualityCheckConfig", True)
+            self._setParameter("QualityCheckConfig", True)
         else:
-            self._imagerProxy.proxy.setParameter("QualityCheckConfig", "")
-        while self._device.isConfigurationDone() < 1.0:
-            time.sleep(1)
+            self._setParameter("QualityCheckConfig", "")
+        waitForProgress(self._device.isConfigurationDone)
 
     @property
     def _QualityCheckConfig(self) -> [dict, None]:
         """
         The configuration of the quality check currently performed on the image.
+        Requested with one call from the device.
 
-        :return: (dict or None) The configuration as an empty string or a JSON object
+        :return: (dict or None) The configuration as a JSON object or None if the quality check is disabled
         """
-        if not self.enabled:
-            return None
         result = self._imagerProxy.proxy.getAllParameters()["QualityCheckConfig"]
+        if not result:
+            return None
         result = ast.literal_eval(result)
         return result
 
@@ -62,18 +76,92 @@ class ImageQualityCheck(object):
         """
         if not self.enabled:
             self.enabled = True
-        self._imagerProxy.proxy.setParameter("QualityCheckConfig", json.dumps(inputDict))
+        self._setParameter("QualityCheckConfig", json.dumps(inputDict))
 
     @property
     def _QualityCheckConfigSchema(self) -> dict:
         """
         Get the schema mit default values, limits and keys for Image Quality Check.
+        The schema is downloaded once per device address and firmware version.
 
         :return: (dict) schema of Image Quality Check
         """
+        key = (self._device.address, self._device.firmwareVersion)
+        with _schemaCacheLock:
+            if key in _schemaCache:
+                return _schemaCache[key]
+        from urllib.request import urlopen
         with urlopen("http://{}/schema/ParamImageFeatures.json".format(self._device.address)) as url:
             data = json.load(url)
-            return data
+        with _schemaCacheLock:
+            _schemaCache[key] = data
+        return data
+
+    def _thresholdMinMax(self, config, name) -> [dict, None]:
+        if config is None:
+            return None
+        suffix = self.THRESHOLDS[name][0]
+        return {"min": config["threshold_min_" + suffix], "max": config["threshold_max_" + suffix]}
+
+    def _checkThresholdMinMax(self, limits, name, inputDict) -> None:
+        suffix, label = self.THRESHOLDS[name]
+        minThreshold_MinLimit = int(limits["threshold_min_" + suffix]["min"])
+        minThreshold_MaxLimit = int(limits["threshold_min_" + suffix]["max"])
+        maxThreshold_MinLimit = int(limits["threshold_max_" + suffix]["min"])
+        maxThreshold_MaxLimit = int(limits["threshold_max_" + suffix]["max"])
+        if not minThreshold_MinLimit <= inputDict["min"] <= minThreshold_MaxLimit:
+            raise ValueError("Min. {} threshold value {} not in range [{}, {}]"
+                             .format(label, inputDict["min"], minThreshold_MinLimit, minThreshold_MaxLimit))
+        if not maxThreshold_MinLimit <= inputDict["max"] <= maxThreshold_MaxLimit:
+            raise ValueError("Max. {} threshold value {} not in range [{}, {}]"
+                             .format(label, inputDict["max"], maxThreshold_MinLimit, maxThreshold_MaxLimit))
+        if not inputDict["min"] < inputDict["max"]:
+            raise ValueError("Max. {} threshold value {} is smaller than Min. {} threshold value {}!"
+                             .format(label, inputDict["max"], label, inputDict["min"]))
+
+    @property
+    def thresholdsMinMax(self) -> [dict, None]:
+        """
+        Get the current set min. and max. threshold values of all KPIs for this image with one request.
+
+        :return: (dict or None) dict with the keys "sharpness", "meanBrightness", "underexposedArea" and
+                 "overexposedArea", each with a dict with the keys "min" and "max".
+                 If Image Quality Check is disabled return value is None
+        """
+        config = self._QualityCheckConfig
+        if config is None:
+            return None
+        return {name: self._thresholdMinMax(config, name) for name in self.THRESHOLDS}
+
+    def setThresholdsMinMax(self, sharpness: dict = None, meanBrightness: dict = None,
+                            underexposedArea: dict = None, overexposedArea: dict = None) -> None:
+        """
+        Set the min. and max. threshold values of several KPIs for this image with one setParameter call.
+        KPIs which are None are not changed.
+
+        :param sharpness: (dict) input dict with keys "min" and "max", e.g. {"min": 1000, "max": 10000}
+        :param meanBrightness: (dict) input dict with keys "min" and "max", e.g. {"min": 10, "max": 220}
+        :param underexposedArea: (dict) input dict with keys "min" and "max", e.g. {"min": 10, "max": 90}
+        :param overexposedArea: (dict) input dict with keys "min" and "max", e.g. {"min": 10, "max": 90}
+        :return: None
+        """
+        thresholds = {"sharpness": sharpness, "meanBrightness": meanBrightness,
+                      "underexposedArea": underexposedArea, "overexposedArea": overexposedArea}
+        thresholds = {name: value for name, value in thresholds.items() if value is not None}
+        if not thresholds:
+            return
+        config = self._QualityCheckConfig
+        if config is None:
+            raise SystemError("Image Quality Check not enabled!")
+        limits = self._QualityCheckConfigSchema
+        for name, inputDict in thresholds.items():
+            self._checkThresholdMinMax(limits, name, inputDict)
+        for name, inputDict in thresholds.items():
+            suffix = self.THRESHOLDS[name][0]
+            config["threshold_min_" + suffix] = inputDict["min"]
+            config["threshold_max_" + suffix] = inputDict["max"]
+        self._setParameter("QualityCheckConfig", json.dumps(config))
+        self._device.waitForConfigurationDone()
 
     @property
     def sharpness_thresholdMinMax(self) -> [dict, None]:
@@ -82,10 +170,7 @@ class ImageQualityCheck(object):
 
         :return: (dict or None) if Image Quality Check is disabled return value is None
         """
-        if not self.enabled:
-            return None
-        return {"min": self._QualityCheckConfig["threshold_min_sharpness"],
-                "max": self._QualityCheckConfig["threshold_max_sharpness"]}
+        return self._thresholdMinMax(self._QualityCheckConfig, "sharpness")
 
     @sharpness_thresholdMinMax.setter
     def sharpness_thresholdMinMax(self, inputDict: dict) -> None:
@@ -96,27 +181,7 @@ class ImageQualityCheck(object):
             example: inputDict = {"min": 1000, "max": 10000}
         :return: None
         """
-        if not self.enabled:
-            raise SystemError("Image Quality Check not enabled!")
-        limits = self._QualityCheckConfigSchema
-        minThreshold_MinLimit = int(limits["threshold_min_sharpness"]["min"])
-        minThreshold_MaxLimit = int(limits["threshold_min_sharpness"]["max"])
-        maxThreshold_MinLimit = int(limits["threshold_max_sharpness"]["min"])
-        maxThreshold_MaxLimit = int(limits["threshold_max_sharpness"]["max"])
-        if not minThreshold_MinLimit <= inputDict["min"] <= minThreshold_MaxLimit:
-            raise ValueError("Min. sharpness threshold value {} not in range [{}, {}]"
-                             .format(inputDict["min"], minThreshold_MinLimit, minThreshold_MaxLimit))
-        if not maxThreshold_MinLimit <= inputDict["max"] <= maxThreshold_MaxLimit:
-            raise ValueError("Max. sharpness threshold value {} not in range [{}, {}]"
-                             .format(inputDict["max"], maxThreshold_MinLimit, maxThreshold_MaxLimit))
-        if not inputDict["min"] < inputDict["max"]:
-            raise ValueError("Max. sharpness threshold value {} is smaller than Min. sharpness threshold value {}!"
-                             .format(inputDict["max"], inputDict["min"]))
-        tmp = self._QualityCheckConfig
-        tmp["threshold_min_sharpness"] = inputDict["min"]
-        tmp["threshold_max_sharpness"] = inputDict["max"]
-        self._QualityCheckConfig = tmp
-        self._device.waitForConfigurationDone()
+        self.setThresholdsMinMax(sharpness=inputDict)
 
     @property
     def meanBrightness_thresholdMinMax(self) -> [dict, None]:
@@ -125,10 +190,7 @@ class ImageQualityCheck(object):
 
         :return: (dict or None) if Image Quality Check is disabled return value is None
         """
-        if not self.enabled:
-            return None
-        return {"min": self._QualityCheckConfig["threshold_min_brightness"],
-                "max": self._QualityCheckConfig["threshold_max_brightness"]}
+        return self._thresholdMinMax(self._QualityCheckConfig, "meanBrightness")
 
     @meanBrightness_thresholdMinMax.setter
     def meanBrightness_thresholdMinMax(self, inputDict: dict) -> None:
@@ -139,27 +201,7 @@ class ImageQualityCheck(object):
             example: inputDict = {"min": 10, "max": 220}
         :return: None
         """
-        if not self.enabled:
-            raise SystemError("Image Quality Check not enabled!")
-        limits = self._QualityCheckConfigSchema
-        minThreshold_MinLimit = int(limits["threshold_min_brightness"]["min"])
-        minThreshold_MaxLimit = int(limits["threshold_min_brightness"]["max"])
-        maxThreshold_MinLimit = int(limits["threshold_max_brightness"]["min"])
-        maxThreshold_MaxLimit = int(limits["threshold_max_brightness"]["max"])
-        if not minThreshold_MinLimit <= inputDict["min"] <= minThreshold_MaxLimit:
-            raise ValueError("Min. brightness threshold value {} not in range [{}, {}]"
-                             .format(inputDict["min"], minThreshold_MinLimit, minThreshold_MaxLimit))
-        if not maxThreshold_MinLimit <= inputDict["max"] <= maxThreshold_MaxLimit:
-            raise ValueError("Max. brightness threshold value {} not in range [{}, {}]"
-                             .format(inputDict["max"], maxThreshold_MinLimit, maxThreshold_MaxLimit))
-        if not inputDict["min"] < inputDict["max"]:
-            raise ValueError("Max. brightness threshold value {} is smaller than Min. brightness threshold value {}!"
-                             .format(inputDict["max"], inputDict["min"]))
-        tmp = self._QualityCheckConfig
-        tmp["threshold_min_brightness"] = inputDict["min"]
-        tmp["threshold_max_brightness"] = inputDict["max"]
-        self._QualityCheckConfig = tmp
-        self._device.waitForConfigurationDone()
+        self.setThresholdsMinMax(meanBrightness=inputDict)
 
     @property
     def underexposedArea_thresholdMinMax(self) -> [dict, None]:
@@ -168,10 +210,7 @@ class ImageQualityCheck(object):
 
         :return: (dict or None) if Image Quality Check is disabled return value is None
         """
-        if not self.enabled:
-            return None
-        return {"min": self._QualityCheckConfig["threshold_min_area_low_exposure"],
-                "max": self._QualityCheckConfig["threshold_max_area_low_exposure"]}
+        return self._thresholdMinMax(self._QualityCheckConfig, "underexposedArea")
 
     @underexposedArea_thresholdMinMax.setter
     def underexposedArea_thresholdMinMax(self, inputDict: dict) -> None:
@@ -182,28 +221,7 @@ class ImageQualityCheck(object):
             example: inputDict = {"min": 10, "max": 90}
         :return: None
         """
-        if not self.enabled:
-            raise SystemError("Image Quality Check not enabled!")
-        limits = self._QualityCheckConfigSchema
-        minThreshold_MinLimit = int(limits["threshold_min_area_low_exposure"]["min"])
-        minThreshold_MaxLimit = int(limits["threshold_min_area_low_exposure"]["max"])
-        maxThreshold_MinLimit = int(limits["threshold_max_area_low_exposure"]["min"])
-        maxThreshold_MaxLimit = int(limits["threshold_max_area_low_exposure"]["max"])
-        if not minThreshold_MinLimit <= inputDict["min"] <= minThreshold_MaxLimit:
-            raise ValueError("Min. underexposedArea threshold value {} not in range [{}, {}]"
-                             .format(inputDict["min"], minThreshold_MinLimit, minThreshold_MaxLimit))
-        if not maxThreshold_MinLimit <= inputDict["max"] <= maxThreshold_MaxLimit:
-            raise ValueError("Max. underexposedArea threshold value {} not in range [{}, {}]"
-                             .format(inputDict["max"], maxThreshold_MinLimit, maxThreshold_MaxLimit))
-        if not inputDict["min"] < inputDict["max"]:
-            raise ValueError("Max. underexposedArea threshold value {} is smaller "
-                             "than Min. underexposedArea threshold value {}!"
-                             .format(inputDict["max"], inputDict["min"]))
-        tmp = self._QualityCheckConfig
-        tmp["threshold_min_area_low_exposure"] = inputDict["min"]
-        tmp["threshold_max_area_low_exposure"] = inputDict["max"]
-        self._QualityCheckConfig = tmp
-        self._device.waitForConfigurationDone()
+        self.setThresholdsMinMax(underexposedArea=inputDict)
 
     @property
     def overexposedArea_thresholdMinMax(self) -> [dict, None]:
@@ -212,10 +230,7 @@ class ImageQualityCheck(object):
 
         :return: (dict or None) if Image Quality Check is disabled return value is None
         """
-        if not self.enabled:
-            return None
-        return {"min": self._QualityCheckConfig["threshold_min_area_high_exposure"],
-                "max": self._QualityCheckConfig["threshold_max_area_high_exposure"]}
+        return self._thresholdMinMax(self._QualityCheckConfig, "overexposedArea")
 
     @overexposedArea_thresholdMinMax.setter
     def overexposedArea_thresholdMinMax(self, inputDict: dict) -> None:
@@ -226,26 +241,4 @@ class ImageQualityCheck(object):
             example: inputDict = {"min": 10, "max": 90}
         :return: None
         """
-        if not self.enabled:
-            raise SystemError("Image Quality Check not enabled!")
-        limits = self._QualityCheckConfigSchema
-        minThreshold_MinLimit = int(limits["threshold_min_area_high_exposure"]["min"])
-        minThreshold_MaxLimit = int(limits["threshold_min_area_high_exposure"]["max"])
-        maxThreshold_MinLimit = int(limits["threshold_max_area_high_exposure"]["min"])
-        maxThreshold_MaxLimit = int(limits["threshold_max_area_high_exposure"]["max"])
-        if not minThreshold_MinLimit <= inputDict["min"] <= minThreshold_MaxLimit:
-            raise ValueError("Min. overexposedArea threshold value {} not in range [{}, {}]"
-                             .format(inputDict["min"], minThreshold_MinLimit, minThreshold_MaxLimit))
-        if not maxThreshold_MinLimit <= inputDict["max"] <= maxThreshold_MaxLimit:
-            raise ValueError("Max. overexposedArea threshold value {} not in range [{}, {}]"
-                             .format(inputDict["max"], maxThreshold_MinLimit, maxThreshold_MaxLimit))
-        if not inputDict["min"] < inputDict["max"]:
-            raise ValueError("Max. overexposedArea threshold value {} is smaller "
-                             "than Min. overexposedArea threshold value {}!"
-                             .format(inputDict["max"], inputDict["min"]))
-        tmp = self._QualityCheckConfig
-        tmp["threshold_min_area_high_exposure"] = inputDict["min"]
-        tmp["threshold_max_area_high_exposure"] = inputDict["max"]
-        self._QualityCheckConfig = tmp
-        while self._device.isConfigurationDone() < 1.0:
-            time.sleep(1)
+        self.setThresholdsMinMax(overexposedArea=inputDict)
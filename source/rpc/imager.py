@@ -1,6 +1,9 @@
-import time
 import json
+from concurrent.futures import CancelledError, Future
 from .imageQualityCheck import ImageQualityCheck
+from .cache import ParameterSnapshot, ParameterLimitsCache
+from .transaction import Transaction
+from .progress import waitForProgress, submit
 
 
 class Imager(object):
@@ -31,6 +34,8 @@ class Imager(object):
 
         :return: (dict) name contains parameter-name, value the stringified parameter-value
         """
+        if self._imagerProxy.parameterSnapshot:
+            return self._imagerProxy.parameterSnapshot.getAllParameters()
         result = self._imagerProxy.proxy.getAllParameters()
         return result
 
@@ -41,9 +46,68 @@ class Imager(object):
         :param value: (str) parameter name
         :return: (str)
         """
+        if self._imagerProxy.parameterSnapshot:
+            return self._imagerProxy.parameterSnapshot.getParameter(value)
         result = self._imagerProxy.proxy.getParameter(value)
         return result
 
+    def setParameter(self, name: str, value) -> None:
+        """
+        Sets the value of the parameter. The call does not wait until the new configuration is applied,
+        use waitForConfigurationDone() for that. Inside a transaction the change is queued.
+
+        :param name: (str) parameter name
+        :param value: new parameter value
+        :return: None
+        """
+        if self._imagerProxy.transaction is not None:
+            self._imagerProxy.transaction.setParameter(name, value)
+            return
+        self._imagerProxy.proxy.setParameter(name, value)
+        if self._imagerProxy.parameterSnapshot:
+            self._imagerProxy.parameterSnapshot.update(name, value)
+
+    def transaction(self) -> Transaction:
+        """
+        Transaction for changing several parameters of this imager config at once. Use it in a with statement:
+        the setters validate the values and queue the changes, which are written together when leaving the
+        with statement. The device applies the new configuration only once and all written parameters are
+        set back to their previous values if one of the changes fails.
+
+        :return: Transaction object
+        """
+        return Transaction(obj=self, proxy=self._imagerProxy)
+
+    def enableParameterSnapshot(self, ttl: float = None) -> None:
+        """
+        Serve the parameter reads of this imager config from a local snapshot which is fetched with one
+        getAllParameters() call instead of requesting every parameter separately. Parameters written with this
+        library are updated in the snapshot. The snapshot is kept until the imager config is closed.
+
+        :param ttl: (float) max. age of the snapshot in seconds before it is fetched again. None never expires.
+        :return: None
+        """
+        self._imagerProxy.parameterSnapshot = ParameterSnapshot(proxy=self._imagerProxy, ttl=ttl)
+
+    def disableParameterSnapshot(self) -> None:
+        """
+        Request every parameter from the device again.
+
+        :return: None
+        """
+        self._imagerProxy.parameterSnapshot = None
+
+    def refreshParameterSnapshot(self) -> dict:
+        """
+        Fetch the parameter snapshot again, e.g. after the parameters were changed by another client.
+
+        :return: (dict) all parameters
+        """
+        if not self._imagerProxy.parameterSnapshot:
+            raise AttributeError("No parameter snapshot available! Please first enable it "
+                                 "with method enableParameterSnapshot().")
+        return self._imagerProxy.parameterSnapshot.refresh()
+
     def getAllParameterLimits(self):
         """
         Returns limits and default values of all
@@ -55,6 +119,20 @@ class Imager(object):
         result = self._imagerProxy.proxy.getAllParameterLimits()
         return result
 
+    def _getParameterLimits(self) -> dict:
+        """
+        Parameter limits from the limits cache of the device. The limits are only requested
+        from the device once per device type, firmware version and imager type.
+
+        :return: (dict)
+        """
+        if not self._imagerProxy.parameterLimitsKey:
+            self._imagerProxy.parameterLimitsKey = ParameterLimitsCache.key(
+                deviceType=self._device.deviceType, firmwareVersion=self._device.firmwareVersion,
+                objectName="imager", objectType=self.Type)
+        return self._device.parameterLimitsCache.get(key=self._imagerProxy.parameterLimitsKey,
+                                                     fetch=self.getAllParameterLimits)
+
     @property
     def Type(self) -> str:
         """
@@ -85,8 +163,8 @@ class Imager(object):
         max_chars = 64
         if value.__len__() > max_chars:
             raise ValueError("Max. {} characters".format(max_chars))
-        self._imagerProxy.proxy.setParameter("Name", value)
-        self._device.waitForConfigurationDone()
+        self.setParameter("Name", value)
+        self.waitForConfigurationDone()
 
     @property
     def Illumination(self) -> int:
@@ -114,12 +192,12 @@ class Imager(object):
                             3: internal and external illumination shall be used together
         :return: None
         """
-        limits = self.getAllParameterLimits()["Illumination"]
+        limits = self._getParameterLimits()["Illumination"]
         if value not in range(int(limits["min"]), int(limits["max"]), 1):
             raise ValueError("Illumination value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["Illumination"]))
-        self._imagerProxy.proxy.setParameter("Illumination", value)
-        self._device.waitForConfigurationDone()
+                             .format(limits))
+        self.setParameter("Illumination", value)
+        self.waitForConfigurationDone()
 
     @property
     def IlluInternalSegments(self) -> dict:
@@ -159,8 +237,8 @@ class Imager(object):
         value += inputDict["upper-right"] * 0x02
         value += inputDict["lower-left"] * 0x04
         value += inputDict["lower-right"] * 0x08
-        self._imagerProxy.proxy.setParameter("IlluInternalSegments", value)
-        self._device.waitForConfigurationDone()
+        self.setParameter("IlluInternalSegments", value)
+        self.waitForConfigurationDone()
 
     @property
     def Color(self) -> [int, None]:
@@ -192,15 +270,15 @@ class Imager(object):
         :return: None
         """
         if "Color" in self.getAllParameters().keys():
-            limits = self.getAllParameterLimits()["Color"]
+            limits = self._getParameterLimits()["Color"]
             if not int(limits["min"]) <= value <= int(limits["max"]):
                 raise ValueError("Color value not available. Available range: {}"
-                                 .format(self.getAllParameterLimits()["Color"]))
-            self._imagerProxy.proxy.setParameter("Color", value)
+                                 .format(limits))
+            self.setParameter("Color", value)
         else:
             articleNumber = self._device.getParameter(value="ArticleNumber")
             raise TypeError("Color attribute not available for sensor {}.".format(articleNumber))
-        self._device.waitForConfigurationDone()
+        self.waitForConfigurationDone()
 
     @property
     def ExposureTime(self) -> int:
@@ -220,12 +298,12 @@ class Imager(object):
         :param value: (int) Allowed range: 67 - 15000
         :return: None
         """
-        limits = self.getAllParameterLimits()["ExposureTime"]
+        limits = self._getParameterLimits()["ExposureTime"]
         if not int(limits["min"]) <= int(value) <= int(limits["max"]):
             raise ValueError("ExposureTime value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["ExposureTime"]))
-        self._imagerProxy.proxy.setParameter("ExposureTime", value)
-        self._device.waitForConfigurationDone()
+                             .format(limits))
+        self.setParameter("ExposureTime", value)
+        self.waitForConfigurationDone()
 
     @property
     def AnalogGainFactor(self) -> int:
@@ -245,12 +323,12 @@ class Imager(object):
         :param value: (int) Allowed values: 1, 2, 4, 8 for O2D / 1, 2, 4 for O2I
         :return: None
         """
-        limits = self.getAllParameterLimits()["AnalogGainFactor"]
+        limits = self._getParameterLimits()["AnalogGainFactor"]
         if str(value) not in limits["values"]:
             raise ValueError("AnalogGainFactor value not available. Available values: {}"
-                             .format(self.getAllParameterLimits()["AnalogGainFactor"]))
-        self._imagerProxy.proxy.setParameter("AnalogGainFactor", value)
-        self._device.waitForConfigurationDone()
+                             .format(limits))
+        self.setParameter("AnalogGainFactor", value)
+        self.waitForConfigurationDone()
 
     @property
     def FilterType(self) -> int:
@@ -280,12 +358,12 @@ class Imager(object):
                4: mean
         :return: None
         """
-        limits = self.getAllParameterLimits()["FilterType"]
+        limits = self._getParameterLimits()["FilterType"]
         if not int(limits["min"]) <= int(value) <= int(limits["max"]):
             raise ValueError("FilterType value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["FilterType"]))
-        self._imagerProxy.proxy.setParameter("FilterType", value)
-        self._device.waitForConfigurationDone()
+                             .format(limits))
+        self.setParameter("FilterType", value)
+        self.waitForConfigurationDone()
 
     @property
     def FilterStrength(self) -> int:
@@ -307,12 +385,12 @@ class Imager(object):
         :param value: (int) Allowed values: 1, 2, 3, 4, 5
         :return:
         """
-        limits = self.getAllParameterLimits()["FilterStrength"]
+        limits = self._getParameterLimits()["FilterStrength"]
         if not int(limits["min"]) <= int(value) <= int(limits["max"]):
             raise ValueError("FilterStrength value not available. Available range: {}"
-                             .format(self.getAllParameterLimits()["FilterStrength"]))
-        self._imagerProxy.proxy.setParameter("FilterStrength", value)
-        self._device.waitForConfigurationDone()
+                             .format(limits))
+        self.setParameter("FilterStrength", value)
+        self.waitForConfigurationDone()
 
     @property
     def FilterInvert(self) -> bool:
@@ -321,7 +399,7 @@ class Imager(object):
 
         :return: (bool) True or False
         """
-        result = self._imagerProxy.proxy.getParameter("FilterInvert")
+        result = self.getParameter("FilterInvert")
         if result == "false":
             return False
         return True
@@ -334,11 +412,25 @@ class Imager(object):
         :param value: (bool) True or False
         :return: None
         """
-        self._imagerProxy.proxy.setParameter("FilterInvert", value)
+        self.setParameter("FilterInvert", value)
+        self.waitForConfigurationDone()
+
+    def waitForConfigurationDone(self) -> None:
+        """
+        After an imager configuration parameter has been changed, this method can be used to check when
+        the new configuration has been applied within the imager process. This call blocks until configuration
+        has been finished. Inside a transaction the call returns immediately, the transaction waits once
+        after writing all changes.
+
+        :return: None
+        """
+        if self._imagerProxy.transaction is not None:
+            return
         self._device.waitForConfigurationDone()
 
     def startCalculateExposureTime(self, minAnalogGainFactor: int = None, maxAnalogGainFactor: int = None,
-                                   saturatedRatio: float = None, ROIs: list = None, RODs: list = None) -> None:
+                                   saturatedRatio: float = None, ROIs: list = None, RODs: list = None,
+                                   wait=True, timeout=None, callback=None, cancel=None) -> [None, Future]:
         """
         Starting calculation "auto exposure time" with analog gain factor, saturation ratio and ROI/ROD-definition.
 
@@ -347,8 +439,16 @@ class Imager(object):
         :param saturatedRatio: (float/array) maximum acceptable ratio of saturated pixels. Possible range: [0.0, 1.0]
         :param ROIs: Auto-Exposure is calculated on these set of ROIs
         :param RODs: RODs are subtracted from the ROI union set
-        :return: None
-        """
+        :param wait: (bool) False runs the calculation in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the calculation. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the calculation when set
+        :return: None or, with wait=False, a concurrent.futures.Future
+        """
+        if not wait:
+            return submit(self.startCalculateExposureTime, minAnalogGainFactor=minAnalogGainFactor,
+                          maxAnalogGainFactor=maxAnalogGainFactor, saturatedRatio=saturatedRatio, ROIs=ROIs,
+                          RODs=RODs, timeout=timeout, callback=callback, cancel=cancel)
         inputAutoExposure = {}
         if minAnalogGainFactor:
             inputAutoExposure["minAnalogGainFactor"] = minAnalogGainFactor
@@ -368,8 +468,10 @@ class Imager(object):
             inputAutoExposure["RODs"] = RODs
             
         self._imagerProxy.proxy.startCalculateExposureTime(json.dumps(inputAutoExposure))
-        while self.getProgressCalculateExposureTime() < 1.0:
-            time.sleep(1)
+        waitForProgress(self.getProgressCalculateExposureTime, timeout=timeout, callback=callback, cancel=cancel)
+        # exposure time and gain were changed by the device
+        if self._imagerProxy.parameterSnapshot:
+            self._imagerProxy.parameterSnapshot.invalidate()
 
     def getProgressCalculateExposureTime(self) -> float:
         """
@@ -381,13 +483,24 @@ class Imager(object):
         result = self._imagerProxy.proxy.getProgressCalculateExposureTime()
         return result
 
-    def startCalculateAutofocus(self, ROIs: list = None, RODs: list = None) -> None:
+    def startCalculateAutofocus(self, ROIs: list = None, RODs: list = None,
+                                wait=True, timeout=None, callback=None, cancel=None) -> [None, Future]:
         """
         Starting "autofocus" calculation with ROI-definition.
         The autofocus will be optimized for the center of the image (HWROI).
+        If waiting is cancelled or times out, the autofocus is stopped with stopCalculateAutofocus().
 
-        :return: None
-        """
+        :param ROIs: Autofocus is calculated on these set of ROIs
+        :param RODs: RODs are subtracted from the ROI union set
+        :param wait: (bool) False runs the calculation in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the calculation. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the calculation when set
+        :return: None or, with wait=False, a concurrent.futures.Future
+        """
+        if not wait:
+            return submit(self.startCalculateAutofocus, ROIs=ROIs, RODs=RODs, timeout=timeout, callback=callback,
+                          cancel=cancel)
         inputAutoFocus = {}
         # ROIs
         if ROIs:
@@ -401,8 +514,15 @@ class Imager(object):
             inputAutoFocus["RODs"] = RODs
 
         self._imagerProxy.proxy.startCalculateAutofocus(json.dumps(inputAutoFocus))
-        while self.getProgressCalculateAutofocus() < 1.0:
-            time.sleep(1)
+        try:
+            waitForProgress(self.getProgressCalculateAutofocus, timeout=timeout, callback=callback, cancel=cancel)
+        except (TimeoutError, CancelledError):
+            self.stopCalculateAutofocus()
+            raise
+        # the focus distance of the application was changed by the device
+        applicationProxy = getattr(self._device, "_applicationProxy", None)
+        if applicationProxy and applicationProxy.parameterSnapshot:
+            applicationProxy.parameterSnapshot.invalidate("FocusDistance")
 
     def stopCalculateAutofocus(self) -> None:
         """
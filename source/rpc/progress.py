@@ -0,0 +1,108 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor, Future
+import threading
+import time
+
+_executor = None
+_executorLock = threading.Lock()
+
+
+def getExecutor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by all operations which are running in the background (wait=False).
+
+    :return: (ThreadPoolExecutor) shared executor
+    """
+    global _executor
+    with _executorLock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="o2x5xx-progress")
+        return _executor
+
+
+def submit(function, *args, **kwargs) -> Future:
+    """
+    Run a function in the shared executor.
+
+    :param function: (callable) function to run
+    :return: (concurrent.futures.Future) future with the result of the function
+    """
+    return getExecutor().submit(function, *args, **kwargs)
+
+
+class ProgressWaiter(object):
+    """
+    Waits until a progress reported by the device reaches 1.0.
+
+    The progress is polled with short intervals at the beginning, so short operations finish within
+    milliseconds, and the interval grows with every poll up to the max. interval for long operations.
+    """
+
+    def __init__(self, progress, timeout=None, callback=None, cancel=None,
+                 minInterval=0.01, maxInterval=1.0, backoff=1.5):
+        """
+        :param progress: (callable) function returning the progress from 0.0 to 1.0
+        :param timeout: (float) max. time to wait in seconds. None waits forever.
+        :param callback: (callable) called with every new progress value
+        :param cancel: (threading.Event) stops waiting when set
+        :param minInterval: (float) first poll interval in seconds
+        :param maxInterval: (float) max. poll interval in seconds
+        :param backoff: (float) factor the poll interval grows with after every poll
+        """
+        self._progress = progress
+        self.timeout = timeout
+        self.callback = callback
+        self.cancel = cancel if cancel is not None else threading.Event()
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.backoff = backoff
+        self.polls = 0
+
+    def wait(self) -> float:
+        """
+        Block until the progress reaches 1.0.
+
+        :return: (float) last progress value
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        interval = self.minInterval
+        lastProgress = None
+        while True:
+            progress = self._progress()
+            self.polls += 1
+            if self.callback and progress != lastProgress:
+                self.callback(progress)
+            lastProgress = progress
+            if progress >= 1.0:
+                return progress
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Operation not finished within {} seconds (progress {})."
+                                       .format(self.timeout, progress))
+            else:
+                remaining = interval
+            # Event.wait() returns immediately when the operation is cancelled
+            if self.cancel.wait(min(interval, remaining)):
+                raise CancelledError("Operation cancelled at progress {}.".format(progress))
+            interval = min(interval * self.backoff, self.maxInterval)
+
+    def submit(self) -> Future:
+        """
+        Wait in the shared executor.
+
+        :return: (concurrent.futures.Future) future with the last progress value
+        """
+        return submit(self.wait)
+
+
+def waitForProgress(progress, timeout=None, callback=None, cancel=None) -> float:
+    """
+    Block until a progress reported by the device reaches 1.0, see ProgressWaiter.
+
+    :param progress: (callable) function returning the progress from 0.0 to 1.0
+    :param timeout: (float) max. time to wait in seconds. None waits forever.
+    :param callback: (callable) called with every new progress value
+    :param cancel: (threading.Event) stops waiting when set
+    :return: (float) last progress value
+    """
+    return ProgressWaiter(progress=progress, timeout=timeout, callback=callback, cancel=cancel).wait()
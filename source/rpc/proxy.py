@@ -1,6 +1,8 @@
 import xmlrpc.client
 from contextlib import contextmanager
-from threading import Timer
+from .transport import PooledTransport
+from .batch import Batch
+from .heartbeat import getHeartbeatScheduler
 
 SOCKET_TIMEOUT = 10
 
@@ -8,9 +10,15 @@ SOCKET_TIMEOUT = 10
 class BaseProxy(object):
     """Base class for all proxies."""
 
+    # default of batch(): send the calls in the recorded order if system.multicall is not supported
+    orderedBatch = True
+
     def __init__(self, url, device, timeout=SOCKET_TIMEOUT):
         """Initialize the actual xmlrpc.client.ServerProxy from given url.
 
+        The requests are sent over the keep-alive connections of the device's connection pool,
+        so nested proxies do not open new TCP connections.
+
         Args:
             url (str): url for xmlrpc.client.ServerProxy
             device (obj): device
@@ -18,28 +26,39 @@ class BaseProxy(object):
             Argument can be a non-negative floating point number expressing seconds, or None.
             If None, SOCKET_TIMEOUT value is used as default
         """
-        try:
-            self.__proxy = xmlrpc.client.ServerProxy(uri=url, allow_none=True)
-            self.__transport = self.__proxy("transport")
-            self.__transport.make_connection(host=device.address)
-            getattr(self.__transport, "_connection")[1].timeout = timeout
-        except TimeoutError:
-            self.close()
+        self.device = device
+        self.__transport = PooledTransport(pool=device.connectionPool, timeout=timeout)
+        self.__proxy = xmlrpc.client.ServerProxy(uri=url, transport=self.__transport, allow_none=True)
 
     @property
     def timeout(self):
-        if getattr(self.__transport, "_connection")[1]:
-            return getattr(self.__transport, "_connection")[1].timeout
+        if self.__transport:
+            return self.__transport.timeout
 
     @timeout.setter
     def timeout(self, value):
-        if getattr(self.__transport, "_connection")[1]:
-            getattr(self.__transport, "_connection")[1].timeout = value
+        if self.__transport:
+            self.__transport.timeout = value
 
     @property
     def proxy(self):
         return self.__proxy
 
+    def batch(self, ordered=None) -> Batch:
+        """Collect method calls and send them together when leaving the with statement.
+
+        If the device does not support system.multicall, the calls are sent as single requests. By default they
+        are sent in the recorded order, except on the main proxy, where they are sent concurrently.
+
+        Args:
+            ordered (bool): True for keeping the order of the calls if the device does not support
+            system.multicall, False for sending them concurrently. None uses the default of the proxy
+
+        Returns:
+            Batch: recorder returning a concurrent.futures.Future for every call
+        """
+        return Batch(proxy=self, ordered=self.orderedBatch if ordered is None else ordered)
+
     def close(self):
         self.__transport.close()
         self.__transport = None
@@ -49,6 +68,9 @@ class BaseProxy(object):
 class MainProxy(BaseProxy):
     """Proxy representing mainProxy."""
 
+    # the calls of the main API are mostly independent reads, which are sent concurrently
+    orderedBatch = False
+
     def __init__(self, url, device, timeout):
         """Initialize main proxy member, device and baseURL.
 
@@ -64,6 +86,10 @@ class MainProxy(BaseProxy):
 
         super(MainProxy, self).__init__(url, device, timeout)
 
+    def close(self):
+        super(MainProxy, self).close()
+        self.device.connectionPool.close()
+
     @contextmanager
     def requestSession(self, password='', session_id='0' * 32, timeout=SOCKET_TIMEOUT):
         """Generator for requestSession to be used in with statement.
@@ -82,11 +108,7 @@ class MainProxy(BaseProxy):
                                                      device=self.device, timeout=timeout)
             yield
         finally:
-            try:
-                if self.device._sessionProxy.autoHeartbeatTimer:
-                    self.device._sessionProxy.autoHeartbeatTimer.cancel()
-            except AttributeError:
-                pass
+            self.device._sessionProxy.stopAutoHeartbeat()
             self.device._sessionProxy.proxy.cancelSession()
             self.device._sessionProxy.close()
             self.device._sessionProxy = None
@@ -97,18 +119,24 @@ class MainProxy(BaseProxy):
 class SessionProxy(BaseProxy):
     """Proxy representing sessionProxy."""
 
-    def __init__(self, url, device, timeout=SOCKET_TIMEOUT, autoHeartbeat=True, autoHeartbeatInterval=30):
+    def __init__(self, url, device, timeout=SOCKET_TIMEOUT, autoHeartbeat=True, autoHeartbeatInterval=30,
+                 heartbeatScheduler=None):
         self.baseURL = url
         self.device = device
         self.autoHeartbeat = autoHeartbeat
         self.autoHeartbeatInterval = autoHeartbeatInterval
+        # registration in the scheduler sending the heartbeats of all sessions
+        self.autoHeartbeatEntry = None
+        # transport of the auto heartbeats with their own timeout
+        self._heartbeatTransport = None
 
         super().__init__(url, device, timeout)
 
         if self.autoHeartbeat:
-            self.heartbeat(self.autoHeartbeatInterval)
-            self.autoHeartbeatTimer = Timer(self.autoHeartbeatInterval - 1, self.doAutoHeartbeat)
-            self.autoHeartbeatTimer.start()
+            self.autoHeartbeatInterval = self.heartbeat(self.autoHeartbeatInterval)
+            scheduler = heartbeatScheduler if heartbeatScheduler is not None else getHeartbeatScheduler()
+            self.autoHeartbeatEntry = scheduler.register(self, self.autoHeartbeatInterval)
+            self._heartbeatScheduler = scheduler
         else:
             self.heartbeat(300)
 
@@ -123,24 +151,38 @@ class SessionProxy(BaseProxy):
         result = self.proxy.heartbeat(heartbeatInterval)
         return result
 
-    def doAutoHeartbeat(self) -> None:
+    def doAutoHeartbeat(self, timeout: float = None) -> int:
         """
-        Auto Heartbeat Timer for automatic extending the live time of edit-session.
+        Auto heartbeat for automatic extending the live time of edit-session, called by the heartbeat scheduler.
         If the given value is outside the range of "SessionTimeout", the saved default timeout will be used.
 
-        :return: None
+        :param timeout: (float) time in seconds to wait for the answer. Default: timeout of the session proxy
+        :return: (int) the used timeout-interval, in seconds
         """
-        newHeartbeatInterval = self.heartbeat(self.autoHeartbeatInterval)
+        if timeout is None:
+            newHeartbeatInterval = self.heartbeat(self.autoHeartbeatInterval)
+        else:
+            if self._heartbeatTransport is None:
+                self._heartbeatTransport = PooledTransport(pool=self.device.connectionPool, timeout=timeout)
+            self._heartbeatTransport.timeout = timeout
+            proxy = xmlrpc.client.ServerProxy(uri=self.baseURL, transport=self._heartbeatTransport, allow_none=True)
+            newHeartbeatInterval = proxy.heartbeat(self.autoHeartbeatInterval)
         self.autoHeartbeatInterval = newHeartbeatInterval
-        # schedule event a little ahead of time
-        self.autoHeartbeatTimer = Timer(self.autoHeartbeatInterval - 1, self.doAutoHeartbeat)
-        self.autoHeartbeatTimer.start()
+        return newHeartbeatInterval
+
+    def stopAutoHeartbeat(self) -> None:
+        """
+        Stop sending the auto heartbeats of this session. Waits until a heartbeat which is currently sent
+        is finished.
+
+        :return: None
+        """
+        if self.autoHeartbeatEntry is not None:
+            self._heartbeatScheduler.unregister(self.autoHeartbeatEntry)
+            self.autoHeartbeatEntry = None
 
     def cancelSession(self):
-        if self.autoHeartbeatTimer != None:
-            self.autoHeartbeatTimer.cancel()
-            self.autoHeartbeatTimer.join()
-            self.autoHeartbeatTimer = None
+        self.stopAutoHeartbeat()
         self.proxy.cancelSession()
 
     @contextmanager
@@ -160,6 +202,8 @@ class SessionProxy(BaseProxy):
             yield
         finally:
             self.proxy.setOperatingMode(0)
+            # the reference image may have been changed in the edit mode
+            self.device.clearReferenceImageCache()
             self.device._editProxy.close()
             self.device._editURL = None
             self.device._editProxy = None
@@ -203,6 +247,12 @@ class ApplicationProxy(BaseProxy):
     def __init__(self, url, device, timeout=SOCKET_TIMEOUT):
         self.baseURL = url
         self.device = device
+        # opt-in local copy of all parameters, see enableParameterSnapshot()
+        self.parameterSnapshot = None
+        # key of the parameter limits in the limits cache of the device
+        self.parameterLimitsKey = None
+        # active Transaction queuing the parameter changes
+        self.transaction = None
 
         super().__init__(url, device, timeout)
 
@@ -238,5 +288,11 @@ class ImagerProxy(BaseProxy):
     def __init__(self, url, device, timeout=SOCKET_TIMEOUT):
         self.baseURL = url
         self.device = device
+        # opt-in local copy of all parameters, see enableParameterSnapshot()
+        self.parameterSnapshot = None
+        # key of the parameter limits in the limits cache of the device
+        self.parameterLimitsKey = None
+        # active Transaction queuing the parameter changes
+        self.transaction = None
 
         super().__init__(url, device, timeout)
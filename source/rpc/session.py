@@ -1,11 +1,12 @@
-import time
 import xmlrpc.client
-from .utils import firmwareWarning
+from .utils import firmwareWarning, checkFirmware
+from .stream import callToFile, callWithFile, encodeFile
 import json
 import os
-import base64
 from .edit import Edit
 from .proxy import EditProxy
+from .progress import waitForProgress, submit
+from concurrent.futures import Future
 
 
 class Session(object):
@@ -37,6 +38,7 @@ class Session(object):
         :return: None
         """
         self.setOperatingMode(0)
+        self._device.clearReferenceImageCache()
         self._device._editURL = None
         self._device._editProxy = None
 
@@ -52,24 +54,30 @@ class Session(object):
         """
         self._sessionProxy.proxy.setOperatingMode(mode)
 
-    def exportConfig(self) -> bytearray:
+    def exportConfig(self, wait=True, timeout=None, callback=None, cancel=None) -> [bytearray, Future]:
         """
         Exports the whole configuration of the sensor-device and stores it at the desired path.
 
+        :param wait: (bool) False runs the export in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the export progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
         :return: (bytearray) configuration as one data-blob :binary/base64
+                 or with wait=False a concurrent.futures.Future returning it
         """
+        if not wait:
+            return submit(self.exportConfig, timeout=timeout, callback=callback, cancel=cancel)
         # increase heartbeat interval which will prevent a closed session after the "long" export progress
         self._sessionProxy.heartbeat(heartbeatInterval=30)
         config = self._sessionProxy.proxy.exportConfig()
-        config_bytes = bytearray()
-        config_bytes.extend(map(ord, str(config)))
-        while self.getExportProgress() < 1.0:
-            time.sleep(1)
+        config_bytes = self._toBytearray(config)
+        waitForProgress(self.getExportProgress, timeout=timeout, callback=callback, cancel=cancel)
         self.cleanupExport()
         self._device.mainProxy.proxy.waitForConfigurationDone()
         return config_bytes
 
-    def importConfig(self, config: str, global_settings=True, network_settings=False, applications=True) -> None:
+    def importConfig(self, config: str, global_settings=True, network_settings=False, applications=True,
+                     wait=True, timeout=None, callback=None, cancel=None) -> [None, Future]:
         """
         Import whole configuration, with the option to skip specific parts.
 
@@ -77,8 +85,16 @@ class Session(object):
         :param global_settings:     (bool) Include Global-Configuration (Name, Description, Location, ...)
         :param network_settings:    (bool) Include Network-Configuration (IP, DHCP, ...)
         :param applications:        (bool) Include All Application-Configurations
-        :return:                    None
-        """
+        :param wait: (bool) False runs the import in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the import progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return:                    None or, with wait=False, a concurrent.futures.Future
+        """
+        if not wait:
+            return submit(self.importConfig, config, global_settings=global_settings,
+                          network_settings=network_settings, applications=applications,
+                          timeout=timeout, callback=callback, cancel=cancel)
         # This is required due to the long import progress which may take longer than 10 seconds (default)
         self._sessionProxy.heartbeat(heartbeatInterval=30)
         if global_settings:
@@ -87,40 +103,181 @@ class Session(object):
             self._sessionProxy.proxy.importConfig(config, 0x0002)
         if applications:
             self._sessionProxy.proxy.importConfig(config, 0x0010)
-        while self.getImportProgress() < 1.0:
-            time.sleep(1)
+        waitForProgress(self.getImportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self._device.clearReferenceImageCache()
         self._device.mainProxy.proxy.waitForConfigurationDone()
 
-    def exportApplication(self, applicationIndex: int) -> bytearray:
+    def exportApplication(self, applicationIndex: int, wait=True, timeout=None, callback=None,
+                          cancel=None) -> [bytearray, Future]:
         """
         Exports one application-config.
 
         :param applicationIndex: (int) application index
-        :return: None
-        """
-
+        :param wait: (bool) False runs the export in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the export progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return: (bytearray) application-config as one data-blob :binary/base64
+                 or with wait=False a concurrent.futures.Future returning it
+        """
+        if not wait:
+            return submit(self.exportApplication, applicationIndex, timeout=timeout, callback=callback,
+                          cancel=cancel)
         config = self._sessionProxy.proxy.exportApplication(applicationIndex)
-        application_bytes = bytearray()
-        application_bytes.extend(map(ord, str(config)))
-        while self.getExportProgress() < 1.0:
-            time.sleep(1)
-        else:
-            self.cleanupExport()
+        application_bytes = self._toBytearray(config)
+        waitForProgress(self.getExportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self.cleanupExport()
         return application_bytes
 
-    def importApplication(self, application: str) -> int:
+    def importApplication(self, application: str, wait=True, timeout=None, callback=None,
+                          cancel=None) -> [int, Future]:
         """
         Imports an application-config and creates a new application with it.
 
         :param application: (str) application-config as one-data-blob: binary/base64
-        :return: (int) index of new application in list
+        :param wait: (bool) False runs the import in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the import progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return: (int) index of new application in list, or with wait=False a concurrent.futures.Future returning it
+        """
+        if not wait:
+            return submit(self.importApplication, application, timeout=timeout, callback=callback, cancel=cancel)
+        index = int(self._sessionProxy.proxy.importApplication(application))
+        waitForProgress(self.getImportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self._device.clearReferenceImageCache()
+        return index
+
+    def exportConfigToFile(self, configName: str, wait=True, timeout=None, callback=None,
+                           cancel=None) -> [str, Future]:
         """
+        Exports the whole configuration of the sensor-device and streams it into an o2d5xxcfg-file.
+        The configuration is decoded and written in chunks while it is received, so it is never held in memory.
 
-        index = int(self._sessionProxy.proxy.importApplication(application))
-        while self.getImportProgress() < 1.0:
-            time.sleep(1)
+        :param configName: (str) config file path. The extension of the device type is added if missing.
+        :param wait: (bool) False runs the export in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the export progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return: (str) path of the written config file, or with wait=False a concurrent.futures.Future returning it
+        """
+        if not wait:
+            return submit(self.exportConfigToFile, configName, timeout=timeout, callback=callback, cancel=cancel)
+        configName = self._withExtension(configName, "DeviceConfigExtension")
+        # increase heartbeat interval which will prevent a closed session after the "long" export progress
+        self._sessionProxy.heartbeat(heartbeatInterval=30)
+        self._exportToFile(configName, "exportConfig", ())
+        waitForProgress(self.getExportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self.cleanupExport()
+        self._device.mainProxy.proxy.waitForConfigurationDone()
+        return configName
+
+    def importConfigFromFile(self, configFile: str, global_settings=True, network_settings=False, applications=True,
+                             wait=True, timeout=None, callback=None, cancel=None) -> [None, Future]:
+        """
+        Import whole configuration from an o2d5xxcfg-file, with the option to skip specific parts.
+        The file is encoded and sent in chunks, so it is never held in memory.
+
+        :param configFile:          (str) config file path
+        :param global_settings:     (bool) Include Global-Configuration (Name, Description, Location, ...)
+        :param network_settings:    (bool) Include Network-Configuration (IP, DHCP, ...)
+        :param applications:        (bool) Include All Application-Configurations
+        :param wait: (bool) False runs the import in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the import progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return:                    None or, with wait=False, a concurrent.futures.Future
+        """
+        if not wait:
+            return submit(self.importConfigFromFile, configFile, global_settings=global_settings,
+                          network_settings=network_settings, applications=applications,
+                          timeout=timeout, callback=callback, cancel=cancel)
+        checkFirmware(self._device, configFile)
+        # This is required due to the long import progress which may take longer than 10 seconds (default)
+        self._sessionProxy.heartbeat(heartbeatInterval=30)
+        if global_settings:
+            callWithFile(self._sessionProxy, "importConfig", configFile, (0x0001,))
+        if network_settings:
+            callWithFile(self._sessionProxy, "importConfig", configFile, (0x0002,))
+        if applications:
+            callWithFile(self._sessionProxy, "importConfig", configFile, (0x0010,))
+        waitForProgress(self.getImportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self._device.clearReferenceImageCache()
+        self._device.mainProxy.proxy.waitForConfigurationDone()
+
+    def exportApplicationToFile(self, applicationIndex: int, applicationName: str, wait=True, timeout=None,
+                                callback=None, cancel=None) -> [str, Future]:
+        """
+        Exports one application-config and streams it into an o2d5xxapp-file.
+
+        :param applicationIndex: (int) application index
+        :param applicationName: (str) application file path. The extension of the device type is added if missing.
+        :param wait: (bool) False runs the export in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the export progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return: (str) path of the written application file, or with wait=False a concurrent.futures.Future returning it
+        """
+        if not wait:
+            return submit(self.exportApplicationToFile, applicationIndex, applicationName, timeout=timeout,
+                          callback=callback, cancel=cancel)
+        applicationName = self._withExtension(applicationName, "ApplicationConfigExtension")
+        self._exportToFile(applicationName, "exportApplication", (applicationIndex,))
+        waitForProgress(self.getExportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self.cleanupExport()
+        return applicationName
+
+    def importApplicationFromFile(self, applicationFile: str, wait=True, timeout=None, callback=None,
+                                  cancel=None) -> [int, Future]:
+        """
+        Imports an application-config file in chunks and creates a new application with it.
+
+        :param applicationFile: (str) application config file path
+        :param wait: (bool) False runs the import in the background and returns a concurrent.futures.Future
+        :param timeout: (float) max. time in seconds to wait for the import progress. None waits forever.
+        :param callback: (callable) called with every new progress value (0.0 to 1.0)
+        :param cancel: (threading.Event) stops waiting for the progress when set
+        :return: (int) index of new application in list, or with wait=False a concurrent.futures.Future returning it
+        """
+        if not wait:
+            return submit(self.importApplicationFromFile, applicationFile, timeout=timeout, callback=callback,
+                          cancel=cancel)
+        checkFirmware(self._device, applicationFile)
+        index = int(callWithFile(self._sessionProxy, "importApplication", applicationFile))
+        waitForProgress(self.getImportProgress, timeout=timeout, callback=callback, cancel=cancel)
+        self._device.clearReferenceImageCache()
         return index
 
+    def _exportToFile(self, path, methodName, params) -> None:
+        # write into a temporary file first, so an interrupted export does not leave a broken config file
+        partPath = path + ".part"
+        try:
+            with open(partPath, "wb") as f:
+                callToFile(self._sessionProxy, methodName, params, f)
+            os.replace(partPath, path)
+        finally:
+            if os.path.exists(partPath):
+                os.remove(partPath)
+
+    @staticmethod
+    def _toBytearray(data) -> bytearray:
+        """
+        Convert the result of an export to a bytearray without a per-byte conversion.
+
+        :param data: (xmlrpc.client.Binary) exported data
+        :return: (bytearray) exported data
+        """
+        if isinstance(data, xmlrpc.client.Binary):
+            return bytearray(data.data)
+        return bytearray(str(data), "latin-1")
+
+    def _withExtension(self, path, extensionKey) -> str:
+        extension = self._device.deviceMeta.value[extensionKey]
+        filename, file_extension = os.path.splitext(path)
+        if not file_extension == extension:
+            path = filename + extension
+        return path
+
     def getImportProgress(self) -> float:
         """
         Get the progress of the asynchronous configuration import (yields 1.0 when the last import has finished).
@@ -188,10 +345,7 @@ class Session(object):
         :param data: (bytearray) application data
         :return: None
         """
-        extension = self._device.deviceMeta.value["ApplicationConfigExtension"]
-        filename, file_extension = os.path.splitext(applicationName)
-        if not file_extension == extension:
-            applicationName = filename + extension
+        applicationName = self._withExtension(applicationName, "ApplicationConfigExtension")
         with open(applicationName, "wb") as f:
             f.write(data)
 
@@ -203,16 +357,14 @@ class Session(object):
         :param data: (bytearray) application data
         :return: None
         """
-        extension = self._device.deviceMeta.value["DeviceConfigExtension"]
-        filename, file_extension = os.path.splitext(configName)
-        if not file_extension == extension:
-            configName = filename + extension
+        configName = self._withExtension(configName, "DeviceConfigExtension")
         with open(configName, "wb") as f:
             f.write(data)
 
     def readApplicationConfigFile(self, applicationFile: str) -> str:
         """
-        Read and decode an application-config file.
+        Read and encode an application-config file. Use importApplicationFromFile() for importing an application
+        without holding the encoded data in memory.
 
         :param applicationFile: (str) application config file path
         :return: (str) application data
@@ -222,7 +374,8 @@ class Session(object):
 
     def readDeviceConfigFile(self, configFile: str) -> str:
         """
-        Read and decode an device-config file.
+        Read and encode an device-config file. Use importConfigFromFile() for importing a config without holding
+        the encoded data in memory.
 
         :param configFile: (str) device config file path
         :return: (str) application data
@@ -233,17 +386,14 @@ class Session(object):
     @firmwareWarning
     def _readConfigFile(self, configFile: str) -> str:
         """
-        Read and decode a device- or application-config file.
+        Read and encode a device- or application-config file. The file is encoded in chunks.
 
         :param configFile: (str) config file path
         :return: (str) config data
         """
         if isinstance(configFile, str):
             if os.path.exists(os.path.dirname(configFile)):
-                with open(configFile, "rb") as f:
-                    encodedZip = base64.b64encode(f.read())
-                    decoded = encodedZip.decode()
-                    return decoded
+                return encodeFile(configFile)
             else:
                 raise FileExistsError("File {} does not exist!".format(configFile))
 
@@ -1,5 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import io
+import itertools
+import select
+import socket
+import threading
+import time
 import xmlrpc.client
 
+# image format of the service report, which is required by processImageSequence
+SIMULATION_IMAGE_SIZE = (1280, 960)
+
+
+def prepareSimulationImage(image: [str, bytes], size: tuple = SIMULATION_IMAGE_SIZE, quality: int = 95) -> bytes:
+    """
+    Convert an image into the format of processImageSequence: JPEG, 1280 x 960, grayscale 8 bit.
+    Images which already have this format are returned unchanged without encoding them again.
+
+    :param image: (str|bytes) path or content of an image file in any format supported by Pillow
+    :param size: (tuple) image size (width, height)
+    :param quality: (int) JPEG quality of converted images
+    :return: (bytes) JPEG data
+    """
+    # Pillow is imported on first use to keep the package import lightweight
+    from PIL import Image
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            image = f.read()
+    with Image.open(io.BytesIO(image)) as img:
+        if img.format == "JPEG" and img.mode == "L" and img.size == tuple(size):
+            return bytes(image)
+        img = img.convert("L")
+        if img.size != tuple(size):
+            img = img.resize(size)
+        output = io.BytesIO()
+        img.save(output, format="JPEG", quality=quality)
+        return output.getvalue()
+
 
 class Simulation(object):
     """
@@ -15,10 +52,11 @@ class Simulation(object):
     @staticmethod
     def createPayloadList(image_paths: [str, list]) -> list:
         """
-        TODO
+        Read image files as payload for processImageSequence. All images are held in memory,
+        use SimulationPipeline for large image sets.
 
-        :param image_paths:
-        :return:
+        :param image_paths: (str|list) path or list of paths of JPEG images
+        :return: (list) xmlrpc.client.Binary objects
         """
         payloadList = []
         if isinstance(image_paths, list):
@@ -33,7 +71,7 @@ class Simulation(object):
         return payloadList
 
     def processImageSequence(self, image_sequence: list, force_trigger: bool) -> None:
-        """
+        r"""
         Sends an Image Sequence and decode them.
         An additional parameter exists to define if a software trigger should be generated.
         Notice that the number of images in the image sequence should match the number of image configurations
@@ -54,3 +92,273 @@ class Simulation(object):
     def __getattr__(self, name):
         # Forward otherwise undefined method calls to XMLRPC proxy
         return getattr(self.rpc, name)
+
+
+class SimulationResult(object):
+    """
+    Result of one image sequence processed by a SimulationPipeline.
+    """
+
+    def __init__(self, index, images, output=None):
+        self.index = index
+        # paths (or names) of the images of the sequence
+        self.images = images
+        # asynchronous PCIC output of the device for the sequence or None without PCIC client
+        self.output = output
+        self.sent = None
+        self.received = None
+
+    def __repr__(self):
+        return "SimulationResult(index={}, images={!r}, output={!r})".format(self.index, self.images, self.output)
+
+    @property
+    def latency(self) -> [float, None]:
+        """
+        :return: (float) time in seconds between sending the sequence and receiving its output
+        """
+        if self.sent is None or self.received is None:
+            return None
+        return self.received - self.sent
+
+
+class SimulationPipeline(object):
+    """
+    Streams a large set of images through a device in simulation mode.
+
+    The image files are read lazily and converted into the required format (see prepareSimulationImage) by a
+    pool of worker threads, while the already prepared sequences are sent back to back with
+    processImageSequence. Only a few sequences are prepared in advance, so the memory usage does not depend
+    on the number of images. With a PCIC client the asynchronous result output of every sequence is collected
+    in a background thread and passed to the callback together with the images of the sequence, e.g.
+
+        with device.mainProxy.requestSession(), device.sessionProxy.setOperatingMode(mode=2):
+            simulation = Simulation(editURL=device.editProxy.baseURL, sessionAPI=device.session, mainAPI=device)
+            pipeline = SimulationPipeline(simulation, glob.iglob("archive/**/*.jpg", recursive=True), pcic=pcic)
+            statistics = pipeline.run(callback=lambda result: print(result.images, result.output))
+    """
+
+    def __init__(self, simulation, images, sequenceLength: int = 1, pcic=None, workers: int = 4,
+                 prefetch: int = 8, maxPending: int = 4, forceTrigger: bool = True, resultTimeout: float = 10.0,
+                 prepare=prepareSimulationImage):
+        """
+        :param simulation: (Simulation) object providing processImageSequence(image_sequence, force_trigger)
+        :param images: (iterable) paths of the image files, e.g. a generator. The images are read when needed.
+        :param sequenceLength: (int) number of images per sequence, must match the number of imager
+                               configurations of the active application
+        :param pcic: (O2x5xxPCICDevice) connected PCIC client for collecting the result output. None does not
+                     collect results.
+        :param workers: (int) number of threads preparing the images
+        :param prefetch: (int) max. number of sequences which are prepared in advance
+        :param maxPending: (int) max. number of sent sequences without received result output
+        :param forceTrigger: (bool) generate a software trigger for every sequence
+        :param resultTimeout: (float) max. time in seconds to wait for the result output of a sequence. Sequences
+                              without output are counted as missing and passed to the callback with output None.
+                              The outputs are assigned to the sequences by their order, so after a timeout all
+                              pending sequences are reported as missing and outputs are discarded until the
+                              device sent no output for resultTimeout seconds.
+        :param prepare: (callable) converts an image path into the JPEG data which is sent
+        """
+        if sequenceLength < 1:
+            raise ValueError("sequenceLength must be at least 1.")
+        self.simulation = simulation
+        self.images = images
+        self.sequenceLength = sequenceLength
+        self.pcic = pcic
+        self.workers = workers
+        self.prefetch = max(prefetch, 1)
+        self.maxPending = max(maxPending, 1)
+        self.forceTrigger = forceTrigger
+        self.resultTimeout = resultTimeout
+        self.prepare = prepare
+        self.cancel = threading.Event()
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._reading = False
+        self._readerError = None
+        self._resyncing = False
+        self._lastOutput = 0.0
+        self._callback = None
+        self._statistics = {}
+
+    def _sequences(self):
+        iterator = iter(self.images)
+        for index in itertools.count():
+            sequence = list(itertools.islice(iterator, self.sequenceLength))
+            if not sequence:
+                return
+            if len(sequence) < self.sequenceLength:
+                raise ValueError("The number of images is not a multiple of the sequence length {}."
+                                 .format(self.sequenceLength))
+            yield index, sequence
+
+    def _prepareSequence(self, sequence) -> tuple:
+        started = time.monotonic()
+        payload = [xmlrpc.client.Binary(self.prepare(image)) for image in sequence]
+        return payload, time.monotonic() - started
+
+    def _readResults(self):
+        # the result output of the sequences arrives in the order the sequences were sent
+        pcicSocket = getattr(self.pcic, "pcicSocket", None)
+        while True:
+            with self._condition:
+                if not self._reading:
+                    return
+            try:
+                # poll with a short timeout, so the reader stops quickly at the end of the run
+                if pcicSocket is not None and not select.select([pcicSocket], [], [], 0.1)[0]:
+                    continue
+                ticket, answer = self.pcic.read_next_answer()
+            except socket.timeout:
+                continue
+            except Exception as e:
+                with self._condition:
+                    self._readerError = e
+                    self._condition.notify_all()
+                return
+            if ticket != b"0000":
+                continue
+            with self._condition:
+                self._lastOutput = time.monotonic()
+                if self._resyncing or not self._pending:
+                    # late output of a sequence reported as missing or of a trigger not caused by the pipeline
+                    self._statistics["discarded"] += 1
+                    continue
+                result = self._pending.popleft()
+                self._condition.notify_all()
+            self._finish(result, answer)
+
+    def _finish(self, result, output):
+        result.output = output
+        result.received = time.monotonic()
+        with self._condition:
+            self._statistics["results"] += 1
+            if result.latency is not None:
+                self._statistics["latency_total"] += result.latency
+        if self._callback:
+            self._callback(result)
+
+    def _waitPending(self, maxPending) -> None:
+        # wait until at most maxPending sequences are without result output
+        while True:
+            with self._condition:
+                if self._readerError is not None:
+                    raise self._readerError
+                if len(self._pending) <= maxPending:
+                    return
+                if time.monotonic() - self._pending[0].sent <= self.resultTimeout:
+                    self._condition.wait(0.1)
+                    continue
+            self._resync()
+
+    def _resync(self) -> None:
+        # The outputs are assigned to the sequences by their order. After a sequence without output, a late
+        # output would shift all following results, so all pending sequences are reported without output
+        # and outputs are discarded until the device was quiet for resultTimeout seconds.
+        with self._condition:
+            self._resyncing = True
+            missing = list(self._pending)
+            self._pending.clear()
+            self._statistics["missing"] += len(missing)
+            self._statistics["resyncs"] += 1
+        if self._callback:
+            for result in missing:
+                self._callback(result)
+        started = time.monotonic()
+        with self._condition:
+            try:
+                while True:
+                    if self._readerError is not None:
+                        raise self._readerError
+                    quiet = time.monotonic() - max(started, self._lastOutput)
+                    if quiet >= self.resultTimeout:
+                        return
+                    self._condition.wait(min(self.resultTimeout - quiet, 0.1))
+            finally:
+                self._resyncing = False
+
+    def run(self, callback=None) -> dict:
+        """
+        Send all images to the device.
+
+        :param callback: (callable) called with the SimulationResult of every sequence
+        :return: (dict) statistics, see statistics
+        """
+        self._callback = callback
+        self._pending.clear()
+        self._readerError = None
+        self._resyncing = False
+        self._lastOutput = 0.0
+        self._statistics = {"images": 0, "sequences": 0, "results": 0, "missing": 0, "discarded": 0,
+                            "resyncs": 0, "prepare_total": 0.0,
+                            "send_total": 0.0, "latency_total": 0.0, "started": time.monotonic(), "finished": None}
+        reader = None
+        if self.pcic is not None:
+            self._reading = True
+            reader = threading.Thread(target=self._readResults, name="o2x5xx-simulation-results", daemon=True)
+            reader.start()
+        sequences = self._sequences()
+        inFlight = collections.deque()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="o2x5xx-simulation") as executor:
+                def fill():
+                    for index, sequence in itertools.islice(sequences, self.prefetch - len(inFlight)):
+                        inFlight.append((index, sequence, executor.submit(self._prepareSequence, sequence)))
+
+                fill()
+                while inFlight and not self.cancel.is_set():
+                    index, sequence, future = inFlight.popleft()
+                    payload, prepareTime = future.result()
+                    # prepare the next sequences while this one is processed by the device
+                    fill()
+                    result = SimulationResult(index=index, images=sequence)
+                    if self.pcic is not None:
+                        self._waitPending(self.maxPending - 1)
+                    result.sent = time.monotonic()
+                    if self.pcic is not None:
+                        with self._condition:
+                            self._pending.append(result)
+                    self.simulation.processImageSequence(payload, self.forceTrigger)
+                    sendTime = time.monotonic() - result.sent
+                    with self._condition:
+                        self._statistics["images"] += len(sequence)
+                        self._statistics["sequences"] += 1
+                        self._statistics["prepare_total"] += prepareTime
+                        self._statistics["send_total"] += sendTime
+                    if self.pcic is None:
+                        self._finish(result, None)
+                for _, _, future in inFlight:
+                    future.cancel()
+            if self.pcic is not None:
+                self._waitPending(0)
+        finally:
+            if reader is not None:
+                with self._condition:
+                    self._reading = False
+                reader.join()
+            self._statistics["finished"] = time.monotonic()
+        return self.statistics
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: (dict) number of sent images and sequences, received, missing and discarded results, number of
+                 resynchronizations after a result timeout, duration and
+                 throughput (images and sequences per second) and average prepare, send and result latency
+                 in seconds
+        """
+        with self._condition:
+            statistics = dict(self._statistics)
+        if not statistics:
+            return {}
+        finished = statistics.pop("finished") or time.monotonic()
+        duration = finished - statistics.pop("started")
+        sequences = statistics["sequences"]
+        return {"images": statistics["images"], "sequences": sequences, "results": statistics["results"],
+                "missing": statistics["missing"], "discarded": statistics["discarded"],
+                "resyncs": statistics["resyncs"], "duration": duration,
+                "images_per_second": statistics["images"] / duration if duration > 0 else 0.0,
+                "sequences_per_second": sequences / duration if duration > 0 else 0.0,
+                "prepare_avg": statistics["prepare_total"] / sequences if sequences else 0.0,
+                "send_avg": statistics["send_total"] / sequences if sequences else 0.0,
+                "latency_avg": statistics["latency_total"] / statistics["results"] if statistics["results"]
+                else 0.0}
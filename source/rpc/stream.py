@@ -0,0 +1,215 @@
+import base64
+import http.client
+import os
+import urllib.parse
+import xml.parsers.expat
+import xmlrpc.client
+
+# size of the chunks read from the socket and from files, a multiple of 3 for base64 encoding without padding
+CHUNK_SIZE = 3 * 64 * 1024
+
+
+class Base64ResponseWriter(object):
+    """
+    Incremental parser for an XML-RPC response with a base64 value. The base64 data is decoded while the
+    response is received and written to a file, so the response is never held in memory as a whole.
+    Responses without base64 value (e.g. faults) are kept and parsed with xmlrpc.client.loads() at the end.
+    """
+
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self._parser = xml.parsers.expat.ParserCreate()
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._data
+        self._inBase64 = False
+        self._foundBase64 = False
+        self._pending = b""
+        self._raw = []
+        self.size = 0
+
+    def _start(self, name, attrs):
+        if name == "base64":
+            self._inBase64 = True
+            self._foundBase64 = True
+            self._raw = None
+
+    def _end(self, name):
+        if name == "base64":
+            self._write(final=True)
+            self._inBase64 = False
+
+    def _data(self, text):
+        if self._inBase64:
+            self._pending += text.encode("ascii").translate(None, b" \t\r\n")
+            self._write()
+
+    def _write(self, final=False):
+        length = len(self._pending) if final else len(self._pending) // 4 * 4
+        if length:
+            data = base64.b64decode(self._pending[:length])
+            self._file.write(data)
+            self.size += len(data)
+            self._pending = self._pending[length:]
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        :param chunk: (bytes) next part of the response body
+        :return: None
+        """
+        if self._raw is not None:
+            self._raw.append(chunk)
+        self._parser.Parse(chunk, False)
+
+    def close(self) -> int:
+        """
+        Finish parsing. Raises the xmlrpc.client.Fault of the response.
+
+        :return: (int) number of bytes written to the file
+        """
+        self._parser.Parse(b"", True)
+        if not self._foundBase64:
+            # no binary data, e.g. a fault
+            result = xmlrpc.client.loads(b"".join(self._raw))[0][0]
+            data = result.data if isinstance(result, xmlrpc.client.Binary) else str(result).encode()
+            self._file.write(data)
+            self.size += len(data)
+        return self.size
+
+
+def _request(proxy, body, bodyLength, handleResponse):
+    """
+    Send an XML-RPC request over a pooled connection of the device.
+
+    :param proxy: (BaseProxy) proxy of the XML-RPC object
+    :param body: (callable) returns the parts of the request body, called again if the request is repeated
+    :param bodyLength: (int) length of the request body
+    :param handleResponse: (callable) called with the http.client.HTTPResponse
+    :return: return value of handleResponse
+    """
+    pool = proxy.device.connectionPool
+    path = urllib.parse.urlsplit(proxy.baseURL).path
+    for attempt in range(2):
+        connection = pool.acquire()
+        reused = connection.sock is not None
+        connection.timeout = proxy.timeout
+        if connection.sock:
+            connection.sock.settimeout(proxy.timeout)
+        reuse = False
+        try:
+            try:
+                connection.putrequest("POST", path)
+                connection.putheader("Content-Type", "text/xml")
+                connection.putheader("User-Agent", xmlrpc.client.Transport.user_agent)
+                connection.putheader("Content-Length", str(bodyLength))
+                connection.endheaders()
+                for part in body():
+                    connection.send(part)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused or attempt > 0:
+                    raise
+                # the device closed the idle keep-alive connection before it answered, the other idle
+                # connections are most likely stale as well: repeat the request once on a new connection
+                pool.clear()
+                continue
+            if response.status != 200:
+                response.read()
+                raise xmlrpc.client.ProtocolError(proxy.baseURL, response.status, response.reason,
+                                                  dict(response.getheaders()))
+            result = handleResponse(response)
+            reuse = True
+            return result
+        except xmlrpc.client.Fault:
+            reuse = True
+            raise
+        finally:
+            pool.release(connection, reuse=reuse)
+
+
+def encodeFile(path: str) -> str:
+    """
+    Read a file and base64 encode it in chunks, so the file is not held in memory next to its encoded data.
+
+    :param path: (str) path of the file
+    :return: (str) base64 encoded content of the file
+    """
+    encoded = bytearray((os.path.getsize(path) + 2) // 3 * 4)
+    position = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = base64.b64encode(chunk)
+            encoded[position:position + len(chunk)] = chunk
+            position += len(chunk)
+    del encoded[position:]
+    return encoded.decode("ascii")
+
+
+def callToFile(proxy, methodName: str, params: tuple, fileobj) -> int:
+    """
+    Call an XML-RPC method returning binary data and stream the decoded data into a file.
+
+    :param proxy: (BaseProxy) proxy of the XML-RPC object
+    :param methodName: (str) name of the method, e.g. "exportConfig"
+    :param params: (tuple) parameters of the method
+    :param fileobj: (file) binary file the data is written to
+    :return: (int) number of bytes written
+    """
+    body = xmlrpc.client.dumps(params, methodName, allow_none=True).encode()
+
+    def handleResponse(response):
+        writer = Base64ResponseWriter(fileobj)
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.feed(chunk)
+        return writer.close()
+
+    return _request(proxy, body=lambda: [body], bodyLength=len(body), handleResponse=handleResponse)
+
+
+def callWithFile(proxy, methodName: str, path: str, params: tuple = ()):
+    """
+    Call an XML-RPC method with the content of a file as first (base64) parameter.
+    The file is read, encoded and sent in chunks.
+
+    :param proxy: (BaseProxy) proxy of the XML-RPC object
+    :param methodName: (str) name of the method, e.g. "importConfig"
+    :param path: (str) path of the file
+    :param params: (tuple) further parameters of the method
+    :return: result of the method
+    """
+    head = ("<?xml version='1.0'?>\n<methodCall>\n<methodName>{}</methodName>\n<params>\n"
+            "<param>\n<value><base64>\n".format(methodName)).encode()
+    # further parameters marshalled without the leading "<params>" tag
+    params = xmlrpc.client.dumps(tuple(params), allow_none=True)[len("<params>\n"):]
+    tail = ("</base64></value>\n</param>\n" + params + "</methodCall>\n").encode()
+    size = os.path.getsize(path)
+    encodedSize = (size + 2) // 3 * 4
+
+    def body():
+        yield head
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield tail
+
+    def handleResponse(response):
+        parser, unmarshaller = xmlrpc.client.getparser()
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+        parser.close()
+        return unmarshaller.close()[0]
+
+    return _request(proxy, body=body, bodyLength=len(head) + encodedSize + len(tail),
+                    handleResponse=handleResponse)
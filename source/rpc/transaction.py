@@ -0,0 +1,113 @@
+import warnings
+
+
+class Transaction(object):
+    """
+    Collects the parameter changes of an application or imager and writes them together.
+
+    While the transaction is active the setters only validate the values and queue the setParameter() calls.
+    When leaving the with statement the queued calls are sent in one batch and the device applies the new
+    configuration once. If one of the writes fails, the parameters which were already written are set back
+    to their previous values and the error is raised. If the rollback fails too, its error is raised with the
+    original error as the cause:
+
+        with device.application.transaction():
+            device.application.TriggerMode = 2
+            device.application.FrameRate = 20.0
+            device.application.FocusDistance = 1.2
+
+    If an exception is raised inside the with statement, nothing is written.
+    """
+    # parameters which are checked with validate() after they were written
+    VALIDATED_PARAMETERS = ("PcicTcpResultSchema", "LogicGraph")
+
+    def __init__(self, obj, proxy):
+        """
+        :param obj: (Application or Imager) object the parameters belong to
+        :param proxy: (ApplicationProxy or ImagerProxy) proxy of the object
+        """
+        self._obj = obj
+        self._proxy = proxy
+        self._outer = None
+        self.changes = []
+
+    def __enter__(self):
+        self._outer = self._proxy.transaction
+        if self._outer is None:
+            self._proxy.transaction = self
+        return self._proxy.transaction
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._outer is not None:
+            # nested transaction, the changes are written with the outer transaction
+            return
+        self._proxy.transaction = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.changes = []
+
+    def __len__(self):
+        return self.changes.__len__()
+
+    def setParameter(self, name: str, value) -> None:
+        """
+        Queue a parameter change.
+
+        :param name: (str) parameter name
+        :param value: new parameter value
+        :return: None
+        """
+        self.changes.append((name, value))
+
+    def commit(self) -> None:
+        """
+        Write all queued parameter changes and wait once until the new configuration is applied.
+        Called automatically when leaving the with statement.
+
+        :return: None
+        """
+        changes, self.changes = self.changes, []
+        if not changes:
+            return
+        snapshot = self._proxy.parameterSnapshot
+        previous = self._proxy.proxy.getAllParameters()
+        with self._proxy.batch(ordered=True) as batch:
+            for name, value in changes:
+                batch.setParameter(name, value)
+        errors = [future.exception() for future in batch.futures if future.exception()]
+        if errors:
+            written = [name for (name, _), future in zip(changes, batch.futures) if not future.exception()]
+            try:
+                if not written:
+                    # e.g. the connection failed while the batch was sent: the device may have written
+                    # some of the parameters, they are found by comparing with the current values
+                    current = self._proxy.proxy.getAllParameters()
+                    written = [name for name, _ in changes if current.get(name) != previous.get(name)]
+                self._rollback(written=written, previous=previous)
+            except Exception as rollbackError:
+                # the failed rollback leaves the device in an unknown state, the original error is the cause
+                raise rollbackError from errors[0]
+            finally:
+                if snapshot:
+                    snapshot.invalidate()
+            raise errors[0]
+        if snapshot:
+            for name, value in changes:
+                snapshot.update(name, value)
+        self._obj.waitForConfigurationDone()
+        if any(name in self.VALIDATED_PARAMETERS for name, _ in changes) and hasattr(self._obj, "validate"):
+            validation = self._obj.validate()
+            if validation:
+                warnings.warn(str(validation), UserWarning)
+                warnings.warn("PCIC TCP/IP data output or Logic Graph process output may not work properly!")
+
+    def _rollback(self, written, previous):
+        names = []
+        for name in reversed(written):
+            if name in previous and name not in names:
+                names.append(name)
+        with self._proxy.batch(ordered=True) as batch:
+            for name in names:
+                batch.setParameter(name, previous[name])
+        self._obj.waitForConfigurationDone()
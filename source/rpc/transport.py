@@ -0,0 +1,161 @@
+import collections
+import http.client
+import threading
+import xmlrpc.client
+
+SOCKET_TIMEOUT = 10
+
+
+class ConnectionPool(object):
+    """
+    Pool of keep-alive HTTP connections to one device. All proxies of a device share the same pool,
+    so nested session, edit, application and imager contexts reuse the already opened TCP connections.
+    """
+
+    def __init__(self, host, timeout=SOCKET_TIMEOUT, maxsize=4):
+        """
+        :param host: (str) device address, optionally with port ("192.168.0.69" or "192.168.0.69:80")
+        :param timeout: (float) default socket timeout of new connections in seconds
+        :param maxsize: (int) max. number of connections which are opened to the device at the same time
+        """
+        if maxsize < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self.host = host
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.inUse = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Connection reuse metrics of the pool.
+
+        :return: (dict) number of created, reused and discarded connections, number of requests which had
+                 to wait for a free connection and number of idle and currently used connections
+        """
+        with self._lock:
+            return {"created": self.created, "reused": self.reused, "discarded": self.discarded,
+                    "waits": self.waits, "idle": len(self._idle), "inUse": self.inUse}
+
+    def acquire(self) -> http.client.HTTPConnection:
+        """
+        Take an idle connection from the pool or open a new one. Blocks while all connections are in use.
+
+        :return: (http.client.HTTPConnection) connection which must be given back with release()
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            self._slots.acquire()
+        with self._lock:
+            self.inUse += 1
+            if self._idle:
+                self.reused += 1
+                # the most recently used connection is the least likely to be closed by the device
+                return self._idle.pop()
+            self.created += 1
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def release(self, connection, reuse=True) -> None:
+        """
+        Give a connection back to the pool.
+
+        :param connection: (http.client.HTTPConnection) connection returned by acquire()
+        :param reuse: (bool) False closes the connection, e.g. after an error left it in an undefined state
+        :return: None
+        """
+        with self._lock:
+            self.inUse -= 1
+            if reuse and not self._closed:
+                self._idle.append(connection)
+                connection = None
+            else:
+                self.discarded += 1
+        if connection:
+            connection.close()
+        self._slots.release()
+
+    def clear(self) -> None:
+        """
+        Close all idle connections, e.g. after the device closed its keep-alive connections.
+
+        :return: None
+        """
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self.discarded += len(idle)
+        for connection in idle:
+            connection.close()
+
+    def close(self) -> None:
+        """
+        Close all idle connections. Connections which are still in use are closed when they are released.
+
+        :return: None
+        """
+        self._closed = True
+        self.clear()
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """
+    XML-RPC transport sending every request over a connection of a shared ConnectionPool.
+    The transport can be used from several threads at the same time (e.g. auto heartbeat and main thread).
+    """
+
+    def __init__(self, pool, timeout=SOCKET_TIMEOUT, use_datetime=False, use_builtin_types=False):
+        """
+        :param pool: (ConnectionPool) pool of the device
+        :param timeout: (float) socket timeout of the requests sent by this transport in seconds
+        """
+        super().__init__(use_datetime=use_datetime, use_builtin_types=use_builtin_types)
+        self.pool = pool
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def make_connection(self, host):
+        return self._local.connection
+
+    def single_request(self, host, handler, request_body, verbose=False):
+        connection = self.pool.acquire()
+        reused = connection.sock is not None
+        connection.timeout = self.timeout
+        if connection.sock:
+            connection.sock.settimeout(self.timeout)
+        self._local.connection = connection
+        reuse = False
+        try:
+            result = super().single_request(host, handler, request_body, verbose)
+            reuse = True
+            return result
+        except xmlrpc.client.Fault:
+            # the response of a fault was read completely
+            reuse = True
+            raise
+        except (http.client.RemoteDisconnected, ConnectionError):
+            if reused:
+                # the device closed its idle keep-alive connections, the others are most likely stale as well
+                self.pool.clear()
+            raise
+        finally:
+            self._local.connection = None
+            self.pool.release(connection, reuse=reuse)
+
+    def close(self):
+        # the connections are owned by the pool
+        pass
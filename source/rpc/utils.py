@@ -1,14 +1,18 @@
 import zipfile
 import json
 import warnings
+from ..pcic.utils import decode_jpeg
 
 
-def firmwareWarning(function):
-    """Formware warning decorator."""
+def checkFirmware(device, configFile) -> None:
+    """
+    Warn if the firmware of the device is lower than the firmware the config file was created with.
 
-    def wrapper(self, *args, **kwargs):
-        keyArgName = list(kwargs.keys())[0]
-        zipOpen = zipfile.ZipFile(kwargs[keyArgName], "r")
+    :param device: (O2x5xxRPCDevice) device the config file is imported to
+    :param configFile: (str) path of a device- or application-config file
+    :return: None
+    """
+    with zipfile.ZipFile(configFile, "r") as zipOpen:
         zipFiles = zipOpen.namelist()
         if "device.json" in zipFiles:
             tmp = "device.json"
@@ -17,11 +21,54 @@ def firmwareWarning(function):
         else:
             raise ImportError("Unknown config file in zip: {}".format(str(zipFiles)))
         jsonData = json.loads(zipOpen.open(tmp).read())
-        minConfigFileFirmware = jsonData["Firmware"]
-        sensorFirmware = self._device.getSWVersion()["IFM_Software"]
-        if int(sensorFirmware.replace(".", "")) < int(minConfigFileFirmware.replace(".", "")):
-            message = "Missmatch in firmware versions: Sensor firmware {} is lower than {} firmware {}. " \
-                      "Import of may will fail!".format(sensorFirmware, tmp, minConfigFileFirmware)
-            warnings.warn(message, UserWarning)
+    minConfigFileFirmware = jsonData["Firmware"]
+    sensorFirmware = device.firmwareVersion
+    if int(sensorFirmware.replace(".", "")) < int(minConfigFileFirmware.replace(".", "")):
+        message = "Missmatch in firmware versions: Sensor firmware {} is lower than {} firmware {}. " \
+                  "Import of may will fail!".format(sensorFirmware, tmp, minConfigFileFirmware)
+        warnings.warn(message, UserWarning)
+
+
+def firmwareWarning(function):
+    """Formware warning decorator."""
+
+    def wrapper(self, *args, **kwargs):
+        keyArgName = list(kwargs.keys())[0]
+        checkFirmware(self._device, kwargs[keyArgName])
         return function(self, *args, **kwargs)
     return wrapper
+
+
+class LazyImage(object):
+    """
+    JPEG image which is decoded on the first access of the array and only once.
+    """
+
+    def __init__(self, data: bytes):
+        """
+        :param data: (bytes) JPEG data
+        """
+        self.data = data
+        self._array = None
+
+    def __bytes__(self):
+        return self.data
+
+    def __len__(self):
+        return self.data.__len__()
+
+    @property
+    def decoded(self) -> bool:
+        """
+        :return: (bool) True if the image was already decoded
+        """
+        return self._array is not None
+
+    @property
+    def array(self) -> "np.ndarray":
+        """
+        :return: (np.ndarray) decoded image
+        """
+        if self._array is None:
+            self._array = decode_jpeg(self.data)
+        return self._array
@@ -0,0 +1,112 @@
+from unittest import TestCase
+from source import AsyncO2x5xxRPCDevice
+from tests.utils import *
+import asyncio
+import warnings
+import xmlrpc.client
+
+
+class TestAsyncRPCDevice(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def test_concurrent_calls_share_keep_alive_connections(self):
+        async def run():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address, pool_size=4) as device:
+                names = await asyncio.gather(*[device.getParameter("Name") for _ in range(40)])
+                version = await device.getSWVersion()
+                return names, version, device.connectionPool.statistics
+
+        names, version, statistics = asyncio.run(run())
+        self.assertEqual(names, ["FakeDevice"] * 40)
+        self.assertEqual(version["IFM_Software"], "1.30.10479")
+        self.assertLessEqual(self.server.connections, 4)
+        self.assertEqual(statistics["created"], self.server.connections)
+        self.assertEqual(statistics["inUse"], 0)
+
+    def test_many_devices_in_one_event_loop(self):
+        async def query():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address, pool_size=1) as device:
+                return await device.getAllParameters()
+
+        async def run():
+            return await asyncio.gather(*[query() for _ in range(20)])
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(r["Name"] == "FakeDevice" for r in results))
+
+    def test_fault(self):
+        async def run():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address) as device:
+                with self.assertRaises(xmlrpc.client.Fault):
+                    await device.getParameter("Unknown")
+                # the connection is still usable after the fault
+                return await device.getParameter("Name")
+
+        self.assertEqual(asyncio.run(run()), "FakeDevice")
+
+    def test_nested_contexts(self):
+        async def run():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address) as device:
+                async with device.requestSession() as session:
+                    async with session.setOperatingMode(1) as edit:
+                        self.assertIs(device.editProxy, edit)
+                        async with edit.editApplication(1) as application:
+                            await application.proxy.setParameter("Name", "Async")
+                            async with application.editImager(1) as imager:
+                                exposure = await imager.proxy.getParameter("ExposureTime")
+                            with self.assertRaises(ValueError):
+                                async with application.editImager(2):
+                                    pass
+                self.assertIsNone(device.sessionProxy)
+                return exposure, device.connectionPool.statistics
+
+        exposure, statistics = asyncio.run(run())
+        self.assertEqual(exposure, "5000")
+        self.assertEqual(self.server.parameters["application"]["Name"], "Async")
+        self.assertEqual(self.server.parameters["main"]["OperatingMode"], "0")
+        self.assertEqual(statistics["created"], 1)
+        methods = [method for _, method, _ in self.server.requests]
+        self.assertIn("cancelSession", methods)
+        self.assertIn("stopEditingApplication", methods)
+
+    def test_failed_auto_heartbeat(self):
+        heartbeats = []
+
+        def heartbeat(interval):
+            heartbeats.append(interval)
+            if len(heartbeats) > 1:
+                raise xmlrpc.client.Fault(100000004, "Session not available")
+            return interval
+        self.server.rpc_session_heartbeat = heartbeat
+
+        async def run():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address) as device:
+                async with device.mainProxy.requestSession(autoHeartbeatInterval=1) as session:
+                    await asyncio.sleep(2.5)
+                    return session.autoHeartbeatError
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            error = asyncio.run(run())
+        self.assertIsInstance(error, xmlrpc.client.Fault)
+        # the failed heartbeat is repeated and the session is cancelled on the device
+        self.assertGreaterEqual(len(heartbeats), 3)
+        self.assertTrue(any(issubclass(w.category, ResourceWarning) for w in caught))
+        self.assertIn("cancelSession", [method for _, method, _ in self.server.requests])
+
+    def test_without_keep_alive(self):
+        self.server.close()
+        self.server = FakeRPCServer(keep_alive=False)
+
+        async def run():
+            async with AsyncO2x5xxRPCDevice(address=self.server.address) as device:
+                return [await device.getParameter("Name") for _ in range(3)]
+
+        self.assertEqual(asyncio.run(run()), ["FakeDevice"] * 3)
+        self.assertEqual(self.server.connections, 3)
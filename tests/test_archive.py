@@ -0,0 +1,84 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice, ConfigArchive, loadConfig
+from tests.utils import *
+import copy
+import os
+import shutil
+import tempfile
+import zipfile
+
+
+class TestConfigArchive(TestCase):
+    deviceConfig = os.path.join(os.path.dirname(__file__), "deviceConfig")
+    configFile = os.path.join(deviceConfig, "Unittest8PolDeviceConfig.o2d5xxcfg")
+    applicationFile = os.path.join(deviceConfig, "UnittestApplicationImport.o2d5xxapp")
+
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.mkdtemp()
+        self.archive = ConfigArchive(os.path.join(self.tmpDir, "archive"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpDir)
+
+    def modifiedConfig(self, frameRate):
+        config = loadConfig(self.configFile)
+        config["Applications"][0]["FrameRate"] = frameRate
+        path = os.path.join(self.tmpDir, "modified_{}.o2d5xxcfg".format(frameRate))
+        with zipfile.ZipFile(self.configFile, "r") as source, zipfile.ZipFile(path, "w") as target:
+            for name in source.namelist():
+                data = json.dumps(config) if name == "device.json" else source.read(name)
+                target.writestr(name, data)
+        return path
+
+    def test_restore_is_semantically_equal(self):
+        for configFile in (self.configFile, self.applicationFile):
+            snapshotId = self.archive.put(configFile, label="device")
+            restored = self.archive.restore(snapshotId, os.path.join(self.tmpDir, os.path.basename(configFile)))
+            self.assertEqual(loadConfig(restored), loadConfig(configFile))
+            with zipfile.ZipFile(restored) as zipRestored, zipfile.ZipFile(configFile) as zipOriginal:
+                self.assertEqual(zipRestored.namelist(), zipOriginal.namelist())
+                for name in zipOriginal.namelist():
+                    if not name.endswith(".json"):
+                        self.assertEqual(zipRestored.read(name), zipOriginal.read(name))
+
+    def test_deduplication(self):
+        first = self.archive.put(self.configFile, label="device")
+        objects = self.archive.statistics["objects"]
+        self.archive.put(self.configFile, label="device")
+        self.assertEqual(self.archive.statistics["objects"], objects)
+        # one changed application adds exactly one object
+        last = self.archive.put(self.modifiedConfig(20), label="device")
+        self.assertEqual(self.archive.statistics["objects"], objects + 1)
+        self.assertEqual(self.archive.statistics["snapshots"], 3)
+        self.assertEqual(self.archive.latest(label="device"), last)
+        self.assertIsNone(self.archive.latest(label="other"))
+        changed = self.archive.get(last)["files"][-1]["applications"][0]
+        self.assertTrue(self.archive.exists(changed))
+        self.assertNotEqual(changed, self.archive.get(first)["files"][-1]["applications"][0])
+
+    def test_gc(self):
+        self.archive.put(self.configFile)
+        snapshotId = self.archive.put(self.modifiedConfig(20))
+        self.assertEqual(self.archive.gc(), 0)
+        self.archive.delete(snapshotId)
+        self.assertEqual(self.archive.gc(), 1)
+        with self.assertRaises(KeyError):
+            self.archive.get(snapshotId)
+        self.assertEqual(len(self.archive.snapshots()), 1)
+
+    def test_backup_and_restore_device(self):
+        server = FakeRPCServer()
+        with open(self.configFile, "rb") as f:
+            server.exportData = f.read()
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                snapshotId = self.archive.backupDevice(device)
+                self.assertEqual(self.archive.get(snapshotId)["label"], server.address)
+                self.archive.restoreDevice(snapshotId, device)
+            self.assertEqual(len(server.imported), 2)
+            imported = os.path.join(self.tmpDir, "imported.o2d5xxcfg")
+            with open(imported, "wb") as f:
+                f.write(server.imported[0][0])
+            self.assertEqual(loadConfig(imported), loadConfig(self.configFile))
+        finally:
+            server.close()
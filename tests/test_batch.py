@@ -0,0 +1,107 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from tests.utils import *
+import xmlrpc.client
+
+
+class TestBatch(TestCase):
+
+    def test_batch_with_multicall(self):
+        server = FakeRPCServer(multicall=True)
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                posts = server.posts
+                with device.batch() as batch:
+                    name = batch.getParameter("Name")
+                    article = batch.getParameter("ArticleNumber")
+                    unknown = batch.getParameter("Unknown")
+                self.assertEqual(server.posts, posts + 1)
+                self.assertTrue(batch.multicall)
+                self.assertEqual(name.result(), "FakeDevice")
+                self.assertEqual(article.result(), "O2D500")
+                self.assertIsInstance(unknown.exception(), xmlrpc.client.Fault)
+                with self.assertRaises(xmlrpc.client.Fault):
+                    batch.results()
+        finally:
+            server.close()
+
+    def test_batch_without_multicall(self):
+        server = FakeRPCServer(delay=0.05)
+        try:
+            with O2x5xxRPCDevice(address=server.address, pool_size=4) as device:
+                with device.batch() as batch:
+                    for _ in range(8):
+                        batch.getParameter("Name")
+                self.assertFalse(batch.multicall)
+                self.assertEqual(batch.results(), ["FakeDevice"] * 8)
+                # calls are sent concurrently over max. 4 keep-alive connections
+                self.assertLessEqual(server.connections, 4)
+                self.assertGreater(server.connections, 1)
+                posts = server.posts
+                with device.batch(ordered=True) as batch:
+                    batch.getParameter("Name")
+                    batch.getParameter("ArticleNumber")
+                # unsupported multicall is remembered for the device
+                self.assertEqual(server.posts, posts + 2)
+                self.assertEqual(batch.results(), ["FakeDevice", "O2D500"])
+                self.assertEqual([r[1] for r in server.requests[-2:]], ["getParameter"] * 2)
+                self.assertEqual([r[2][0] for r in server.requests[-2:]], ["Name", "ArticleNumber"])
+        finally:
+            server.close()
+
+    def test_batch_of_nested_proxy_is_ordered(self):
+        server = FakeRPCServer()
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                self.assertFalse(device.batch().ordered)
+                self.assertTrue(device.mainProxy.batch(ordered=True).ordered)
+                openFakeApplication(device)
+                self.assertTrue(device.applicationProxy.batch().ordered)
+                self.assertFalse(device.applicationProxy.batch(ordered=False).ordered)
+        finally:
+            server.close()
+
+    def test_multicall_protocol_error(self):
+        server = FakeRPCServer(multicall=True)
+        multicall = xmlrpc.client.MultiCall.__call__
+        errors = []
+
+        def reject(self):
+            if not errors:
+                errors.append(xmlrpc.client.ProtocolError(server.address, 503, "Service Unavailable", {}))
+                raise errors[0]
+            return multicall(self)
+
+        xmlrpc.client.MultiCall.__call__ = reject
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                with device.batch() as batch:
+                    name = batch.getParameter("Name")
+                    batch.getParameter("ArticleNumber")
+                self.assertIs(name.exception(), errors[0])
+                # a transient error does not disable system.multicall for the device
+                self.assertIsNone(batch.multicall)
+                posts = server.posts
+                with device.batch() as batch:
+                    batch.getParameter("Name")
+                    batch.getParameter("ArticleNumber")
+                self.assertEqual(batch.results(), ["FakeDevice", "O2D500"])
+                self.assertTrue(batch.multicall)
+                self.assertEqual(server.posts, posts + 1)
+        finally:
+            xmlrpc.client.MultiCall.__call__ = multicall
+            server.close()
+
+    def test_batch_is_cancelled_on_error(self):
+        server = FakeRPCServer(multicall=True)
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                posts = server.posts
+                with self.assertRaises(RuntimeError):
+                    with device.batch() as batch:
+                        name = batch.getParameter("Name")
+                        raise RuntimeError()
+                self.assertTrue(name.cancelled())
+                self.assertEqual(server.posts, posts)
+        finally:
+            server.close()
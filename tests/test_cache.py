@@ -0,0 +1,116 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from source.rpc.cache import ParameterLimitsCache
+from tests.utils import *
+import os
+import tempfile
+import time
+
+
+class TestParameterSnapshot(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        self.device = O2x5xxRPCDevice(address=self.server.address)
+
+    def tearDown(self) -> None:
+        self.device.__exit__(None, None, None)
+        self.server.close()
+
+    def calls(self, method):
+        return [r for r in self.server.requests if r[1] == method]
+
+    def test_application_properties_from_snapshot(self):
+        application = openFakeApplication(self.device)
+        application.enableParameterSnapshot()
+        self.assertEqual(application.Name, "New Application")
+        self.assertEqual(application.TriggerMode, 1)
+        self.assertEqual(application.FrameRate, 35.0)
+        self.assertEqual(application.HWROI, {"x": 0, "y": 0, "width": 1280, "height": 960})
+        self.assertFalse(application.Rotate180Degree)
+        self.assertEqual(application.FocusDistance, 0.6)
+        self.assertEqual(len(self.calls("getAllParameters")), 1)
+        self.assertEqual(self.calls("getParameter")[-1][2], ("DeviceType",))
+
+    def test_snapshot_is_patched_on_setParameter(self):
+        application = openFakeApplication(self.device)
+        application.enableParameterSnapshot()
+        application.Name = "Changed"
+        application.Rotate180Degree = True
+        application.TriggerMode = 2
+        self.assertEqual(application.Name, "Changed")
+        self.assertTrue(application.Rotate180Degree)
+        self.assertEqual(application.TriggerMode, 2)
+        self.assertEqual(self.calls("getParameter")[-1][2], ("DeviceType",))
+        # float values are requested again from the device
+        application.FrameRate = 20.5
+        self.assertEqual(application.FrameRate, 20.5)
+        self.assertEqual(self.calls("getParameter")[-1][2], ("FrameRate",))
+
+    def test_snapshot_is_kept_for_the_proxy(self):
+        openFakeApplication(self.device, imager_index=1)
+        self.device.imager.enableParameterSnapshot()
+        self.assertEqual(self.device.imager.ExposureTime, 5000)
+        self.assertEqual(self.device.imager.AnalogGainFactor, 2)
+        self.assertFalse(self.device.imager.FilterInvert)
+        self.assertEqual(len(self.calls("getAllParameters")), 1)
+        self.device.imager.disableParameterSnapshot()
+        self.assertEqual(self.device.imager.ExposureTime, 5000)
+        self.assertEqual(self.calls("getParameter")[-1][2], ("ExposureTime",))
+
+    def test_ttl_and_refresh(self):
+        application = openFakeApplication(self.device)
+        application.enableParameterSnapshot(ttl=0.05)
+        self.assertEqual(application.Name, "New Application")
+        self.server.parameters["application"]["Name"] = "Changed by other client"
+        self.assertEqual(application.Name, "New Application")
+        time.sleep(0.1)
+        self.assertEqual(application.Name, "Changed by other client")
+        self.server.parameters["application"]["Name"] = "Changed again"
+        application.refreshParameterSnapshot()
+        self.assertEqual(application.Name, "Changed again")
+        self.assertEqual(len(self.calls("getAllParameters")), 3)
+
+
+class TestParameterLimitsCache(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def calls(self, method):
+        return [r for r in self.server.requests if r[1] == method]
+
+    def test_limits_requested_once(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            application = openFakeApplication(device)
+            application.TriggerMode = 2
+            application.FrameRate = 20.0
+            with self.assertRaises(ValueError) as error:
+                application.FrameRate = 80.1
+            self.assertIn("0.0167", str(error.exception))
+            imager = openFakeApplication(device, imager_index=1)
+            imager.ExposureTime = 1000
+            imager.AnalogGainFactor = 4
+            with self.assertRaises(ValueError):
+                imager.AnalogGainFactor = 3
+            self.assertEqual(len(self.calls("getAllParameterLimits")), 2)
+            self.assertEqual(len(self.calls("getSWVersion")), 1)
+            self.assertIn(ParameterLimitsCache.key("1:320", "1.30.10479", "application", "Camera"),
+                          device.parameterLimitsCache)
+            self.assertIn(ParameterLimitsCache.key("1:320", "1.30.10479", "imager", "normal"),
+                          device.parameterLimitsCache)
+        self.assertEqual(self.server.parameters["imager"]["AnalogGainFactor"], "4")
+
+    def test_persisted_limits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "limits.json")
+            with O2x5xxRPCDevice(address=self.server.address, limits_cache=ParameterLimitsCache(path)) as device:
+                openFakeApplication(device).FocusDistance = 1.2
+            self.assertTrue(os.path.exists(path))
+            with O2x5xxRPCDevice(address=self.server.address, limits_cache=ParameterLimitsCache(path)) as device:
+                openFakeApplication(device).FocusDistance = 1.5
+            self.assertEqual(len(self.calls("getAllParameterLimits")), 1)
+            self.assertEqual(self.server.parameters["application"]["FocusDistance"], "1.5")
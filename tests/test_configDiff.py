@@ -0,0 +1,81 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice, ConfigDiff, loadConfig
+from tests.utils import *
+import copy
+import os
+import shutil
+import tempfile
+import zipfile
+
+
+class TestConfigDiff(TestCase):
+    deviceConfig = os.path.join(os.path.dirname(__file__), "deviceConfig")
+    configFile = os.path.join(deviceConfig, "Unittest8PolDeviceConfig.o2d5xxcfg")
+    applicationFile = os.path.join(deviceConfig, "UnittestApplicationImport.o2d5xxapp")
+
+    def setUp(self) -> None:
+        self.config = loadConfig(self.configFile)
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpDir)
+
+    def writeConfig(self, config, name="target.o2d5xxcfg"):
+        path = os.path.join(self.tmpDir, name)
+        with zipfile.ZipFile(path, "w") as zipOpen:
+            zipOpen.writestr("device.json", json.dumps(config))
+        return path
+
+    def test_same_config_has_no_differences(self):
+        diff = ConfigDiff.fromFiles(self.configFile, self.configFile)
+        self.assertEqual(len(diff), 0)
+        diff = ConfigDiff.fromFiles(self.applicationFile, self.applicationFile)
+        self.assertEqual(len(diff), 0)
+
+    def test_parameter_changes(self):
+        target = copy.deepcopy(self.config)
+        target["Applications"][0]["ImagerConfigurations"]["1"]["ExposureTime"] = 7000
+        target["Applications"][1]["FrameRate"] = 20
+        # formatting of stringified JSON parameters is no difference
+        target["Applications"][1]["HWROI"] = '{"x":0,"y":0,"width":1280,"height":960}'
+        target["Device"]["UpTime"] = 99.0
+        diff = ConfigDiff.fromFiles(self.configFile, self.writeConfig(target))
+        self.assertEqual([change.path for change in diff.changes],
+                         ["application_1/imager_1/ExposureTime", "application_2/FrameRate"])
+        self.assertTrue(diff.applicable)
+        self.assertEqual(diff.changes[0].old, 5000)
+        self.assertEqual(diff.changes[0].new, 7000)
+        self.assertEqual(ConfigDiff(self.config, diff.patched()).toDict(), diff.toDict())
+        self.assertEqual(len(ConfigDiff(target, diff.patched())), 0)
+
+    def test_structural_and_device_changes(self):
+        target = copy.deepcopy(self.config)
+        target["Applications"][0] = None
+        del target["Applications"][1]["ImagerConfigurations"]["1"]
+        target["Device"]["Name"] = "Other Sensor"
+        diff = ConfigDiff(self.config, target)
+        self.assertEqual(diff.structural, ["application_1 removed", "application_2/imager_1 removed"])
+        self.assertEqual([change.path for change in diff.changes], ["Device/Name"])
+        self.assertFalse(diff.applicable)
+        with self.assertRaises(ValueError):
+            diff.apply(device=None)
+
+    def test_apply_only_changed_parameters(self):
+        target = copy.deepcopy(self.config)
+        target["Applications"][0]["ImagerConfigurations"]["1"]["ExposureTime"] = 7000
+        target["Applications"][0]["TriggerMode"] = 1
+        target["Device"]["Name"] = "Other Sensor"
+        diff = ConfigDiff(self.config, target)
+        server = FakeRPCServer()
+        try:
+            with O2x5xxRPCDevice(address=server.address) as device:
+                applied = diff.apply(device, strict=False)
+            self.assertEqual(len(applied), 2)
+            setParameters = [(obj, params) for obj, method, params in server.requests if method == "setParameter"]
+            self.assertEqual(setParameters, [("application", ("TriggerMode", 1)), ("imager", ("ExposureTime", 7000))])
+            self.assertEqual(server.parameters["imager"]["ExposureTime"], "7000")
+            methods = [method for _, method, _ in server.requests]
+            self.assertEqual(methods.count("save"), 1)
+            self.assertEqual(server.parameters["main"]["OperatingMode"], "0")
+        finally:
+            server.close()
@@ -0,0 +1,142 @@
+from unittest import TestCase
+from source import DiscoveryEngine, DiscoveryError, DiscoveryClient, DiscoveryEvent, DiscoveryMonitor
+from tests.utils import *
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+DEVICES = [{"ip": "192.168.0.69", "mac": "00:02:01:40:aa:01", "name": "camera_1"},
+           {"ip": "192.168.0.70", "mac": "00:02:01:40:aa:02", "name": "camera_2"}]
+
+
+class TestDiscoveryEngine(TestCase):
+
+    def setUp(self) -> None:
+        self.devices = FakeDiscoveryDevices(DEVICES)
+
+    def tearDown(self) -> None:
+        self.devices.close()
+
+    def engine(self, interfaces=("127.0.0.1",), **kwargs):
+        return DiscoveryEngine(interfaces=interfaces, port=self.devices.port,
+                               broadcast_address=self.devices.host, **kwargs)
+
+    def test_discover_devices(self):
+        found = []
+        result = self.engine(timeout=0.5, retry_interval=0.2).detect(callback=found.append)
+        self.assertEqual([device["device_name"] for device in result["devices"]], ["camera_1", "camera_2"])
+        self.assertEqual(found, result["devices"])
+        device = result["devices"][0]
+        self.assertEqual(device["device_ip"], "192.168.0.69")
+        self.assertEqual(device["device_mac"], "00:02:01:40:aa:01")
+        self.assertEqual(device["device_article_number"], "O2D500")
+        self.assertEqual(device["interface"], "127.0.0.1")
+        self.assertEqual(result["errors"], [])
+        # the repeated broadcasts do not return the devices again
+        self.assertEqual(len(self.devices.broadcasts), 3)
+
+    def test_stop_at_expected_count(self):
+        start = time.monotonic()
+        devices = list(self.engine(timeout=10, expected=2).discover())
+        self.assertEqual(len(devices), 2)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(len(self.devices.broadcasts), 1)
+
+    def test_retry_lost_broadcast(self):
+        self.devices.drop = 2
+        devices = list(self.engine(timeout=5, expected=2, retries=2, retry_interval=0.1).discover())
+        self.assertEqual(len(devices), 2)
+        self.assertEqual(len(self.devices.broadcasts), 3)
+
+    def test_errors_do_not_stop_discovery(self):
+        # 192.0.2.1 is no local address, the socket can not be bound to it
+        engine = self.engine(interfaces=["127.0.0.1", "192.0.2.1"], timeout=5, expected=2)
+        devices = list(engine.discover())
+        self.assertEqual(len(devices), 2)
+        self.assertEqual(len(engine.errors), 1)
+        error = engine.errors[0]
+        self.assertIsInstance(error, DiscoveryError)
+        self.assertEqual(error.interface, "192.0.2.1")
+        self.assertEqual(error.stage, "setup")
+        self.assertIsInstance(error.error, OSError)
+        self.assertEqual(error.toDict()["interface"], "192.0.2.1")
+
+    def test_discovery_client(self):
+        # errors are returned in the result instead of exiting the process
+        result = DiscoveryClient(interface="192.0.2.1", timeout=0.3).detect_devices()
+        self.assertEqual(result["devices"], {})
+        self.assertEqual(result["errors"][0]["stage"], "setup")
+
+
+class TestDiscoveryMonitor(TestCase):
+
+    def setUp(self) -> None:
+        self.devices = FakeDiscoveryDevices([dict(device) for device in DEVICES])
+        self.tmpDir = tempfile.mkdtemp()
+        self.inventoryPath = os.path.join(self.tmpDir, "devices.json")
+
+    def tearDown(self) -> None:
+        self.devices.close()
+        shutil.rmtree(self.tmpDir)
+
+    def monitor(self, **kwargs):
+        return DiscoveryMonitor(interfaces=["127.0.0.1"], port=self.devices.port,
+                                broadcast_address=self.devices.host, timeout=0.2, retries=0, **kwargs)
+
+    def test_add_change_remove_events(self):
+        events = []
+        monitor = self.monitor(interval=0.2, remove_after=0.5, callback=events.append)
+        monitor.run_once()
+        self.assertEqual([event.type for event in events], [DiscoveryEvent.ADD, DiscoveryEvent.ADD])
+        self.assertEqual(sorted(monitor.addresses()), ["192.168.0.69", "192.168.0.70"])
+        events.clear()
+        # unchanged devices do not emit events
+        monitor.run_once()
+        self.assertEqual(events, [])
+        self.devices.devices[0]["ip"] = "192.168.0.80"
+        self.devices.devices.pop(1)
+        monitor.run_once()
+        self.assertEqual([event.type for event in events], [DiscoveryEvent.CHANGE])
+        self.assertEqual(events[0].changed, ["device_ip"])
+        self.assertEqual(events[0].previous["device_ip"], "192.168.0.69")
+        self.assertEqual(monitor.get("00:02:01:40:AA:01")["device_ip"], "192.168.0.80")
+        events.clear()
+        time.sleep(0.4)
+        monitor.run_once()
+        self.assertEqual([(event.type, event.device["device_mac"]) for event in events],
+                         [(DiscoveryEvent.REMOVE, "00:02:01:40:aa:02")])
+        self.assertEqual(list(monitor.inventory), ["00:02:01:40:aa:01"])
+
+    def test_persisted_inventory(self):
+        self.monitor(inventory_path=self.inventoryPath).run_once()
+        self.devices.close()
+        # the restarted monitor knows the devices without a discovery
+        monitor = self.monitor(inventory_path=self.inventoryPath)
+        self.assertEqual(sorted(monitor.addresses()), ["192.168.0.69", "192.168.0.70"])
+        self.assertEqual(monitor.get("00:02:01:40:aa:02")["device_name"], "camera_2")
+        self.devices = FakeDiscoveryDevices([])
+
+    def test_corrupt_inventory(self):
+        self.monitor(inventory_path=self.inventoryPath).run_once()
+        with open(self.inventoryPath, "r+") as f:
+            f.truncate(20)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            monitor = self.monitor(inventory_path=self.inventoryPath)
+        self.assertEqual(len(caught), 1)
+        self.assertEqual(monitor.inventory, {})
+        # the inventory is rebuilt and stored again by the next discovery
+        monitor.run_once()
+        self.assertEqual(len(self.monitor(inventory_path=self.inventoryPath).inventory), 2)
+
+    def test_background_monitor(self):
+        events = []
+        with self.monitor(interval=0.1, callback=events.append) as monitor:
+            timeout = time.monotonic() + 5
+            while len(events) < 2 and time.monotonic() < timeout:
+                time.sleep(0.05)
+        self.assertEqual(len(events), 2)
+        self.assertIsNone(monitor.error)
+        self.assertEqual(len(monitor.inventory), 2)
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from source import BandwidthLimiter, FirmwareUpdater, FleetFirmwareUpdater, UpdateJournal, DeviceMode
+from tests.utils import *
+import os
+import shutil
+import tempfile
+import time
+
+
+class TestBandwidthLimiter(TestCase):
+
+    def test_rate(self):
+        limiter = BandwidthLimiter(rate=200000, burst=50000)
+        start = time.monotonic()
+        for _ in range(10):
+            limiter.consume(10000)
+        # 100000 bytes with a burst of 50000 bytes at 200000 bytes/s
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(limiter.consumed, 100000)
+
+    def test_unlimited(self):
+        limiter = BandwidthLimiter()
+        self.assertEqual(limiter.consume(10 ** 9), 0.0)
+
+
+class TestFirmwareUpdater(TestCase):
+
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.mkdtemp()
+        self.updateFile = os.path.join(self.tmpDir, "O2D5xx_Firmware.swu")
+        with open(self.updateFile, "wb") as f:
+            f.write(os.urandom(300 * 1024))
+        self.devices = []
+
+    def tearDown(self) -> None:
+        for device in self.devices:
+            device.close()
+        shutil.rmtree(self.tmpDir)
+
+    def createDevice(self, **kwargs):
+        device = FakeFirmwareDevice(**kwargs)
+        self.devices.append(device)
+        return device
+
+    def test_install(self):
+        device = self.createDevice()
+        updater = FirmwareUpdater(address=device.address, recovery_port=device.recovery_port)
+        self.assertEqual(updater.readDeviceMode(), DeviceMode.PRODUCTIVE)
+        progress = []
+        installed = updater.install([self.updateFile], timeout=10, callback=lambda f, p: progress.append(p))
+        self.assertEqual(installed, [self.updateFile])
+        with open(self.updateFile, "rb") as f:
+            self.assertEqual(device.uploads, [("O2D5xx_Firmware.swu", f.read())])
+        self.assertEqual(device.reboots, ["recovery", "productive"])
+        self.assertEqual(device.mode, "productive")
+        self.assertEqual(progress[-1], 1.0)
+
+    def test_retry_after_network_failure(self):
+        device = self.createDevice(fail_uploads=1)
+        updater = FirmwareUpdater(address=device.address, recovery_port=device.recovery_port)
+        updater.install([self.updateFile], timeout=10, retries=1)
+        self.assertEqual(len(device.uploads), 1)
+        self.assertEqual(device.mode, "productive")
+
+    def test_fleet_update_resumes_with_journal(self):
+        first = self.createDevice(host="127.0.0.2")
+        second = self.createDevice(host="127.0.0.3", recovery_port=first.recovery_port, fail_uploads=5)
+        journal = os.path.join(self.tmpDir, "journal.json")
+        updater = FleetFirmwareUpdater([first.address, second.address], [self.updateFile], max_workers=2,
+                                       bandwidth=10 * 1024 * 1024, journal=journal, timeout=10, retries=1,
+                                       recovery_port=first.recovery_port)
+        results = updater.run()
+        self.assertTrue(results[0].success, results[0].error)
+        self.assertFalse(results[1].success)
+        self.assertTrue(UpdateJournal(journal).isFinished(first.address))
+
+        second.fail_uploads = 0
+        updater = FleetFirmwareUpdater([first.address, second.address], [self.updateFile], max_workers=2,
+                                       journal=journal, timeout=10, recovery_port=first.recovery_port)
+        results = updater.run()
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(results[0].path, [])
+        self.assertEqual(results[1].path, [self.updateFile])
+        self.assertEqual(len(first.uploads), 1)
+        self.assertEqual(len(second.uploads), 1)
+        self.assertEqual(first.reboots, ["recovery", "productive"])
@@ -0,0 +1,111 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice, FleetRunner
+from tests.utils import *
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+
+def unusedAddress():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return "127.0.0.1:{}".format(s.getsockname()[1])
+
+
+class TestFleetRunner(TestCase):
+    configFile = os.path.join(os.path.dirname(__file__), "deviceConfig", "Unittest8PolDeviceConfig.o2d5xxcfg")
+
+    def setUp(self) -> None:
+        self.servers = [FakeRPCServer(delay=0.02) for _ in range(4)]
+        with open(self.configFile, "rb") as f:
+            data = f.read()
+        for index, server in enumerate(self.servers):
+            server.exportData = data
+            server.parameters["main"]["ActiveApplication"] = str(index + 1)
+        self.addresses = [server.address for server in self.servers]
+        self.tmpDir = tempfile.mkdtemp()
+        self.active = 0
+        self.maxActive = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        for server in self.servers:
+            server.close()
+        shutil.rmtree(self.tmpDir)
+
+    def countingDevice(self, address, timeout):
+        fleet = self
+
+        class CountingDevice(O2x5xxRPCDevice):
+            def __init__(self):
+                with fleet.lock:
+                    fleet.active += 1
+                    fleet.maxActive = max(fleet.maxActive, fleet.active)
+                super().__init__(address=address, timeout=timeout)
+
+        device = CountingDevice()
+        close = device.mainProxy.close
+
+        def closeAndCount():
+            close()
+            with self.lock:
+                self.active -= 1
+        device.mainProxy.close = closeAndCount
+        return device
+
+    def test_backup_and_restore(self):
+        runner = FleetRunner(self.addresses, max_workers=2, device_factory=self.countingDevice)
+        finished = []
+        results = runner.backup(backupPath=self.tmpDir, callback=finished.append)
+        self.assertEqual([r.address for r in results], self.addresses)
+        self.assertEqual(len(finished), 4)
+        self.assertLessEqual(self.maxActive, 2)
+        for index, result in enumerate(results):
+            self.assertTrue(result.success, result.error)
+            self.assertEqual(result.attempts, 1)
+            self.assertEqual(result.activeApplication, str(index + 1))
+            self.assertGreater(result.duration, 0)
+            self.assertTrue(os.path.exists(result.path))
+            self.assertEqual(result.toDict()["error"], None)
+
+        results = runner.restore(configFiles={r.address: r.path for r in results},
+                                 activeApplications={r.address: "2" for r in results})
+        self.assertTrue(all(r.success for r in results))
+        for server in self.servers:
+            self.assertEqual([flags for _, flags in server.imported], [0x0001, 0x0010])
+            self.assertEqual(server.parameters["main"]["ActiveApplication"], "2")
+
+    def test_retries_and_errors(self):
+        address = unusedAddress()
+        runner = FleetRunner([self.addresses[0], address], max_workers=2, retries=2, retry_delay=0.01)
+        results = runner.backup(backupPath=self.tmpDir)
+        self.assertTrue(results[0].success)
+        self.assertFalse(results[1].success)
+        self.assertEqual(results[1].attempts, 3)
+        self.assertIsInstance(results[1].error, ConnectionError)
+
+    def test_timeout(self):
+        runner = FleetRunner([unusedAddress()], timeout=0.05, retries=100, retry_delay=0.02)
+        result = runner.backup(backupPath=self.tmpDir)[0]
+        self.assertFalse(result.success)
+        self.assertIsInstance(result.error, TimeoutError)
+        self.assertLess(result.attempts, 100)
+
+    def test_timeout_of_hanging_device(self):
+        server = FakeRPCServer(delay=1.0)
+        try:
+            runner = FleetRunner([server.address], timeout=0.3, retries=0)
+            result = runner.backup(backupPath=self.tmpDir)[0]
+        finally:
+            server.close()
+        self.assertFalse(result.success)
+        self.assertIsInstance(result.error, TimeoutError)
+        # the requests are aborted at the deadline instead of after the socket timeout
+        self.assertLess(result.duration, 0.8)
+
+    def test_restore_requires_config_files(self):
+        runner = FleetRunner(self.addresses)
+        with self.assertRaises(ValueError):
+            runner.restore(configFiles={})
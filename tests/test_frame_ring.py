@@ -0,0 +1,76 @@
+from unittest import TestCase
+from source import FrameRing
+from tests.utils import *
+import multiprocessing
+import numpy as np
+
+
+def attachAndClose(name):
+    FrameRing(name=name, create=False).close()
+
+
+class TestFrameRing(TestCase):
+
+    def setUp(self) -> None:
+        self.ring = FrameRing(slots=4, slot_size=64 * 1024)
+
+    def tearDown(self) -> None:
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_write_and_read_from_attached_ring(self):
+        reader_ring = FrameRing(name=self.ring.name, create=False)
+        self.assertEqual(reader_ring.slots, 4)
+        self.assertEqual(reader_ring.slot_size, 64 * 1024)
+        reader = reader_ring.reader()
+        sequence = self.ring.write(createRawImageChunk(32, 16, 7) + createRawImageChunk(16, 8, 9))
+        self.assertEqual(sequence, 1)
+        frame = reader.read_next(timeout=1)
+        self.assertEqual(frame.sequence, 1)
+        self.assertEqual(len(frame), 2)
+        header, image = frame.images[0]
+        self.assertEqual(header["IMAGE_WIDTH"], 32)
+        self.assertEqual(image.shape, (16, 32))
+        self.assertTrue(np.all(image == 7))
+        self.assertEqual(frame.images[1][1].shape, (8, 16))
+        self.assertTrue(reader.is_valid(frame))
+        del frame, image, header
+        reader_ring.close()
+
+    def test_ring_survives_exited_reader_process(self):
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        process = multiprocessing.get_context("spawn").Process(target=attachAndClose, args=(self.ring.name,))
+        process.start()
+        process.join(timeout=30)
+        self.assertEqual(process.exitcode, 0)
+        reader_ring = FrameRing(name=self.ring.name, create=False)
+        self.assertEqual(reader_ring.slots, 4)
+        reader_ring.close()
+        self.assertIs(resource_tracker.register, register)
+
+    def test_read_timeout_without_new_frame(self):
+        reader = self.ring.reader()
+        self.assertIsNone(reader.read_next(timeout=0.01))
+
+    def test_slow_reader_skips_ahead(self):
+        reader = self.ring.reader()
+        for value in range(10):
+            self.ring.write(createRawImageChunk(8, 8, value))
+        frame = reader.read_next(timeout=1)
+        self.assertEqual(frame.sequence, 10)
+        self.assertTrue(np.all(frame.images[0][1] == 9))
+        self.assertEqual(reader.skipped_frames, 9)
+        self.assertIsNone(reader.read_next(timeout=0.01))
+
+    def test_overwritten_frame_is_invalid(self):
+        reader = self.ring.reader()
+        self.ring.write(createRawImageChunk(8, 8, 1))
+        frame = reader.read_next(timeout=1)
+        for value in range(4):
+            self.ring.write(createRawImageChunk(8, 8, value))
+        self.assertFalse(reader.is_valid(frame))
+
+    def test_frame_too_large(self):
+        with self.assertRaises(ValueError):
+            self.ring.write(bytes(64 * 1024 + 1))
@@ -0,0 +1,183 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from source.rpc.heartbeat import HeartbeatScheduler, getHeartbeatScheduler, closeHeartbeatScheduler
+from source.rpc.proxy import SessionProxy
+from tests.utils import *
+import threading
+import time
+import warnings
+
+
+class FakeSession(object):
+    def __init__(self, name, interval, delay=0.0, fail=0):
+        self.baseURL = name
+        self.interval = interval
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.timeouts = []
+        self.finished = 0
+
+    def doAutoHeartbeat(self, timeout=None):
+        self.calls.append(time.monotonic())
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        self.finished += 1
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("device not reachable")
+        return self.interval
+
+
+class TestHeartbeatScheduler(TestCase):
+
+    def setUp(self) -> None:
+        self.scheduler = HeartbeatScheduler(lead=0.1, batchWindow=0.05, retryInterval=0.05, maxWorkers=2)
+
+    def tearDown(self) -> None:
+        self.scheduler.close()
+
+    def test_many_sessions_constant_threads(self):
+        sessions = [FakeSession("session_{}".format(i), interval=0.3) for i in range(50)]
+        threadsBefore = threading.active_count()
+        entries = [self.scheduler.register(session, session.interval) for session in sessions]
+        time.sleep(0.7)
+        # scheduler thread and worker threads only, independent of the number of sessions
+        self.assertLessEqual(threading.active_count() - threadsBefore, 1 + self.scheduler.maxWorkers)
+        for entry in entries:
+            self.scheduler.unregister(entry)
+        for session in sessions:
+            self.assertGreaterEqual(len(session.calls), 2)
+        self.assertEqual(self.scheduler.statistics["sessions"], 0)
+        self.assertGreaterEqual(self.scheduler.statistics["sent"], 100)
+
+    def test_deadline_order(self):
+        slow = FakeSession("slow", interval=0.8)
+        fast = FakeSession("fast", interval=0.3)
+        slowEntry = self.scheduler.register(slow, slow.interval)
+        fastEntry = self.scheduler.register(fast, fast.interval)
+        time.sleep(0.5)
+        self.scheduler.unregister(slowEntry)
+        self.scheduler.unregister(fastEntry)
+        self.assertEqual(len(slow.calls), 0)
+        self.assertGreaterEqual(len(fast.calls), 1)
+
+    def test_unregister_stops_heartbeats(self):
+        session = FakeSession("session", interval=0.2)
+        entry = self.scheduler.register(session, session.interval)
+        time.sleep(0.35)
+        self.scheduler.unregister(entry)
+        calls = len(session.calls)
+        self.assertGreaterEqual(calls, 1)
+        time.sleep(0.4)
+        self.assertEqual(len(session.calls), calls)
+        self.assertTrue(entry.cancelled)
+
+    def test_unregister_waits_for_running_heartbeat(self):
+        session = FakeSession("session", interval=0.2, delay=0.3)
+        entry = self.scheduler.register(session, session.interval)
+        time.sleep(0.15)
+        self.assertEqual(len(session.calls), 1)
+        self.scheduler.unregister(entry)
+        # the heartbeat was finished before unregister() returned
+        self.assertEqual(session.finished, 1)
+        time.sleep(0.3)
+        self.assertEqual(len(session.calls), 1)
+
+    def test_heartbeat_timeout_shorter_than_lead(self):
+        scheduler = HeartbeatScheduler(lead=0.2, batchWindow=0.0)
+        session = FakeSession("session", interval=0.5)
+        entry = scheduler.register(session, session.interval)
+        time.sleep(0.4)
+        scheduler.close()
+        self.assertTrue(session.timeouts)
+        self.assertTrue(all(abs(timeout - 0.16) < 1e-9 for timeout in session.timeouts))
+        self.assertTrue(entry.cancelled)
+
+    def test_unreachable_device_does_not_delay_other_sessions(self):
+        scheduler = HeartbeatScheduler(lead=0.3, batchWindow=0.05, retryInterval=0.5, maxWorkers=2)
+        # the heartbeat of the unreachable device fails after the heartbeat timeout
+        dead = FakeSession("dead", interval=0.6, delay=0.24, fail=100)
+        healthy = FakeSession("healthy", interval=0.6)
+        threadsBefore = threading.active_count()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            scheduler.register(dead, dead.interval)
+            entry = scheduler.register(healthy, healthy.interval)
+            time.sleep(1.0)
+            self.assertLessEqual(threading.active_count() - threadsBefore, 1 + scheduler.maxWorkers)
+            scheduler.close()
+        self.assertGreaterEqual(entry.sent, 2)
+        self.assertEqual(entry.missed, 0)
+
+    def test_close(self):
+        session = FakeSession("session", interval=0.2)
+        threadsBefore = threading.active_count()
+        self.scheduler.register(session, session.interval)
+        time.sleep(0.3)
+        self.scheduler.close()
+        calls = len(session.calls)
+        self.assertGreaterEqual(calls, 1)
+        self.assertEqual(threading.active_count(), threadsBefore)
+        time.sleep(0.3)
+        self.assertEqual(len(session.calls), calls)
+        with self.assertRaises(RuntimeError):
+            self.scheduler.register(session, session.interval)
+
+    def test_close_shared_scheduler(self):
+        scheduler = getHeartbeatScheduler()
+        self.assertIs(getHeartbeatScheduler(), scheduler)
+        closeHeartbeatScheduler()
+        self.assertIsNot(getHeartbeatScheduler(), scheduler)
+
+    def test_failed_heartbeat_is_repeated(self):
+        session = FakeSession("session", interval=0.5, fail=2)
+        # retries within the lead time keep the session alive
+        scheduler = HeartbeatScheduler(lead=0.3, batchWindow=0.0, retryInterval=0.05, maxWorkers=1)
+        entry = scheduler.register(session, session.interval)
+        time.sleep(0.4)
+        scheduler.close()
+        self.assertEqual(scheduler.statistics["failed"], 2)
+        self.assertGreaterEqual(entry.sent, 1)
+        self.assertIsNone(entry.error)
+        self.assertEqual(entry.missed, 0)
+
+    def test_missed_deadline(self):
+        # the first heartbeat is sent after the session expired
+        session = FakeSession("session", interval=0.5)
+        scheduler = HeartbeatScheduler(lead=-0.1, batchWindow=0.0, maxWorkers=1)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            entry = scheduler.register(session, 0.05)
+            time.sleep(0.3)
+            scheduler.close()
+        self.assertEqual(entry.missed, 1)
+        self.assertEqual(scheduler.statistics["missed"], 1)
+        self.assertTrue(any(issubclass(w.category, ResourceWarning) for w in caught))
+
+
+class TestSessionAutoHeartbeat(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        self.scheduler = HeartbeatScheduler(lead=0.1, batchWindow=0.05, maxWorkers=1)
+
+    def tearDown(self) -> None:
+        self.scheduler.close()
+        self.server.close()
+
+    def test_session_uses_scheduler(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            url = device.mainURL + "session_" + "0" * 32 + "/"
+            session = SessionProxy(url=url, device=device, autoHeartbeatInterval=0.3,
+                                   heartbeatScheduler=self.scheduler)
+            self.assertEqual(self.scheduler.statistics["sessions"], 1)
+            time.sleep(0.5)
+            session.cancelSession()
+            self.assertIsNone(session.autoHeartbeatEntry)
+            self.assertEqual(self.scheduler.statistics["sessions"], 0)
+            heartbeats = self.server.heartbeats
+            # the first heartbeat is sent by the constructor
+            self.assertGreaterEqual(heartbeats, 2)
+            time.sleep(0.4)
+            self.assertEqual(self.server.heartbeats, heartbeats)
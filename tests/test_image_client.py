@@ -0,0 +1,115 @@
+from unittest import TestCase
+from source import ImageClient
+from source.static.configs import images_config
+from tests.utils import *
+import numpy as np
+import socket
+import time
+
+
+class TestImageClient(TestCase):
+
+    def test_images_config_with_all_formats(self):
+        self.assertEqual(ImageClient._images_config(), images_config)
+
+    def test_images_config_with_selected_format(self):
+        config = ImageClient._images_config(image_formats=["raw"])
+        self.assertEqual([e["id"] for e in config["elements"][-1]["elements"]], ["raw_image"])
+        # the default configuration must not be modified
+        self.assertEqual([e["id"] for e in images_config["elements"][-1]["elements"]],
+                         ["jpeg_image", "raw_image"])
+
+    def test_images_config_with_invalid_format(self):
+        with self.assertRaises(ValueError):
+            ImageClient._images_config(image_formats=["png"])
+        with self.assertRaises(ValueError):
+            ImageClient._images_config(image_formats=[])
+
+    def test_deserialize_selected_image_chunks(self):
+        data = createRawImageChunk(16, 8, 1) + createRawImageChunk(16, 8, 2) + createRawImageChunk(16, 8, 3)
+        result = ImageClient._deserialize_image_chunk(data=data, indices={0, 2})
+        self.assertEqual(sorted(result.keys()), [0, 2])
+        self.assertTrue(np.all(result[0][1] == 1))
+        self.assertTrue(np.all(result[2][1] == 3))
+        result = ImageClient._deserialize_image_chunk(data=data)
+        self.assertEqual(sorted(result.keys()), [0, 1, 2])
+
+    def test_deserialize_selected_images_of_both_formats(self):
+        # JPEG blob and raw blob with one chunk per image ID each
+        data = createJpegImageChunk(16, 8, 10) + createJpegImageChunk(16, 8, 200) + \
+            createRawImageChunk(16, 8, 1) + createRawImageChunk(16, 8, 2)
+        result = ImageClient._deserialize_image_chunk(data=data, indices={1}, images=2)
+        self.assertEqual(sorted(result.keys()), [1, 3])
+        self.assertTrue(abs(int(result[1][1].mean()) - 200) <= 2)
+        self.assertTrue(np.all(result[3][1] == 2))
+        # e.g. a filtered image format: the chunks do not match the image IDs
+        with self.assertRaises(ValueError):
+            ImageClient._deserialize_image_chunk(data=data[:len(data) - 64 - 16 * 8], indices={1}, images=2)
+
+    def test_deserialize_with_preview_scale(self):
+        data = createJpegImageChunk(320, 240, 100) + createRawImageChunk(320, 240, 50)
+        result = ImageClient._deserialize_image_chunk(data=data)
+        self.assertEqual(result[0][1].shape, (240, 320))
+        self.assertEqual(result[1][1].shape, (240, 320))
+        result = ImageClient._deserialize_image_chunk(data=data, scale=4)
+        self.assertEqual(result[0][1].shape, (60, 80))
+        self.assertTrue(abs(int(result[0][1].mean()) - 100) <= 2)
+        self.assertEqual(result[1][1].shape, (60, 80))
+        self.assertTrue(np.all(result[1][1] == 50))
+        with self.assertRaises(ValueError):
+            ImageClient._deserialize_image_chunk(data=data, scale=3)
+
+    def test_read_next_frames_with_fake_device(self):
+        server = FakePCICServer(image_ids=("1", "2"))
+        # the first frame is used for reading the image IDs
+        for value in range(0, 6, 2):
+            server.frames.put(createRawImageChunk(16, 8, value) + createRawImageChunk(16, 8, value + 1))
+        with ImageClient("127.0.0.1", server.port, image_ids=[2]) as image_client:
+            self.assertEqual(image_client.image_IDs, ["2"])
+            self.assertEqual(image_client.number_images, 1)
+            self.assertTrue(np.all(image_client.frames[0] == 3))
+            image_client.read_next_frames()
+            self.assertEqual(image_client.frame_sequence, 2)
+            self.assertTrue(np.all(image_client.frames[0] == 5))
+        server.close()
+
+    def test_latest_frame_mode_drops_stale_frames(self):
+        server = FakePCICServer()
+        server.frames.put(createRawImageChunk(16, 8, 0))
+        server.frames.put(createRawImageChunk(16, 8, 0))
+        with ImageClient("127.0.0.1", server.port, latest_frame=True) as image_client:
+            self.assertTrue(image_client.latest_frame_mode)
+            self.assertEqual(image_client.frame_sequence, 1)
+            for value in range(1, 6):
+                server.frames.put(createRawImageChunk(16, 8, value))
+            deadline = time.monotonic() + 5
+            while image_client.dropped_frames < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            image_client.read_next_frames(timeout=5)
+            self.assertEqual(image_client.dropped_frames, 4)
+            self.assertEqual(image_client.frame_sequence, 6)
+            self.assertTrue(np.all(image_client.frames[0] == 5))
+            # no newer frame available
+            image_client.read_next_frames(block=False)
+            self.assertEqual(image_client.frame_sequence, 6)
+            image_client.read_next_frames(timeout=0.01)
+            self.assertEqual(image_client.frame_sequence, 6)
+        self.assertFalse(image_client.latest_frame_mode)
+        server.close()
+
+    def test_latest_frame_mode_timeout_within_frame(self):
+        server = FakePCICServer()
+        server.frames.put(createRawImageChunk(16, 8, 0))
+        server.frames.put(createRawImageChunk(16, 8, 0))
+        with ImageClient("127.0.0.1", server.port, timeout=0.3, latest_frame=True) as image_client:
+            # no timeout error while waiting for the next frame
+            time.sleep(0.5)
+            server.frames.put(createRawImageChunk(16, 8, 1))
+            image_client.read_next_frames(timeout=5)
+            self.assertTrue(np.all(image_client.frames[0] == 1))
+            # the device stops sending in the middle of a frame
+            server.frames.put(("raw", b"0000L000001000\r\n0000star;1;stop"))
+            with self.assertRaises(socket.timeout):
+                image_client.read_next_frames(timeout=5)
+        server.close()
+
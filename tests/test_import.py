@@ -0,0 +1,36 @@
+from unittest import TestCase
+import subprocess
+import statistics
+import sys
+import json
+import os
+
+HEAVY_MODULES = ["numpy", "matplotlib", "PIL"]
+
+IMPORT_SCRIPT = """
+import time, sys, json
+start = time.perf_counter()
+import %s
+duration = time.perf_counter() - start
+print(json.dumps({"duration": duration, "modules": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def measureImport(modules="source"):
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT % (modules, HEAVY_MODULES)], cwd=cwd,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class TestImport(TestCase):
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        result = measureImport()
+        self.assertEqual(result["modules"], [])
+
+    def test_import_time(self):
+        # relative to the heavy dependencies, so the test does not depend on the speed of the machine
+        package = statistics.median(measureImport()["duration"] for _ in range(5))
+        heavy = statistics.median(measureImport(", ".join(HEAVY_MODULES))["duration"] for _ in range(5))
+        self.assertLess(package, heavy)
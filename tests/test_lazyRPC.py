@@ -0,0 +1,44 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from source import O2x5xxDevice, O2x5xxDeviceV2, O2x5xxRPCDevice
+from tests.utils import *
+import time
+
+
+class TestLazyRPC(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def test_rpc_created_on_first_use(self):
+        for deviceClass in (O2x5xxDevice, O2x5xxDeviceV2):
+            posts = self.server.posts
+            with deviceClass(address=self.server.address, autoconnect=False) as device:
+                self.assertEqual(self.server.posts, posts)
+                self.assertIsInstance(device.rpc, O2x5xxRPCDevice)
+                self.assertIs(device.rpc, device.rpc)
+                self.assertEqual(device.rpc.getParameter("Name"), "FakeDevice")
+                self.assertGreater(self.server.posts, posts)
+
+    def test_unreachable_rpc_without_use(self):
+        # nothing listens on the port, the device is only used for PCIC
+        with O2x5xxDeviceV2(address="127.0.0.1:1", autoconnect=False, timeout=1) as device:
+            self.assertIsNotNone(device.pcic)
+        self.assertIsNone(device._rpc)
+
+    def test_warmup(self):
+        with O2x5xxDeviceV2(address=self.server.address, autoconnect=False, warmup=True) as device:
+            timeout = time.monotonic() + 5
+            while self.server.posts == 0 and time.monotonic() < timeout:
+                time.sleep(0.01)
+            self.assertGreater(self.server.posts, 0)
+            self.assertEqual(device.rpc.getParameter("Name"), "FakeDevice")
+
+    def test_concurrent_first_use(self):
+        with O2x5xxDevice(address=self.server.address, autoconnect=False) as device:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                clients = list(executor.map(lambda _: device.rpc, range(16)))
+            self.assertEqual(len({id(client) for client in clients}), 1)
@@ -0,0 +1,120 @@
+from unittest import TestCase
+from source import DevicePool, O2x5xxDeviceV2
+from tests.utils import *
+import threading
+import time
+
+
+def waitFor(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestDevicePool(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakePCICDeviceServer()
+        self.pool = DevicePool(port=self.server.port, max_per_device=2, warmup_rpc=False, timeout=2)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.server.close()
+
+    def test_reuse_warm_handle(self):
+        with self.pool.device("127.0.0.1") as device:
+            self.assertIsInstance(device, O2x5xxDeviceV2)
+            self.assertEqual(device.pcic.send_command("t"), b"*")
+            first = device
+        with self.pool.device("127.0.0.1") as device:
+            self.assertIs(device, first)
+            self.assertEqual(device.pcic.send_command("t"), b"*")
+        statistics = self.pool.statistics
+        self.assertEqual((statistics["hits"], statistics["misses"], statistics["checkouts"]), (1, 1, 2))
+        self.assertEqual(statistics["devices"]["127.0.0.1"], {"open": 1, "idle": 1, "hits": 1, "misses": 1})
+        self.assertGreater(statistics["latency_max"], 0)
+        self.assertTrue(waitFor(lambda: self.server.connections == 1))
+
+    def test_max_per_device(self):
+        handles = [self.pool.checkout("127.0.0.1") for _ in range(2)]
+        with self.assertRaises(TimeoutError):
+            self.pool.checkout("127.0.0.1", timeout=0.1)
+        threading.Timer(0.1, self.pool.checkin, args=(handles[0],)).start()
+        self.assertIs(self.pool.checkout("127.0.0.1", timeout=5), handles[0])
+        self.assertTrue(waitFor(lambda: self.server.connections == 2))
+        self.assertGreaterEqual(self.pool.statistics["waits"], 1)
+
+    def test_health_check(self):
+        self.pool.warm("127.0.0.1", count=2)
+        self.assertTrue(waitFor(lambda: self.server.connections == 2))
+        self.server.drop()
+        time.sleep(0.1)
+        with self.pool.device("127.0.0.1") as device:
+            self.assertEqual(device.pcic.send_command("t"), b"*")
+        statistics = self.pool.statistics
+        self.assertEqual(statistics["discarded"], 2)
+        self.assertTrue(waitFor(lambda: self.server.connections == 3))
+
+    def test_idle_eviction(self):
+        pool = DevicePool(port=self.server.port, idle_timeout=0.1, warmup_rpc=False)
+        pool.warm("127.0.0.1")
+        self.assertEqual(pool.evict_idle(), 0)
+        time.sleep(0.2)
+        self.assertEqual(pool.evict_idle(), 1)
+        self.assertEqual(pool.statistics["devices"]["127.0.0.1"]["open"], 0)
+        self.assertTrue(waitFor(lambda: self.server.connections == 1 and self.server.open_connections == 0))
+
+    def test_discard_after_connection_error(self):
+        with self.assertRaises(ConnectionError):
+            with self.pool.device("127.0.0.1"):
+                raise ConnectionResetError()
+        statistics = self.pool.statistics
+        self.assertEqual(statistics["discarded"], 1)
+        self.assertEqual(statistics["devices"]["127.0.0.1"]["open"], 0)
+
+    def test_device_connection_limit(self):
+        for reject in ("error", "close"):
+            with self.subTest(reject=reject):
+                server = FakePCICDeviceServer(max_connections=1, reject=reject)
+                pool = DevicePool(port=server.port, max_per_device=4, warmup_rpc=False, timeout=2)
+                try:
+                    handle = pool.checkout("127.0.0.1")
+                    threading.Timer(0.1, pool.checkin, args=(handle,)).start()
+                    # the pool waits for its own handle instead of opening more connections than the device accepts
+                    self.assertIs(pool.checkout("127.0.0.1", timeout=5), handle)
+                    pool.checkin(handle)
+                    with self.assertRaises(TimeoutError):
+                        with pool.device("127.0.0.1"):
+                            pool.checkout("127.0.0.1", timeout=0.1)
+                    # the rejected connections were closed
+                    self.assertTrue(waitFor(lambda: server.open_connections == 0))
+                finally:
+                    pool.close()
+                    server.close()
+
+    def test_device_connection_limit_expires(self):
+        server = FakePCICDeviceServer(max_connections=1)
+        pool = DevicePool(port=server.port, max_per_device=4, warmup_rpc=False, timeout=2)
+        pool.limit_retry = 0.2
+        try:
+            first = pool.checkout("127.0.0.1")
+            with self.assertRaises(TimeoutError):
+                pool.checkout("127.0.0.1", timeout=0.1)
+            # another client released its connection
+            server.max_connections = 2
+            time.sleep(0.2)
+            # the device is asked again for a connection after limit_retry
+            second = pool.checkout("127.0.0.1", timeout=0.1)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.pcic.send_command("t"), b"*")
+        finally:
+            pool.close()
+            server.close()
+
+    def test_unreachable_device(self):
+        port = self.server.port
+        self.server.close()
+        # a refused first connection means the device is not reachable, not that its limit is reached
+        with self.assertRaises(ConnectionRefusedError):
+            DevicePool(port=port, warmup_rpc=False).checkout("127.0.0.1")
@@ -0,0 +1,71 @@
+from unittest import TestCase
+from concurrent.futures import CancelledError
+from source import O2x5xxRPCDevice
+from source.rpc.progress import ProgressWaiter, waitForProgress
+from tests.utils import *
+import threading
+import time
+
+
+class TestProgressWaiter(TestCase):
+
+    def test_short_operation_finishes_fast(self):
+        values = iter([0.0, 0.5, 1.0])
+        start = time.monotonic()
+        self.assertEqual(waitForProgress(lambda: next(values)), 1.0)
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def test_interval_backoff(self):
+        values = iter([0.0] * 8 + [1.0])
+        waiter = ProgressWaiter(lambda: next(values), minInterval=0.001, maxInterval=0.004, backoff=2.0)
+        waiter.wait()
+        self.assertEqual(waiter.polls, 9)
+
+    def test_callback_on_new_progress(self):
+        values = iter([0.0, 0.0, 0.5, 0.5, 1.0])
+        reported = []
+        waitForProgress(lambda: next(values), callback=reported.append)
+        self.assertEqual(reported, [0.0, 0.5, 1.0])
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            waitForProgress(lambda: 0.1, timeout=0.05)
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        future = ProgressWaiter(lambda: 0.1, cancel=cancel).submit()
+        cancel.set()
+        with self.assertRaises(CancelledError):
+            future.result(timeout=2)
+
+
+class TestImagerProgress(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        self.progress = iter([0.0, 0.3, 1.0])
+        self.server.rpc_imager_startCalculateExposureTime = lambda data: None
+        self.server.rpc_imager_getProgressCalculateExposureTime = lambda: next(self.progress)
+        self.server.rpc_imager_startCalculateAutofocus = lambda data: None
+        self.server.rpc_imager_getProgressCalculateAutofocus = lambda: 0.5
+        self.server.rpc_imager_stopCalculateAutofocus = lambda: None
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def test_exposure_time_in_background(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            imager = openFakeApplication(device, imager_index=1)
+            reported = []
+            start = time.monotonic()
+            future = imager.startCalculateExposureTime(wait=False, callback=reported.append)
+            future.result(timeout=5)
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertEqual(reported, [0.0, 0.3, 1.0])
+
+    def test_autofocus_is_stopped_on_timeout(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            imager = openFakeApplication(device, imager_index=1)
+            with self.assertRaises(TimeoutError):
+                imager.startCalculateAutofocus(timeout=0.1)
+            self.assertEqual(self.server.requests[-1][1], "stopCalculateAutofocus")
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from tests.utils import *
+
+
+class TestImageQualityCheckRequests(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        self.device = O2x5xxRPCDevice(address=self.server.address)
+        self.imager = openFakeApplication(self.device, imager_index=1)
+
+    def tearDown(self) -> None:
+        self.device.__exit__(None, None, None)
+        self.server.close()
+
+    def calls(self, method):
+        return [r for r in self.server.requests if r[1] == method]
+
+    def test_disabled(self):
+        imageQualityCheck = self.imager.imageQualityCheck
+        self.assertFalse(imageQualityCheck.enabled)
+        self.assertIsNone(imageQualityCheck.sharpness_thresholdMinMax)
+        self.assertIsNone(imageQualityCheck.thresholdsMinMax)
+        with self.assertRaises(SystemError):
+            imageQualityCheck.sharpness_thresholdMinMax = {"min": 1000, "max": 10000}
+
+    def test_one_config_read_per_operation(self):
+        imageQualityCheck = self.imager.imageQualityCheck
+        imageQualityCheck.enabled = True
+        reads = len(self.calls("getAllParameters"))
+        self.assertEqual(imageQualityCheck.meanBrightness_thresholdMinMax, {"min": 0, "max": 255})
+        self.assertEqual(len(self.calls("getAllParameters")), reads + 1)
+        imageQualityCheck.sharpness_thresholdMinMax = {"min": 1000, "max": 10000}
+        self.assertEqual(len(self.calls("getAllParameters")), reads + 2)
+        self.assertEqual(imageQualityCheck.sharpness_thresholdMinMax, {"min": 1000, "max": 10000})
+
+    def test_schema_downloaded_once(self):
+        imageQualityCheck = self.imager.imageQualityCheck
+        imageQualityCheck.enabled = True
+        imageQualityCheck.sharpness_thresholdMinMax = {"min": 1000, "max": 10000}
+        imageQualityCheck.meanBrightness_thresholdMinMax = {"min": 10, "max": 220}
+        with self.assertRaises(ValueError):
+            imageQualityCheck.meanBrightness_thresholdMinMax = {"min": 0, "max": 256}
+        with self.assertRaises(ValueError):
+            imageQualityCheck.underexposedArea_thresholdMinMax = {"min": 90, "max": 10}
+        self.assertEqual(self.server.gets.count("/schema/ParamImageFeatures.json"), 1)
+
+    def test_combined_setter(self):
+        imageQualityCheck = self.imager.imageQualityCheck
+        imageQualityCheck.enabled = True
+        writes = len(self.calls("setParameter"))
+        imageQualityCheck.setThresholdsMinMax(sharpness={"min": 1000, "max": 10000},
+                                              meanBrightness={"min": 10, "max": 220},
+                                              underexposedArea={"min": 5, "max": 50},
+                                              overexposedArea={"min": 6, "max": 60})
+        self.assertEqual(len(self.calls("setParameter")), writes + 1)
+        self.assertEqual(imageQualityCheck.thresholdsMinMax,
+                         {"sharpness": {"min": 1000, "max": 10000}, "meanBrightness": {"min": 10, "max": 220},
+                          "underexposedArea": {"min": 5, "max": 50}, "overexposedArea": {"min": 6, "max": 60}})
+        # nothing is written if one of the values is invalid
+        with self.assertRaises(ValueError):
+            imageQualityCheck.setThresholdsMinMax(sharpness={"min": 2000, "max": 20000},
+                                                  overexposedArea={"min": 0, "max": 101})
+        self.assertEqual(len(self.calls("setParameter")), writes + 1)
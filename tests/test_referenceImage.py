@@ -0,0 +1,68 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from source.rpc.utils import LazyImage
+from tests.utils import *
+import numpy as np
+
+
+class TestReferenceImage(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        self.server.referenceImages = {"1": createJpeg(64, 48, 10), "2": createJpeg(32, 24, 200)}
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def imageRequests(self):
+        return [r for r in self.server.requests if r[1] == "getReferenceImage"]
+
+    def test_datatypes(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            self.assertEqual(device.getReferenceImage(datatype="bytes"), self.server.referenceImages["1"])
+            image = device.getReferenceImage(datatype="lazy")
+            self.assertIsInstance(image, LazyImage)
+            self.assertFalse(image.decoded)
+            self.assertIsInstance(image.array, np.ndarray)
+            self.assertEqual(image.array.shape, (48, 64))
+            self.assertEqual(device.getReferenceImage().shape, (48, 64))
+            with self.assertRaises(ValueError):
+                device.getReferenceImage(datatype="png")
+
+    def test_cached_per_active_application(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            first = device.getReferenceImage(cached=True)
+            self.assertIs(device.getReferenceImage(cached=True), first)
+            self.assertEqual(len(self.imageRequests()), 1)
+            device.switchApplication(2)
+            self.assertEqual(device.getReferenceImage(cached=True).shape, (24, 32))
+            self.assertEqual(len(self.imageRequests()), 2)
+            # application changed by another client
+            self.server.parameters["main"]["ActiveApplication"] = "1"
+            self.assertEqual(device.getReferenceImage(cached=True).shape, (48, 64))
+            self.assertEqual(len(self.imageRequests()), 3)
+            device.getReferenceImage()
+            self.assertEqual(len(self.imageRequests()), 4)
+            device.clearReferenceImageCache()
+            device.getReferenceImage(cached=True)
+            self.assertEqual(len(self.imageRequests()), 5)
+
+    def test_uncached_does_not_query_active_application(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            requests = len(self.server.requests)
+            device.getReferenceImage()
+            self.assertEqual([r[1] for r in self.server.requests[requests:]], ["getReferenceImage"])
+            device.getReferenceImage(cached=True)
+            self.assertEqual(len(self.imageRequests()), 1)
+
+    def test_changed_reference_image(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            self.assertEqual(device.getReferenceImage(datatype="bytes", cached=True), self.server.referenceImages["1"])
+            # the same application is taught again
+            self.server.referenceImages["1"] = createJpeg(16, 12, 99)
+            self.assertEqual(device.getReferenceImage(datatype="bytes"), self.server.referenceImages["1"])
+            self.server.referenceImages["1"] = createJpeg(20, 10, 50)
+            application = openFakeApplication(device)
+            application.save()
+            self.assertEqual(device.getReferenceImage(datatype="bytes", cached=True),
+                             self.server.referenceImages["1"])
@@ -134,6 +134,9 @@ class TestRPC_MainAPI(TestCase):
         with O2x5xxRPCDevice(deviceAddress) as rpc:
             result = rpc.getReferenceImage()
             self.assertIsInstance(result, np.ndarray)
+            result = rpc.getReferenceImage(datatype="bytes")
+            self.assertIsInstance(result, bytes)
+            self.assertEqual(result[:2], b"\xff\xd8")
 
     def test_isConfigurationDone(self):
         with O2x5xxRPCDevice(deviceAddress) as rpc:
@@ -0,0 +1,130 @@
+from unittest import TestCase
+from source.rpc.simulation import SimulationPipeline, prepareSimulationImage
+from tests.utils import *
+from PIL import Image
+import io
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+
+
+class FakePCIC(object):
+    def __init__(self):
+        self.output = queue.Queue()
+
+    def read_next_answer(self):
+        try:
+            return self.output.get(timeout=0.05)
+        except queue.Empty:
+            raise socket.timeout()
+
+
+class FakeSimulation(object):
+    def __init__(self, pcic=None, skip=(), delay=None):
+        self.pcic = pcic
+        self.skip = skip
+        # {index: seconds} delays the output of a sequence
+        self.delay = delay or {}
+        self.sequences = []
+
+    def processImageSequence(self, image_sequence, force_trigger):
+        index = len(self.sequences)
+        self.sequences.append([image.data for image in image_sequence])
+        if self.pcic is None or index in self.skip:
+            return
+        output = (b"0000", "result_{}".format(index).encode())
+        if index in self.delay:
+            threading.Timer(self.delay[index], self.pcic.output.put, args=(output,)).start()
+        else:
+            self.pcic.output.put(output)
+
+
+class TestSimulationPipeline(TestCase):
+
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.mkdtemp()
+        self.paths = []
+        for index in range(10):
+            path = os.path.join(self.tmpDir, "image_{}.jpg".format(index))
+            with open(path, "wb") as f:
+                f.write(createJpeg(1280, 960, index))
+            self.paths.append(path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpDir)
+
+    def test_prepare_image(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), (10, 200, 30)).save(buffer, format="PNG")
+        data = prepareSimulationImage(buffer.getvalue())
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual((image.format, image.mode, image.size), ("JPEG", "L", (1280, 960)))
+        # images in the required format are sent unchanged
+        with open(self.paths[0], "rb") as f:
+            self.assertEqual(prepareSimulationImage(self.paths[0]), f.read())
+
+    def test_results_in_order(self):
+        pcic = FakePCIC()
+        simulation = FakeSimulation(pcic=pcic)
+        results = []
+        pipeline = SimulationPipeline(simulation, self.paths, sequenceLength=2, pcic=pcic, workers=3, prefetch=2)
+        statistics = pipeline.run(callback=results.append)
+        self.assertEqual(len(simulation.sequences), 5)
+        self.assertEqual([result.images for result in results],
+                         [self.paths[i:i + 2] for i in range(0, 10, 2)])
+        self.assertEqual([result.output for result in results], [b"result_0", b"result_1", b"result_2",
+                                                                 b"result_3", b"result_4"])
+        self.assertTrue(all(result.latency >= 0 for result in results))
+        with open(self.paths[3], "rb") as f:
+            self.assertEqual(simulation.sequences[1][1], f.read())
+        self.assertEqual((statistics["images"], statistics["sequences"], statistics["results"]), (10, 5, 5))
+        self.assertEqual(statistics["missing"], 0)
+        self.assertGreater(statistics["images_per_second"], 0)
+
+    def test_lazy_reading(self):
+        read = []
+
+        def images():
+            for path in self.paths:
+                read.append(path)
+                yield path
+
+        simulation = FakeSimulation()
+        sent = []
+
+        def check(result):
+            sent.append(result)
+            # only the prefetched sequences are read in advance
+            self.assertLessEqual(len(read), len(sent) + 2)
+
+        SimulationPipeline(simulation, images(), prefetch=2).run(callback=check)
+        self.assertEqual(len(sent), 10)
+        self.assertIsNone(sent[0].output)
+
+    def test_missing_result(self):
+        pcic = FakePCIC()
+        results = []
+        pipeline = SimulationPipeline(FakeSimulation(pcic=pcic, skip=(4,)), self.paths[:5], pcic=pcic,
+                                      resultTimeout=0.2)
+        statistics = pipeline.run(callback=results.append)
+        self.assertEqual(statistics["missing"], 1)
+        self.assertEqual(statistics["results"], 4)
+        self.assertIsNone(results[-1].output)
+
+    def test_late_result_is_discarded(self):
+        pcic = FakePCIC()
+        results = []
+        pipeline = SimulationPipeline(FakeSimulation(pcic=pcic, delay={1: 0.3}), self.paths[:5], pcic=pcic,
+                                      maxPending=1, resultTimeout=0.2)
+        statistics = pipeline.run(callback=results.append)
+        # the late output of sequence 1 is not assigned to a later sequence
+        self.assertEqual([result.output for result in results], [b"result_0", None, b"result_2", b"result_3",
+                                                                 b"result_4"])
+        self.assertEqual((statistics["missing"], statistics["discarded"], statistics["resyncs"]), (1, 1, 1))
+
+    def test_incomplete_sequence(self):
+        with self.assertRaises(ValueError):
+            SimulationPipeline(FakeSimulation(), self.paths[:3], sequenceLength=2).run()
@@ -0,0 +1,90 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from tests.utils import *
+import base64
+import os
+import shutil
+import tempfile
+import xmlrpc.client
+
+
+class TestConfigStreaming(TestCase):
+    configFile = os.path.join(os.path.dirname(__file__), "deviceConfig", "Unittest8PolDeviceConfig.o2d5xxcfg")
+    applicationFile = os.path.join(os.path.dirname(__file__), "deviceConfig", "UnittestApplicationImport.o2d5xxapp")
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+        with open(self.configFile, "rb") as f:
+            self.server.exportData = f.read()
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        self.server.close()
+        shutil.rmtree(self.tmpDir)
+
+    def test_export_config_to_file(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            path = session.exportConfigToFile(os.path.join(self.tmpDir, "export"))
+            self.assertTrue(path.endswith(".o2d5xxcfg"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), self.server.exportData)
+            self.assertFalse(os.path.exists(path + ".part"))
+            self.assertEqual(session.exportConfig(), bytearray(self.server.exportData))
+
+    def test_export_application_to_file_in_background(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            future = session.exportApplicationToFile(1, os.path.join(self.tmpDir, "app"), wait=False)
+            path = future.result(timeout=10)
+            self.assertTrue(path.endswith(".o2d5xxapp"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), self.server.exportData)
+
+    def test_import_config_from_file(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            session.importConfigFromFile(self.configFile, global_settings=True, network_settings=True,
+                                         applications=True)
+        self.assertEqual([flags for _, flags in self.server.imported], [0x0001, 0x0002, 0x0010])
+        for data, _ in self.server.imported:
+            self.assertEqual(data, self.server.exportData)
+
+    def test_import_application_from_file(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            self.assertEqual(session.importApplicationFromFile(self.applicationFile), 2)
+        with open(self.applicationFile, "rb") as f:
+            self.assertEqual(self.server.imported, [(f.read(), None)])
+
+    def test_failed_export_leaves_no_file(self):
+        def fail():
+            raise xmlrpc.client.Fault(101014, "Export failed")
+        self.server.rpc_session_exportConfig = fail
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            with self.assertRaises(xmlrpc.client.Fault):
+                session.exportConfigToFile(os.path.join(self.tmpDir, "export.o2d5xxcfg"))
+            self.assertEqual(os.listdir(self.tmpDir), [])
+            # the connection is still usable after the fault
+            self.assertEqual(device.getParameter("Name"), "FakeDevice")
+
+    def test_read_config_file(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            with open(self.configFile, "rb") as f:
+                self.assertEqual(session.readDeviceConfigFile(self.configFile), base64.b64encode(f.read()).decode())
+
+    def test_stale_keep_alive_connection_is_repeated(self):
+        with O2x5xxRPCDevice(address=self.server.address) as device:
+            session = openFakeSession(device)
+            # the device closes the idle keep-alive connections
+            self.server.dropConnections()
+            path = session.exportConfigToFile(os.path.join(self.tmpDir, "export"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), self.server.exportData)
+            self.server.dropConnections()
+            session.importConfigFromFile(self.configFile)
+        self.assertTrue(self.server.imported)
+        for data, _ in self.server.imported:
+            self.assertEqual(data, self.server.exportData)
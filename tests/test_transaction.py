@@ -0,0 +1,123 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from tests.utils import *
+import xmlrpc.client
+import warnings
+
+
+class TestTransaction(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer(multicall=True)
+        self.device = O2x5xxRPCDevice(address=self.server.address)
+
+    def tearDown(self) -> None:
+        self.device.__exit__(None, None, None)
+        self.server.close()
+
+    def calls(self, method):
+        return [r for r in self.server.requests if r[1] == method]
+
+    def test_application_transaction_waits_once(self):
+        application = openFakeApplication(self.device)
+        with application.transaction() as transaction:
+            application.Name = "Line 2"
+            application.TriggerMode = 2
+            application.FrameRate = 20.0
+            application.Rotate180Degree = True
+            self.assertEqual(len(transaction), 4)
+            self.assertEqual(self.calls("setParameter"), [])
+        parameters = self.server.parameters["application"]
+        self.assertEqual(parameters["Name"], "Line 2")
+        self.assertEqual(parameters["TriggerMode"], "2")
+        self.assertEqual(parameters["FrameRate"], "20.0")
+        self.assertEqual(parameters["Rotate180Degree"], "true")
+        self.assertEqual(len(self.calls("waitForConfigurationDone")), 1)
+
+    def test_imager_transaction(self):
+        imager = openFakeApplication(self.device, imager_index=1)
+        with self.device.imager.transaction():
+            self.device.imager.ExposureTime = 1000
+            self.device.imager.AnalogGainFactor = 4
+            self.device.imager.FilterInvert = True
+        self.assertEqual(self.server.parameters["imager"]["ExposureTime"], "1000")
+        self.assertEqual(self.server.parameters["imager"]["AnalogGainFactor"], "4")
+        self.assertEqual(len(self.calls("waitForConfigurationDone")), 1)
+        self.assertIsNone(imager._imagerProxy.transaction)
+
+    def test_validation_error_discards_changes(self):
+        application = openFakeApplication(self.device)
+        with self.assertRaises(ValueError):
+            with application.transaction():
+                application.Name = "Line 2"
+                application.FrameRate = 100.0
+        self.assertEqual(self.server.parameters["application"]["Name"], "New Application")
+        self.assertEqual(self.calls("setParameter"), [])
+
+    def test_rollback_on_failed_write(self):
+        application = openFakeApplication(self.device)
+        with self.assertRaises(xmlrpc.client.Fault):
+            with application.transaction():
+                application.Name = "Line 2"
+                application.TriggerMode = 3
+                application.setParameter("Unknown", 1)
+        parameters = self.server.parameters["application"]
+        self.assertEqual(parameters["Name"], "New Application")
+        self.assertEqual(parameters["TriggerMode"], "1")
+
+    def test_failed_rollback(self):
+        application = openFakeApplication(self.device)
+        application.enableParameterSnapshot()
+        self.assertEqual(application.Name, "New Application")
+
+        def fail():
+            raise xmlrpc.client.Fault(101000, "Configuration failed")
+        self.server.rpc_application_waitForConfigurationDone = fail
+        with self.assertRaises(xmlrpc.client.Fault) as context:
+            with application.transaction():
+                application.Name = "Line 2"
+                application.setParameter("Unknown", 1)
+        self.assertIn("Configuration failed", str(context.exception))
+        self.assertIn("Unknown", str(context.exception.__cause__))
+        self.server.parameters["application"]["Name"] = "Line 3"
+        # the snapshot was invalidated although the rollback failed
+        self.assertEqual(application.Name, "Line 3")
+
+    def test_rollback_after_connection_error(self):
+        application = openFakeApplication(self.device)
+        multicall = xmlrpc.client.MultiCall.__call__
+
+        def lostResponse(self):
+            multicall(self)
+            raise ConnectionResetError("connection reset by peer")
+
+        xmlrpc.client.MultiCall.__call__ = lostResponse
+        try:
+            with self.assertRaises(ConnectionResetError):
+                with application.transaction():
+                    application.Name = "Line 2"
+                    application.TriggerMode = 3
+        finally:
+            xmlrpc.client.MultiCall.__call__ = multicall
+        parameters = self.server.parameters["application"]
+        self.assertEqual(parameters["Name"], "New Application")
+        self.assertEqual(parameters["TriggerMode"], "1")
+
+    def test_validation_deferred_until_commit(self):
+        application = openFakeApplication(self.device)
+        self.server.parameters["application"]["LogicGraph"] = "{}"
+        self.server.rpc_application_validate = lambda: [{"Id": 1, "Text": "invalid"}]
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with application.transaction():
+                application.LogicGraph = '{"nodes": []}'
+                self.assertEqual(self.calls("validate"), [])
+        self.assertEqual(len(self.calls("validate")), 1)
+        self.assertTrue(caught)
+
+    def test_snapshot_is_updated(self):
+        application = openFakeApplication(self.device)
+        application.enableParameterSnapshot()
+        with application.transaction():
+            application.Name = "Line 2"
+        self.assertEqual(application.Name, "Line 2")
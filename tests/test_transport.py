@@ -0,0 +1,74 @@
+from unittest import TestCase
+from source import O2x5xxRPCDevice
+from source.rpc.transport import ConnectionPool, PooledTransport
+from tests.utils import *
+import xmlrpc.client
+import threading
+
+
+class TestConnectionPool(TestCase):
+
+    def setUp(self) -> None:
+        self.server = FakeRPCServer()
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def test_keep_alive_connection_is_reused(self):
+        with ConnectionPool(host=self.server.address, maxsize=2) as pool:
+            proxy = xmlrpc.client.ServerProxy("http://" + self.server.address + FakeRPCServer.API_PATH,
+                                              transport=PooledTransport(pool=pool))
+            for _ in range(20):
+                self.assertEqual(proxy.getParameter("Name"), "FakeDevice")
+            self.assertEqual(self.server.connections, 1)
+            self.assertEqual(pool.statistics["created"], 1)
+            self.assertEqual(pool.statistics["reused"], 19)
+            self.assertEqual(pool.statistics["idle"], 1)
+            self.assertEqual(pool.statistics["inUse"], 0)
+
+    def test_fault_keeps_connection(self):
+        with ConnectionPool(host=self.server.address) as pool:
+            proxy = xmlrpc.client.ServerProxy("http://" + self.server.address + FakeRPCServer.API_PATH,
+                                              transport=PooledTransport(pool=pool))
+            with self.assertRaises(xmlrpc.client.Fault):
+                proxy.getParameter("Unknown")
+            proxy.getParameter("Name")
+            self.assertEqual(self.server.connections, 1)
+            self.assertEqual(pool.statistics["discarded"], 0)
+
+    def test_pool_size_limits_connections(self):
+        self.server.delay = 0.05
+        with ConnectionPool(host=self.server.address, maxsize=2) as pool:
+            transport = PooledTransport(pool=pool)
+            url = "http://" + self.server.address + FakeRPCServer.API_PATH
+            threads = [threading.Thread(target=lambda: xmlrpc.client.ServerProxy(url, transport=transport)
+                                        .getParameter("Name")) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(pool.statistics["created"], 2)
+            self.assertEqual(self.server.connections, 2)
+            self.assertGreater(pool.statistics["waits"], 0)
+
+    def test_server_closing_connections(self):
+        self.server.close()
+        self.server = FakeRPCServer(keep_alive=False)
+        with ConnectionPool(host=self.server.address) as pool:
+            proxy = xmlrpc.client.ServerProxy("http://" + self.server.address + FakeRPCServer.API_PATH,
+                                              transport=PooledTransport(pool=pool))
+            for _ in range(3):
+                self.assertEqual(proxy.getParameter("Name"), "FakeDevice")
+            self.assertEqual(self.server.connections, 3)
+
+    def test_device_proxies_share_pool(self):
+        with O2x5xxRPCDevice(address=self.server.address, pool_size=2) as device:
+            self.assertEqual(device.getParameter("ArticleNumber"), "O2D500")
+            for _ in range(10):
+                device.getAllParameters()
+            self.assertEqual(device.mainProxy.timeout, device.timeout)
+            device.mainProxy.timeout = 3
+            self.assertEqual(device.mainProxy.timeout, 3)
+            self.assertEqual(device.connectionPool.maxsize, 2)
+            self.assertEqual(self.server.connections, 1)
+        self.assertEqual(device.connectionPool.statistics["idle"], 0)
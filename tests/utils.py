@@ -1,4 +1,17 @@
+import io
+import json
 import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+from source.static.formats import ChunkType
+from PIL import Image
 
 
 def getImportSetupByPinLayout(rpc):
@@ -24,3 +37,499 @@ def getImportSetupByPinLayout(rpc):
             "3: M12 - 8 pins A Coded connector (different OUT-numbering then O3D3xx and with IN/OUT switching)\n"
             "4: reserved for CAN-5pin connector (like O3DPxx, O3M or O3R)")
     return result
+
+
+def createRawImageChunk(width, height, value):
+    header = struct.pack('<13i', ChunkType.MONOCHROME_2D_8BIT, 64 + width * height, 64, 3,
+                         width, height, 0, 0, 0, 0, 0, 0, 0)
+    header += bytes(64 - len(header))
+    return header + bytes([value]) * (width * height)
+
+
+def createJpeg(width, height, value):
+    buffer = io.BytesIO()
+    Image.new("L", (width, height), value).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def createJpegImageChunk(width, height, value):
+    data = createJpeg(width, height, value)
+    header = struct.pack('<13i', ChunkType.JPEG_IMAGE, 64 + len(data), 64, 3,
+                         width, height, 0, 0, 0, 0, 0, 0, 0)
+    header += bytes(64 - len(header))
+    return header + data
+
+
+class FakePCICServer(object):
+    """
+    Minimal PCIC server for testing the ImageClient without a device. Every command is acknowledged with "*"
+    and the frames put into the queue are sent as asynchronous results with the given image IDs.
+    Items ("raw", data) are sent unchanged, e.g. for an incomplete frame.
+    """
+
+    def __init__(self, image_ids=("1",)):
+        self.image_ids = image_ids
+        self.commands = []
+        self.frames = queue.Queue()
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _send(self, conn, ticket, body):
+        conn.sendall(ticket + b"L" + str(len(body) + 6).zfill(9).encode() + b"\r\n" + ticket + body + b"\r\n")
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        with conn:
+            reader = conn.makefile("rb")
+            ids = "".join("{};".format(i) for i in self.image_ids).encode()
+            while True:
+                header = reader.read(16)
+                if len(header) < 16:
+                    return
+                command = reader.read(int(header[5:14]))[4:-2]
+                self.commands.append(command)
+                self._send(conn, b"1000", b"*")
+                if command == b"p1":
+                    break
+            while True:
+                data = self.frames.get()
+                if data is None:
+                    return
+                if isinstance(data, tuple):
+                    conn.sendall(data[1])
+                    continue
+                self._send(conn, b"0000", b"star;" + ids + b"stop" + data)
+
+    def close(self):
+        self.frames.put(None)
+        self._thread.join()
+        self._server.close()
+
+
+def openFakeSession(device):
+    from source.rpc.proxy import SessionProxy
+    url = device.mainURL + "session_" + "0" * 32 + "/"
+    setattr(device, "_sessionProxy", SessionProxy(url=url, device=device, autoHeartbeat=False))
+    return device.session
+
+
+def openFakeApplication(device, imager_index=None):
+    from source.rpc.proxy import ApplicationProxy, ImagerProxy
+    url = device.mainURL + "session_" + "0" * 32 + "/edit/application/"
+    setattr(device, "_applicationProxy", ApplicationProxy(url=url, device=device))
+    if imager_index is None:
+        return device.application
+    url += "imager_{0:03d}/".format(imager_index)
+    setattr(device, "_imagerProxy", ImagerProxy(url=url, device=device))
+    return device.imager
+
+
+class FakeRPCServer(object):
+    """
+    Minimal XML-RPC server answering like the main, application and imager objects of a device for testing
+    the RPC client without a device.
+    The requests are routed by URL path to the methods rpc_<object>_<method>, it supports HTTP/1.1 keep-alive,
+    optionally system.multicall and counts the accepted TCP connections and HTTP requests.
+    """
+    API_PATH = "/api/rpc/v1/com.ifm.efector/"
+
+    def __init__(self, keep_alive=True, delay=0.0, multicall=False):
+        self.connections = 0
+        self.posts = 0
+        self.gets = []
+        self.requests = []
+        self.delay = delay
+        # data returned by the session export methods and data received by the session import methods
+        self.exportData = b""
+        # JPEG data of the reference images per application index
+        self.referenceImages = {}
+        self.imported = []
+        self.heartbeats = 0
+        # sockets of the accepted connections for closing them like the device closes idle connections
+        self.sockets = []
+        self.parameters = {
+            "main": {"DeviceType": "1:320", "ArticleNumber": "O2D500", "Name": "FakeDevice", "ActiveApplication": "1"},
+            "application": {"Type": "Camera", "Name": "New Application", "Description": "", "TriggerMode": "1",
+                            "FrameRate": "35", "HWROI": '{"x":0,"y":0,"width":1280,"height":960}',
+                            "Rotate180Degree": "false", "FocusDistance": "0.6", "ImageEvaluationOrder": "1 "},
+            "imager": {"Type": "normal", "Name": "New Imager", "Illumination": "1", "IlluInternalSegments": "15",
+                       "ExposureTime": "5000", "AnalogGainFactor": "2", "FilterType": "0", "FilterStrength": "1",
+                       "FilterInvert": "false", "QualityCheckConfig": ""}}
+        self.limits = {
+            "application": {"TriggerMode": {"min": "1", "max": "9"}, "FrameRate": {"min": "0.0167", "max": "80"},
+                            "FocusDistance": {"min": "0.035", "max": "5"}},
+            "imager": {"Illumination": {"min": "0", "max": "4"}, "ExposureTime": {"min": "67", "max": "15000"},
+                       "AnalogGainFactor": {"values": ["1", "2", "4", "8"]}, "FilterType": {"min": "0", "max": "4"},
+                       "FilterStrength": {"min": "1", "max": "5"}}}
+        self.files = {"/schema/ParamImageFeatures.json": json.dumps(
+            {"threshold_{}_{}".format(limit, kpi): {"min": 0, "max": maximum}
+             for kpi, maximum in (("sharpness", 1228800), ("brightness", 255),
+                                  ("area_low_exposure", 100), ("area_high_exposure", 100))
+             for limit in ("min", "max")}).encode()}
+        self._local = threading.local()
+        fake = self
+
+        class Handler(SimpleXMLRPCRequestHandler):
+            protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+            rpc_paths = ()
+
+            def setup(self):
+                fake.connections += 1
+                fake.sockets.append(self.request)
+                super().setup()
+
+            def do_POST(self):
+                fake.posts += 1
+                super().do_POST()
+
+            def do_GET(self):
+                fake.gets.append(self.path)
+                if self.path not in fake.files:
+                    self.report_404()
+                    return
+                data = fake.files[self.path]
+                self.send_response(200)
+                self.send_header("Content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        class Server(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+            daemon_threads = True
+
+            def _marshaled_dispatch(self, data, dispatch_method=None, path=None):
+                fake._local.path = path
+                return super()._marshaled_dispatch(data, dispatch_method, path)
+
+        self._server = Server(("127.0.0.1", 0), requestHandler=Handler, allow_none=True, logRequests=False)
+        self._server.register_instance(self)
+        if multicall:
+            self._server.register_multicall_functions()
+        self.address = "127.0.0.1:{}".format(self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _object(self, path):
+        path = path[len(self.API_PATH):] if path.startswith(self.API_PATH) else path
+        parts = [p for p in path.strip("/").split("/") if p]
+        return parts[-1].split("_")[0] if parts else "main"
+
+    def _dispatch(self, method, params):
+        obj = self._object(self._local.path)
+        self.requests.append((obj, method, params))
+        if self.delay:
+            time.sleep(self.delay)
+        func = getattr(self, "rpc_{}_{}".format(obj, method.replace(".", "_")), None)
+        if func:
+            return func(*params)
+        func = getattr(self, "rpc_{}".format(method), None)
+        if func and obj in self.parameters:
+            return func(obj, *params)
+        raise Exception('method "{}" is not supported by object {}'.format(method, obj))
+
+    def rpc_main_getSWVersion(self):
+        return {"IFM_Software": "1.30.10479", "Main_Application": "1.30.10479"}
+
+    def rpc_getParameter(self, obj, name):
+        if name not in self.parameters[obj]:
+            raise xmlrpc.client.Fault(101000, "Parameter {} not found".format(name))
+        return self.parameters[obj][name]
+
+    def rpc_getAllParameters(self, obj):
+        return self.parameters[obj]
+
+    def rpc_setParameter(self, obj, name, value):
+        if name not in self.parameters[obj]:
+            raise xmlrpc.client.Fault(101000, "Parameter {} not found".format(name))
+        if name == "QualityCheckConfig" and value is True:
+            value = json.dumps({"threshold_min_sharpness": 0, "threshold_max_sharpness": 1228800,
+                                "threshold_min_brightness": 0, "threshold_max_brightness": 255,
+                                "threshold_min_area_low_exposure": 0, "threshold_max_area_low_exposure": 100,
+                                "threshold_min_area_high_exposure": 0, "threshold_max_area_high_exposure": 100})
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        self.parameters[obj][name] = str(value)
+
+    def rpc_getAllParameterLimits(self, obj):
+        return self.limits.get(obj, {})
+
+    def rpc_waitForConfigurationDone(self, obj):
+        return None
+
+    def rpc_isConfigurationDone(self, obj):
+        return True
+
+    def rpc_main_getReferenceImage(self):
+        return xmlrpc.client.Binary(self.referenceImages[self.parameters["main"]["ActiveApplication"]])
+
+    def rpc_main_switchApplication(self, index):
+        self.parameters["main"]["ActiveApplication"] = str(index)
+
+    def rpc_main_requestSession(self, password, session_id):
+        return session_id
+
+    def rpc_session_cancelSession(self):
+        return None
+
+    def rpc_session_setOperatingMode(self, mode):
+        self.parameters["main"]["OperatingMode"] = str(mode)
+
+    def rpc_edit_editApplication(self, index):
+        return None
+
+    def rpc_edit_stopEditingApplication(self):
+        return None
+
+    def rpc_application_getImagerConfigList(self):
+        return [{"Id": "1", "Name": "New Imager", "Type": "normal"}]
+
+    def rpc_application_save(self):
+        return None
+
+    def rpc_application_validate(self):
+        return []
+
+    def rpc_session_heartbeat(self, interval):
+        self.heartbeats += 1
+        return interval
+
+    def rpc_session_exportConfig(self):
+        return xmlrpc.client.Binary(self.exportData)
+
+    def rpc_session_exportApplication(self, index):
+        return xmlrpc.client.Binary(self.exportData)
+
+    def rpc_session_importConfig(self, data, flags):
+        self.imported.append((data.data, flags))
+
+    def rpc_session_importApplication(self, data):
+        self.imported.append((data.data, None))
+        return 2
+
+    def rpc_session_getExportProgress(self):
+        return 1.0
+
+    def rpc_session_getImportProgress(self):
+        return 1.0
+
+    def rpc_session_cleanupExport(self):
+        return None
+
+    def dropConnections(self):
+        for sock in self.sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.sockets = []
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class FakeFirmwareDevice(object):
+    """
+    Fake productive and recovery web servers of a device for testing the firmware update.
+    The productive server listens on host:<random port>, the recovery server on host:recovery_port.
+    Reboots take boot_time seconds, the first fail_uploads uploads are aborted after half of the data.
+    """
+
+    def __init__(self, host="127.0.0.1", recovery_port=0, boot_time=0.2, fail_uploads=0):
+        self.mode = "productive"
+        self.boot_time = boot_time
+        self.fail_uploads = fail_uploads
+        self.uploads = []
+        self.reboots = []
+        self.status = {"Status": "0", "Error": "0", "Msg": ""}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, data=b""):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                recovery = self.server is fake._recovery
+                if recovery and fake.mode == "recovery" and self.path == "/getstatus.json":
+                    self.reply(200, json.dumps(fake.status).encode())
+                elif (recovery and fake.mode == "recovery") or (not recovery and fake.mode == "productive"):
+                    self.reply(200)
+                else:
+                    self.reply(503)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                if self.path.startswith("/api/rpc/v1/com.ifm.efector?method=reboot"):
+                    self.rfile.read(length)
+                    fake._reboot("recovery")
+                    self.reply(200)
+                elif self.path == "/reboot_to_live":
+                    self.rfile.read(length)
+                    fake._reboot("productive")
+                    self.reply(200)
+                elif self.path == "/handle_post_request":
+                    if fake.fail_uploads:
+                        fake.fail_uploads -= 1
+                        self.rfile.read(length // 2)
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+                    data = self.rfile.read(length)
+                    fake.uploads.append((self.headers["X_FILENAME"], data))
+                    fake.status = {"Status": "3", "Error": "0", "Msg": "Update successful"}
+                    self.reply(200)
+                else:
+                    self.reply(404)
+
+        self._productive = ThreadingHTTPServer((host, 0), Handler)
+        self._recovery = ThreadingHTTPServer((host, recovery_port), Handler)
+        self._productive.daemon_threads = self._recovery.daemon_threads = True
+        self.address = "{}:{}".format(host, self._productive.server_address[1])
+        self.recovery_port = self._recovery.server_address[1]
+        self._threads = [threading.Thread(target=server.serve_forever, daemon=True)
+                         for server in (self._productive, self._recovery)]
+        for thread in self._threads:
+            thread.start()
+
+    def _reboot(self, mode):
+        self.reboots.append(mode)
+        self.mode = "booting"
+
+        def booted():
+            self.status = {"Status": "0", "Error": "0", "Msg": ""}
+            self.mode = mode
+        timer = threading.Timer(self.boot_time, booted)
+        timer.daemon = True
+        timer.start()
+
+    def close(self):
+        for server in (self._productive, self._recovery):
+            server.shutdown()
+            server.server_close()
+
+
+def createDiscoveryResponse(ip, mac, name, article_number="O2D500"):
+    response = struct.pack(">I", 0x19111981) + socket.inet_aton(ip) + socket.inet_aton("192.168.0.1") + \
+        socket.inet_aton("255.255.255.0") + struct.pack(">HHH", 80, 0x136, 0x1) + bytes(10) + \
+        bytes(int(v, 16) for v in mac.split(":")) + struct.pack(">H", 0) + article_number.encode()
+    return response.ljust(104, b"\x00") + name.encode().ljust(64, b"\x00")
+
+
+class FakeDiscoveryDevices(object):
+    """
+    UDP responder answering the discovery broadcast for several fake devices. It listens on host:<random port>,
+    the first drop broadcasts are ignored like lost datagrams.
+    """
+
+    def __init__(self, devices, host="127.0.0.2", drop=0):
+        self.devices = devices
+        self.drop = drop
+        self.broadcasts = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, 0))
+        self._sock.settimeout(0.1)
+        self.host = host
+        self.port = self._sock.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, sender = self._sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            self.broadcasts.append(sender)
+            if self.drop:
+                self.drop -= 1
+                continue
+            for device in self.devices:
+                self._sock.sendto(createDiscoveryResponse(**device), sender)
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self._sock.close()
+
+
+class FakePCICDeviceServer(object):
+    """
+    PCIC server accepting several connections and acknowledging every command with "*", for testing the
+    device pool. drop() closes all open connections like a rebooting device.
+    Beyond max_connections open connections it answers "E?" with error 100000001 (reject="error") or closes
+    new connections immediately (reject="close").
+    """
+
+    def __init__(self, max_connections=None, reject="error"):
+        self.max_connections = max_connections
+        self.reject = reject
+        self.connections = 0
+        self._conns = []
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self._server.settimeout(0.1)
+        self.port = self._server.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    @property
+    def open_connections(self):
+        return len([conn for conn in self._conns if conn.fileno() != -1])
+
+    def _accept(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.settimeout(None)
+            self.connections += 1
+            limited = self.max_connections is not None and self.open_connections >= self.max_connections
+            if limited and self.reject == "close":
+                conn.close()
+                continue
+            self._conns.append(conn)
+            threading.Thread(target=self._serve, args=(conn, limited), daemon=True).start()
+
+    def _serve(self, conn, limited=False):
+        with conn:
+            reader = conn.makefile("rb")
+            while True:
+                try:
+                    header = reader.read(16)
+                    if len(header) < 16:
+                        return
+                    command = reader.read(int(header[5:14]))[4:-2]
+                    if command == b"E?":
+                        state = b"100000001" if limited else b"000000000"
+                        conn.sendall(b"1000L000000015\r\n1000" + state + b"\r\n")
+                    else:
+                        conn.sendall(b"1000L000000007\r\n1000*\r\n")
+                except (OSError, ValueError):
+                    return
+
+    def drop(self):
+        for conn in self._conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self._server.close()
+        self.drop()